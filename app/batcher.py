@@ -0,0 +1,93 @@
+# app/batcher.py
+"""
+비동기 마이크로 배처
+- 동시에 들어온 요청을 max_wait_ms 동안(또는 max_batch개가 찰 때까지) 모아 handler를 한 번 호출
+- handler(items) → 같은 순서의 결과 리스트 (항목별 예외는 Exception 객체로 돌려주면 해당 호출자에게만 전달)
+- 통계: 배치 수, 평균 채움률, 배치 대기로 추가된 지연(ms)
+- 실행 중인 배치 태스크는 참조를 보관 (GC로 사라지지 않게), aclose()에서 취소하고 대기 중인 호출자도 취소
+"""
+import asyncio, time
+from typing import Any, Awaitable, Callable, List, Optional, Set
+
+
+class MicroBatcher:
+    def __init__(self, handler: Callable[[List[Any]], Awaitable[List[Any]]],
+                 max_batch: int = 8, max_wait_ms: float = 5.0):
+        self.handler = handler
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: List[tuple] = []      # (item, future, 도착 시각)
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+        self.wait_ms_sum = 0.0
+        self.wait_ms_max = 0.0
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((item, fut, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._dispatch)
+        return await fut
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[tuple]) -> None:
+        now = time.perf_counter()
+        waits = [(now - t0) * 1000.0 for _, _, t0 in batch]
+        self.batches += 1
+        self.items += len(batch)
+        self.wait_ms_sum += sum(waits)
+        self.wait_ms_max = max(self.wait_ms_max, max(waits))
+        try:
+            results = await self.handler([it for it, _, _ in batch])
+        except asyncio.CancelledError:
+            for _, fut, _ in batch:
+                fut.cancel()
+            raise
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, fut, _), res in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(res, Exception):
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
+
+    async def aclose(self) -> None:
+        """종료 시 호출: 대기 중인 항목과 실행 중인 배치를 취소"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        for _, fut, _ in pending:
+            fut.cancel()
+        tasks = list(self._tasks)
+        for t in tasks:
+            t.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        b = max(self.batches, 1)
+        return dict(
+            batches=self.batches,
+            items=self.items,
+            avg_batch=self.items / b,
+            avg_fill=self.items / (b * self.max_batch),
+            avg_wait_ms=self.wait_ms_sum / max(self.items, 1),
+            max_wait_ms=self.wait_ms_max,
+        )
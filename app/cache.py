@@ -0,0 +1,86 @@
+# app/cache.py
+"""
+프로세스 내 캐시 유틸
+- TTLCache: LRU + 만료시간(TTL) 캐시. None 같은 '부정 결과'도 저장 가능 (MISSING으로 구분)
+- SingleFlight: 같은 키로 동시에 들어온 비동기 계산을 하나로 합침
+"""
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+MISSING = object()   # 캐시 미스 표시 (None 결과와 구분)
+
+
+class TTLCache:
+    """
+    LRU + TTL 캐시
+    - maxsize: 최대 항목 수 (초과 시 가장 오래 안 쓴 항목 축출)
+    - ttl: 항목 유효 시간(초)
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return dict(size=len(self._data), hits=self.hits, misses=self.misses)
+
+
+class SingleFlight:
+    """
+    같은 키의 동시 계산 합치기 (asyncio)
+    - 첫 호출만 fn()을 실행하고, 진행 중에 들어온 같은 키 호출은 그 결과(또는 예외)를 공유
+    - 호출자 하나가 취소돼도 계산은 계속되어 나머지 대기자에게 전달
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            fut = asyncio.ensure_future(fn())
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda f, k=key: self._inflight.pop(k, None))
+        return await asyncio.shield(fut)
+
+    def stats(self) -> dict:
+        return dict(inflight=len(self._inflight), leaders=self.leaders, coalesced=self.coalesced)
@@ -0,0 +1,225 @@
+# app/catalog.py
+"""
+큐레이션 코스 카탈로그 (data/normalized_courses.json → 메모리 역색인)
+- 태그(지역/구/동/자연/코스유형/난이도/고도)를 "필드:값" 문자열로 intern → 태그 번호
+- 태그별 포스팅은 파이썬 int 비트셋 (i번째 비트 = i번째 코스) → 교집합/합집합이 정수 AND/OR 한 번
+- 검색: 지명 토큰은 AND 필터, 키워드는 매칭 개수로 랭킹, 거리는 허용 오차 밖이면 제외(길이 미상 코스는 후순위)
+  코스명이 지명 토큰과 맞는 코스는 지역/구 태그로만 맞은 코스보다 항상 위
+- DB 왕복 없이 수십 µs 단위 조회 (Supabase search_running_courses 대체)
+"""
+from __future__ import annotations
+import os, json, logging
+from typing import Dict, List, Optional, Tuple
+from app.geostore import COURSES_JSON, normalize_name
+from app.models import ParsedParams
+
+log = logging.getLogger("catalog")
+
+CATALOG_DIST_TOL = float(os.getenv("CATALOG_DIST_TOL", "0.2"))   # 거리 허용 오차 기본값 (±20%)
+
+# 지명 매칭에 쓰는 필드 / 키워드 매칭에 쓰는 필드
+_ADMIN_FIELDS = ("region", "city", "district", "neighborhood")
+_LOC_FIELDS = _ADMIN_FIELDS + ("name",)
+_KW_FIELDS = ("natural", "type", "elevation")
+# 행정구역 태그는 완전 일치 또는 행정 접미사 차이만 허용 ("마포" ↔ "마포구", "경기" ↔ "경기도")
+# → "서울" ⊂ "서울숲"처럼 더 긴 지명 안에 들어 있는 경우는 매칭하지 않음
+_ADMIN_SUFFIXES = ("특별자치시", "특별자치도", "특별시", "광역시", "시", "도", "군", "구", "동", "읍", "면")
+_NAME_BONUS = 1.0   # 코스명 일치 가산점 (정렬은 코스명 일치 여부가 우선)
+
+# 파서 키워드(BASE_KEYWORDS) → 카탈로그 태그 값
+_KW_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "강": ("하천", "한강"), "천": ("하천",), "강변": ("하천", "한강"), "수변": ("수변", "하천", "호수"),
+    "운동장": ("트랙",), "체육공원": ("공원", "트랙"), "호수공원": ("호수", "공원"),
+    "둘레길": ("산책로",), "언덕": ("업힐",), "바다": ("해안",),
+}
+
+
+def _admin_match(v: str, t: str) -> bool:
+    """정규화된 행정구역 태그 v ↔ 지명 토큰 t"""
+    if v == t:
+        return True
+    long, short = (t, v) if len(t) > len(v) else (v, t)
+    return len(short) >= 2 and long.startswith(short) and long[len(short):] in _ADMIN_SUFFIXES
+
+
+def _word_start_match(starts: Tuple[str, ...], t: str) -> bool:
+    """코스명 단어 시작 위치에서 토큰이 시작되거나, 토큰이 코스명 전체를 포함"""
+    if len(t) < 2 or not starts:
+        return False
+    return any(st.startswith(t) for st in starts) or starts[0] in t
+
+
+def _popcount(x: int) -> int:
+    return bin(x).count("1")
+
+
+def _bits(x: int):
+    """비트셋 → 켜진 비트 위치 (작은 번호부터)"""
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+
+class CourseCatalog:
+    __slots__ = ("courses", "tags", "postings", "_by_field", "_name_starts", "lengths", "all_mask", "_loc_cache")
+
+    def __init__(self, courses: List[Dict]):
+        self.courses = courses
+        self.tags: Dict[str, int] = {}          # "필드:값" → 태그 번호
+        self.postings: List[int] = []           # 태그 번호 → 코스 비트셋
+        self._by_field: Dict[str, List[Tuple[str, int]]] = {}   # 필드 → [(정규화 값, 태그 번호)]
+        self._name_starts: List[Tuple[Tuple[str, ...], int]] = []  # 코스명 단어 시작 위치부터의 정규화 값들
+        self.lengths = [c.get("length_km") for c in courses]
+        self.all_mask = (1 << len(courses)) - 1
+        self._loc_cache: Dict[str, int] = {}
+        for i, c in enumerate(courses):
+            for field, values in self._fields(c):
+                for v in values:
+                    if v:
+                        self._add(field, v, i)
+
+    @staticmethod
+    def _fields(c: Dict):
+        yield "region", c.get("region_tags") or []
+        yield "city", [c.get("city")]
+        yield "district", (c.get("district_tags") or []) + [c.get("district")]
+        yield "neighborhood", c.get("neighborhood_tags") or []
+        yield "name", [c.get("course_name")]
+        yield "natural", (c.get("natural_tags") or []) + (c.get("tags") or [])
+        yield "type", [c.get("course_type")]
+        yield "difficulty", [c.get("difficulty")]
+        yield "elevation", [c.get("elevation")]
+
+    def _add(self, field: str, value: str, i: int) -> None:
+        key = f"{field}:{value}"
+        tid = self.tags.get(key)
+        if tid is None:
+            tid = self.tags[key] = len(self.postings)
+            self.postings.append(0)
+            self._by_field.setdefault(field, []).append((normalize_name(value), tid))
+            if field == "name":
+                words = value.split()
+                self._name_starts.append((tuple(normalize_name(" ".join(words[j:])) for j in range(len(words))), tid))
+        self.postings[tid] |= 1 << i
+
+    def __len__(self) -> int:
+        return len(self.courses)
+
+    def mask(self, field: str, value: str) -> int:
+        tid = self.tags.get(f"{field}:{value}")
+        return self.postings[tid] if tid is not None else 0
+
+    def location_masks(self, token: str) -> Tuple[int, int]:
+        """
+        지명 토큰 1개 → (전체 매칭 비트셋, 코스명 매칭 비트셋)
+        - 지역/시/구/동 태그: 완전 일치 또는 행정 접미사 차이 (예: "마포구" ↔ "마포", "서울숲" ↛ "서울")
+        - 코스명: 정규화 값이 서로 포함 관계면 매칭 (예: "서울숲" ↔ "서울숲 주변 코스"), 2글자 미만은 제외
+          코스명 비트셋(랭킹 가산용)은 토큰이 코스명 단어 시작에서 맞을 때만 ("경기" ↛ "보조경기장")
+        """
+        t = normalize_name(token)
+        hit = self._loc_cache.get(t)
+        if hit is not None:
+            return hit
+        m = name = 0
+        if t:
+            for field in _ADMIN_FIELDS:
+                for v, tid in self._by_field.get(field, ()):
+                    if _admin_match(v, t):
+                        m |= self.postings[tid]
+            for v, tid in self._by_field.get("name", ()):
+                if v == t or (len(v) >= 2 and v in t) or (len(t) >= 2 and t in v):
+                    m |= self.postings[tid]
+            for starts, tid in self._name_starts:
+                if _word_start_match(starts, t):
+                    name |= self.postings[tid]
+        hit = self._loc_cache[t] = (m | name, name)
+        return hit
+
+    def location_mask(self, token: str) -> int:
+        return self.location_masks(token)[0]
+
+    def keyword_masks(self, keywords: List[str]) -> List[int]:
+        out = []
+        for kw in keywords:
+            m = 0
+            for v in (kw,) + _KW_ALIASES.get(kw, ()):
+                for field in _KW_FIELDS:
+                    m |= self.mask(field, v)
+            out.append(m)
+        return out
+
+    def search(self, p: ParsedParams, limit: int = 20) -> List[Tuple[Dict, float]]:
+        """
+        ParsedParams → [(코스, 점수)] (점수 내림차순)
+        - location: 공백 토큰별 매칭 비트셋의 AND (아무 것도 안 맞는 토큰은 무시, 전부 안 맞으면 결과 없음)
+          코스명이 맞은 코스는 _NAME_BONUS 가산 + 정렬 우선
+        - keywords: 맞는 키워드 수 = 기본 점수 (없으면 전체 후보 유지)
+        - distance_km: length_km가 ±tolerance 밖이면 제외, 가까울수록 가산, 길이 미상은 소폭 감점
+        - time=night: 키워드 "야간가능" 태그가 있으면 그 코스만 가산
+        """
+        cand = self.all_mask
+        named = 0
+        if p.location:
+            masks = [mm for mm in (self.location_masks(tok) for tok in p.location.split()) if mm[0]]
+            if not masks:
+                return []
+            for m, name in masks:
+                cand &= m
+                named |= name
+
+        kw_masks = self.keyword_masks(p.keywords or [])
+        if kw_masks:
+            any_kw = 0
+            for m in kw_masks:
+                any_kw |= m
+            if cand & any_kw:
+                cand &= any_kw
+        night = self.mask("natural", "야간가능") if p.time == "night" else 0
+        easy = self.mask("difficulty", "easy")
+
+        tol = p.tolerance or CATALOG_DIST_TOL
+        scored = []
+        for i in _bits(cand):
+            bit = 1 << i
+            s = float(sum(1 for m in kw_masks if m & bit))
+            if night & bit:
+                s += 0.5
+            if easy & bit:
+                s += 0.1
+            if named & bit:
+                s += _NAME_BONUS
+            if p.distance_km:
+                L = self.lengths[i]
+                if L is None:
+                    s -= 0.5
+                else:
+                    err = abs(L - p.distance_km) / p.distance_km
+                    if err > tol:
+                        continue
+                    s += 1.0 - err / tol
+            scored.append((s, i))
+        scored.sort(key=lambda x: (not named >> x[1] & 1, -x[0], x[1]))
+        return [(self.courses[i], s) for s, i in scored[:limit]]
+
+    def stats(self) -> dict:
+        return dict(courses=len(self.courses), tags=len(self.tags),
+                    avg_posting=sum(_popcount(m) for m in self.postings) / max(len(self.postings), 1))
+
+
+_CATALOG: Optional[CourseCatalog] = None
+
+
+def load_catalog(path: str = COURSES_JSON) -> CourseCatalog:
+    global _CATALOG
+    courses = []
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            courses = json.load(f)
+    _CATALOG = CourseCatalog(courses)
+    log.info(f"[catalog] loaded {path}: {_CATALOG.stats()}")
+    return _CATALOG
+
+
+def get_catalog() -> CourseCatalog:
+    return _CATALOG if _CATALOG is not None else load_catalog()
@@ -0,0 +1,259 @@
+# app/elevation.py
+"""
+로컬 DEM(수치표고모델) 샘플링 → 루프 누적 상승고도 피처
+- 래스터는 memory-map으로만 연다 (전체를 RAM에 올리지 않음, 워커 프로세스끼리 OS 페이지 캐시 공유)
+  * .npy + 사이드카 JSON (기본 형식): {"crs": "EPSG:4326", "x0": 서쪽 끝, "y0": 북쪽 끝, "dx": 픽셀 폭, "dy": 픽셀 높이,
+    "nodata": -9999, "scale": 1, "offset": 0}  — x0/y0은 좌상단 픽셀의 바깥 모서리, 행은 남쪽으로 증가
+  * 비압축 GeoTIFF: tifffile이 설치돼 있으면 바로 memory-map (압축 파일은 convert로 .npy 변환)
+- 샘플링: 모든 루프의 점을 이어붙여 한 번의 벡터화 쌍선형 보간 (EPSG:4326이 아니면 pyproj로 한 번에 변환)
+- 루프 구간은 ELEV_SAMPLE_M 간격으로 보간해 꼭짓점 사이의 언덕도 반영
+- elev_gain_m: 오르막 합계(m), elev_gain_norm: km당 상승고도 / ELEV_REF_M_PER_KM (0~1)
+
+사용 예:
+    python -m app.elevation convert dem.tif /mnt/data/dem.npy
+    python -m app.elevation info /mnt/data/dem.npy
+    python -m app.elevation sample 37.5446,127.0374 37.5172,126.9950
+"""
+from __future__ import annotations
+import os, json, logging, argparse
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+
+log = logging.getLogger("elevation")
+
+DEM_PATH = os.getenv("DEM_PATH", "/mnt/data/dem.npy")
+ELEV_SAMPLE_M = float(os.getenv("ELEV_SAMPLE_M", "30"))            # 구간 보간 간격(m), 0이면 꼭짓점만
+ELEV_REF_M_PER_KM = float(os.getenv("ELEV_REF_M_PER_KM", "20"))    # km당 이 상승고도 이상이면 elev_gain_norm = 1.0
+
+_M_PER_DEG_LAT = 111111.0
+# GeoTIFF 태그 번호
+_TAG_PIXEL_SCALE, _TAG_TIEPOINT, _TAG_GDAL_NODATA = 33550, 33922, 42113
+
+
+def _sidecar(path: str) -> str:
+    return os.path.splitext(path)[0] + ".json"
+
+
+def _read_npy(path: str) -> Tuple[np.ndarray, Dict]:
+    with open(_sidecar(path), encoding="utf-8") as f:
+        meta = json.load(f)
+    return np.load(path, mmap_mode="r"), meta
+
+
+def _geotiff_meta(tif) -> Dict:
+    page = tif.pages[0]
+    tags = {t.code: t.value for t in page.tags.values()}
+    if _TAG_PIXEL_SCALE not in tags or _TAG_TIEPOINT not in tags:
+        raise ValueError("GeoTIFF georeference tags (ModelPixelScale/ModelTiepoint) missing")
+    sx, sy = tags[_TAG_PIXEL_SCALE][:2]
+    i, j, _, x, y, _ = tags[_TAG_TIEPOINT][:6]
+    geo = tif.geotiff_metadata or {}
+    epsg = geo.get("ProjectedCSTypeGeoKey") or geo.get("GeographicTypeGeoKey") or 4326
+    nodata = tags.get(_TAG_GDAL_NODATA)
+    return dict(crs=f"EPSG:{int(epsg)}", x0=float(x - i * sx), y0=float(y + j * sy), dx=float(sx), dy=float(sy),
+                nodata=float(str(nodata).strip("\x00 ")) if nodata is not None else None)
+
+
+def _read_geotiff(path: str) -> Tuple[np.ndarray, Dict]:
+    try:
+        import tifffile
+    except ImportError as e:
+        raise RuntimeError("GeoTIFF DEM requires tifffile (pip install tifffile) "
+                           "or convert it to .npy + .json first") from e
+    with tifffile.TiffFile(path) as tif:
+        meta = _geotiff_meta(tif)
+    try:
+        z = tifffile.memmap(path, mode="r")
+    except ValueError as e:
+        raise RuntimeError(f"GeoTIFF is not memory-mappable (compressed/tiled): "
+                           f"python -m app.elevation convert {path} out.npy") from e
+    return z, meta
+
+
+class DEM:
+    """
+    memory-map DEM 래스터 + 지오레퍼런스
+    - z: (rows, cols) 배열 (np.memmap), 행 0 = 북쪽
+    - sample(): 쌍선형 보간, 래스터 밖/nodata는 NaN
+    """
+    __slots__ = ("path", "z", "crs", "x0", "y0", "dx", "dy", "nodata", "scale", "offset")
+
+    def __init__(self, path: str, z: np.ndarray, meta: Dict):
+        if z.ndim == 3:
+            z = z[0] if z.shape[0] < z.shape[-1] else z[..., 0]
+        if z.ndim != 2 or min(z.shape) < 2:
+            raise ValueError(f"DEM must be a 2-D raster, got shape {z.shape}")
+        self.path = path
+        self.z = z
+        self.crs = str(meta.get("crs", "EPSG:4326")).upper()
+        self.x0, self.y0 = float(meta["x0"]), float(meta["y0"])
+        self.dx, self.dy = float(meta["dx"]), abs(float(meta["dy"]))
+        self.nodata = meta.get("nodata")
+        self.scale = float(meta.get("scale", 1.0))
+        self.offset = float(meta.get("offset", 0.0))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.z.shape
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """(x 최소, y 최소, x 최대, y 최대) — DEM 좌표계 기준"""
+        h, w = self.z.shape
+        return self.x0, self.y0 - h * self.dy, self.x0 + w * self.dx, self.y0
+
+    def _project(self, lat: np.ndarray, lng: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if self.crs in ("EPSG:4326", "WGS84"):
+            return lng, lat
+        from app.utils import project
+        x, y = project(lng, lat, self.crs)
+        return np.asarray(x), np.asarray(y)
+
+    def sample(self, lat, lng) -> np.ndarray:
+        """(lat, lng) 배열 → 고도(m) 배열. 네 모서리 픽셀만 읽으므로 건드린 페이지만 디스크에서 올라온다"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        x, y = self._project(lat, lng)
+        h, w = self.z.shape
+        fc = (x - self.x0) / self.dx - 0.5      # 픽셀 중심 기준 열/행 좌표
+        fr = (self.y0 - y) / self.dy - 0.5
+        inside = (fc >= -0.5) & (fc <= w - 0.5) & (fr >= -0.5) & (fr <= h - 0.5)
+        fc = np.clip(np.nan_to_num(fc), 0.0, w - 1.0)
+        fr = np.clip(np.nan_to_num(fr), 0.0, h - 1.0)
+        c0 = np.minimum(fc.astype(np.int64), w - 2)
+        r0 = np.minimum(fr.astype(np.int64), h - 2)
+        tx, ty = fc - c0, fr - r0
+
+        z = self.z
+        q = np.stack([z[r0, c0], z[r0, c0 + 1], z[r0 + 1, c0], z[r0 + 1, c0 + 1]]).astype(np.float64)
+        if self.nodata is not None:
+            q[q == float(self.nodata)] = np.nan
+        out = (q[0] * (1 - tx) * (1 - ty) + q[1] * tx * (1 - ty)
+               + q[2] * (1 - tx) * ty + q[3] * tx * ty) * self.scale + self.offset
+        out[~inside] = np.nan
+        return out
+
+
+def _densify(routes: Sequence[np.ndarray], step_m: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    여러 루프의 점을 이어붙이고 구간을 step_m 간격으로 보간 (경로 경계는 넘지 않음)
+    - 반환: (샘플 좌표 (m, 2) [lat, lng], 샘플별 루프 번호, 루프별 길이(m))
+    """
+    n = len(routes)
+    counts = np.array([len(r) for r in routes], dtype=np.int64)
+    P = np.concatenate([np.asarray(r, dtype=np.float64).reshape(-1, 2) for r in routes]) if counts.sum() \
+        else np.zeros((0, 2))
+    rid = np.repeat(np.arange(n), counts)
+    # 같은 루프 안의 연속 점 쌍만 구간으로
+    seg = np.flatnonzero(rid[:-1] == rid[1:]) if len(P) > 1 else np.zeros(0, dtype=np.int64)
+    d = P[seg + 1] - P[seg]
+    kx = _M_PER_DEG_LAT * np.cos(np.radians(P[seg, 0]))
+    seg_m = np.hypot(d[:, 1] * kx, d[:, 0] * _M_PER_DEG_LAT)
+    length_m = np.bincount(rid[seg], weights=seg_m, minlength=n)
+
+    nsub = np.maximum(1, np.ceil(seg_m / step_m).astype(np.int64)) if step_m > 0 else np.ones(len(seg), np.int64)
+    si = np.repeat(np.arange(len(seg)), nsub)
+    j = np.arange(len(si)) - np.repeat(np.cumsum(nsub) - nsub, nsub)
+    t = (j / nsub[si])[:, None]
+    pts = P[seg[si]] + t * d[si]
+    pr = rid[seg[si]]
+    # 각 루프의 마지막 점 추가 (구간 시작점만 생성했으므로)
+    last = np.cumsum(counts)[counts > 0] - 1
+    pts = np.concatenate([pts, P[last]])
+    pr = np.concatenate([pr, rid[last]])
+    order = np.argsort(pr, kind="stable")
+    return pts[order], pr[order], length_m
+
+
+def gain_batch(dem: DEM, routes: Sequence[np.ndarray],
+               step_m: float = ELEV_SAMPLE_M) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    여러 루프의 (누적 상승고도 m, 정규화 상승고도 0~1)를 한 번에 계산
+    - 루프 안 연속 샘플의 고도 차 중 양수만 합산, DEM 밖/nodata 구간은 제외
+    - 유효 샘플이 없는 루프는 NaN (호출 측에서 기본값 유지)
+    """
+    n = len(routes)
+    if n == 0:
+        return np.zeros(0), np.zeros(0)
+    pts, pr, length_m = _densify(routes, step_m)
+    elev = dem.sample(pts[:, 0], pts[:, 1])
+    same = pr[:-1] == pr[1:]
+    dz = np.diff(elev)
+    ok = same & np.isfinite(dz)
+    gain = np.bincount(pr[:-1][ok], weights=np.maximum(dz[ok], 0.0), minlength=n)
+    valid = np.bincount(pr[:-1][ok], minlength=n) > 0
+    per_km = gain / np.maximum(length_m / 1000.0, 1e-6)
+    norm = np.clip(per_km / ELEV_REF_M_PER_KM, 0.0, 1.0)
+    gain[~valid] = np.nan
+    norm[~valid] = np.nan
+    return gain, norm
+
+
+_DEM: Optional[DEM] = None
+_LOADED = False
+
+
+def load_dem(path: str = DEM_PATH) -> Optional[DEM]:
+    """DEM 파일을 memory-map으로 연다 (.npy + .json 또는 GeoTIFF). 없으면 None → 고도 피처는 기본값"""
+    global _DEM, _LOADED
+    _LOADED = True
+    _DEM = None
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        z, meta = _read_geotiff(path) if path.lower().endswith((".tif", ".tiff")) else _read_npy(path)
+        _DEM = DEM(path, z, meta)
+        log.info(f"[elevation] DEM {path}: shape={_DEM.shape} dtype={_DEM.z.dtype} crs={_DEM.crs} "
+                 f"bounds={tuple(round(v, 5) for v in _DEM.bounds())}")
+    except Exception as e:
+        log.warning(f"[elevation] DEM load failed: {e}")
+    return _DEM
+
+
+def get_dem() -> Optional[DEM]:
+    return _DEM if _LOADED else load_dem()
+
+
+def convert(src: str, dst: str, nodata: Optional[float] = None) -> None:
+    """GeoTIFF(압축 포함, tifffile 필요) → .npy + .json 사이드카"""
+    import tifffile
+    with tifffile.TiffFile(src) as tif:
+        meta = _geotiff_meta(tif)
+        z = tif.asarray()
+    if z.ndim == 3:
+        z = z[0] if z.shape[0] < z.shape[-1] else z[..., 0]
+    if nodata is not None:
+        meta["nodata"] = nodata
+    np.save(dst, np.ascontiguousarray(z))
+    with open(_sidecar(dst), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    log.info(f"[elevation] converted {src} -> {dst} shape={z.shape} dtype={z.dtype} crs={meta['crs']}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser(description="로컬 DEM 도구")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("convert")
+    c.add_argument("src")
+    c.add_argument("dst")
+    c.add_argument("--nodata", type=float)
+    i = sub.add_parser("info")
+    i.add_argument("path", nargs="?", default=DEM_PATH)
+    s = sub.add_parser("sample")
+    s.add_argument("points", nargs="+", help="lat,lng")
+    s.add_argument("--path", default=DEM_PATH)
+    args = ap.parse_args()
+
+    if args.cmd == "convert":
+        convert(args.src, args.dst, args.nodata)
+    else:
+        dem = load_dem(args.path)
+        if dem is None:
+            raise SystemExit(f"DEM not found: {args.path}")
+        if args.cmd == "info":
+            print(dict(path=dem.path, shape=dem.shape, dtype=str(dem.z.dtype), crs=dem.crs,
+                       bounds=dem.bounds(), pixel=(dem.dx, dem.dy), nodata=dem.nodata))
+        else:
+            pts = np.array([[float(v) for v in p.split(",")] for p in args.points])
+            for (lat, lng), z in zip(pts, dem.sample(pts[:, 0], pts[:, 1])):
+                print(f"{lat:.6f},{lng:.6f}\t{z:.2f}")
@@ -0,0 +1,231 @@
+# app/executor.py
+"""
+경로 생성 실행기 (CPU 작업을 이벤트 루프 밖에서 실행)
+- ROUTE_EXECUTOR=process : ProcessPoolExecutor (워커 시작 시 가로등/핫스팟 그래프 미리 로딩)
+- ROUTE_EXECUTOR=thread  : ThreadPoolExecutor (메인 프로세스 자원 공유)
+- ROUTE_EXECUTOR=inline  : 이벤트 루프에서 앵커를 순서대로 동기 실행 (디버깅용, 실행 중에는 다른 요청을 받지 않음)
+- 앵커별 작업을 병렬로 돌리고, 요청 마감(ROUTE_DEADLINE_S)까지 끝난 결과만 모아 반환
+  (요청당 진행 중 작업은 워커 수까지만 제출 → 마감 후 버려진 작업이 워커를 붙잡는 시간을 제한)
+- 워커의 단계별 계측(app.metrics)은 결과와 함께 돌려받아 부모 프로세스 레지스트리에 합침
+- 작업마다 부모의 가로등 데이터 버전을 넘겨, 다르면 워커가 다시 로딩 (부모에서 load_lamps_csv를 다시 부른 경우)
+- 경로 생성 스택(app.routegen → networkx/scipy/shapely)은 실제로 쓰는 곳(워커)에서만 import
+"""
+import os, asyncio, logging
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from app.models import LatLng
+import numpy as np
+from app.utils import estimate_features, load_lamps_csv, lighting_indices_for_routes
+from app.utils import warm_transformers, lamps_ref, sync_lamps
+from app.elevation import get_dem, gain_batch
+from app.scoring import beginner_scores, feature_matrix, profile, top_k
+from app import metrics
+
+log = logging.getLogger("executor")
+
+ROUTE_EXECUTOR = os.getenv("ROUTE_EXECUTOR", "process")
+ROUTE_WORKERS = int(os.getenv("ROUTE_WORKERS", "3"))
+ROUTE_DEADLINE_S = float(os.getenv("ROUTE_DEADLINE_S", "20"))
+ROUTE_MP_START = os.getenv("ROUTE_MP_START", "spawn")     # uvicorn 스레드와 fork 충돌 방지
+# 워커가 미리 그래프를 올려둘 지점 "lat,lng;lat,lng" (예: 서울숲, 반포한강공원)
+ROUTE_WARM_POINTS = os.getenv("ROUTE_WARM_POINTS", "")
+
+_POOL: Optional[Executor] = None
+
+
+def _parse_points(spec: str) -> List[LatLng]:
+    pts = []
+    for part in spec.split(";"):
+        part = part.strip()
+        if part:
+            lat, lng = (float(v) for v in part.split(","))
+            pts.append(LatLng(lat=lat, lng=lng))
+    return pts
+
+
+def _worker_init(lamps_csv: Optional[str], warm_points: str) -> None:
+    """프로세스 워커 초기화: 좌표 변환기, 가로등 인덱스(memory-map 캐시), DEM(memory-map), 핫스팟 그래프를 미리 로딩"""
+    from app.routegen import _engine_for
+    warm_transformers()
+    get_dem()
+    if lamps_csv:
+        try:
+            load_lamps_csv(lamps_csv, lon_col="경도", lat_col="위도")
+        except Exception as e:
+            log.warning(f"[executor] worker lamps load failed: {e}")
+    for pt in _parse_points(warm_points):
+        try:
+            _engine_for(pt)
+        except Exception as e:
+            log.warning(f"[executor] worker warm ({pt.lat},{pt.lng}) failed: {e}")
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def route_anchor(anchor: Dict[str, Any], target_km: float, tol: Optional[float],
+                 is_night: bool, k: int = 3, profile_name: Optional[str] = None,
+                 lamps: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    앵커 1개 처리 (워커에서 실행): 루프 생성(그래프 피처 포함) → 조명지수/상승고도(배치) → 피처 → 배치 스코어
+    - lamps: 부모의 가로등 데이터 참조(lamps_ref). 워커의 버전과 다르면 먼저 다시 로딩
+    - 상위 k개 후보만 반환 (전체 상위 3개는 앵커별 상위 3개 안에 반드시 포함)
+    - 좌표는 (n, 2) [lat, lng] 배열로 반환, polyline 인코딩(단순화/정밀도)은 최종 응답 단계(app.geometry)에서
+    - 반환값은 프로세스 간 전달이 가능하도록 기본 타입(dict/str/float/ndarray)만 사용
+    """
+    from app.routegen import generate_loop_candidates
+    start = LatLng(lat=anchor["lat"], lng=anchor["lng"])
+    with metrics.timed("loop_gen"):
+        cands = generate_loop_candidates(start, target_km=target_km, tol=tol)
+    if not cands:
+        return []
+    lighting = None
+    try:
+        sync_lamps(lamps)
+        with metrics.timed("lighting"):
+            lighting = lighting_indices_for_routes([c["geom"] for c in cands])
+    except Exception as e:
+        log.debug(f"[lighting] skip: {e}")
+    coords = [np.asarray(c["geom"].coords)[:, ::-1].copy() for c in cands]
+    elev = None
+    try:
+        dem = get_dem()
+        if dem is not None:
+            with metrics.timed("elevation"):
+                elev = gain_batch(dem, coords)
+    except Exception as e:
+        log.debug(f"[elevation] skip: {e}")
+
+    feats = []
+    for i, c in enumerate(cands):
+        f = estimate_features(c["length_m"], is_night=is_night)
+        f.update(c.get("features") or {})
+        if lighting is not None:
+            f["lighting_index"] = float(lighting[0][i])
+            f["lamps_per_km"] = float(lighting[1][i])
+        if elev is not None and np.isfinite(elev[0][i]):
+            f["elev_gain_m"] = float(elev[0][i])
+            f["elev_gain_norm"] = float(elev[1][i])
+        feats.append(f)
+    with metrics.timed("scoring"):
+        scores = beginner_scores(feature_matrix(feats), target_km, profile(profile_name, is_night))
+        best = top_k(scores, k)
+
+    return [dict(
+        idx=int(i),
+        coords=coords[i],
+        features=feats[i],
+        score=float(scores[i]),
+    ) for i in best]
+
+
+def _route_anchor_job(*args) -> tuple:
+    """풀 제출용: route_anchor 결과 + 워커에서 모은 계측 버퍼 (부모에서 metrics.merge)"""
+    with metrics.collect() as buf:
+        with metrics.timed("route_anchor"):
+            routes = route_anchor(*args)
+    return routes, buf
+
+
+def start_executor(lamps_csv: Optional[str] = None) -> None:
+    """앱 시작 시 호출: 풀 생성 + 워커를 미리 띄워 초기화(warm)까지 끝내둔다"""
+    global _POOL
+    if _POOL is not None or ROUTE_EXECUTOR == "inline":
+        return
+    if ROUTE_EXECUTOR == "thread":
+        _POOL = ThreadPoolExecutor(max_workers=ROUTE_WORKERS, thread_name_prefix="route")
+        return
+    _POOL = ProcessPoolExecutor(max_workers=ROUTE_WORKERS,
+                                mp_context=mp.get_context(ROUTE_MP_START),
+                                initializer=_worker_init,
+                                initargs=(lamps_csv, ROUTE_WARM_POINTS))
+    pids = {f.result() for f in [_POOL.submit(_ping) for _ in range(ROUTE_WORKERS)]}
+    log.info(f"[executor] process pool ready: workers={len(pids)}")
+
+
+def shutdown_executor() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+
+
+def _log_dropped(n: int, total: int, deadline_s: float) -> None:
+    metrics.inc("anchor_deadline_dropped", n)
+    log.warning(f"[executor] deadline {deadline_s}s: {n}/{total} anchors dropped")
+
+
+async def iter_anchors(anchors: List[Dict[str, Any]], target_km: float, tol: Optional[float],
+                       is_night: bool, deadline_s: float = ROUTE_DEADLINE_S,
+                       k: int = 3, profile_name: Optional[str] = None):
+    """
+    앵커들을 병렬 처리하면서 끝나는 순서대로 (anchor, routes)를 내보내는 async generator
+    - 진행 중 작업은 ROUTE_WORKERS개까지, 하나가 끝나면 다음 앵커 제출 (입력 순서대로)
+    - 마감 시간이 지나면 남은 앵커는 취소 (실패한 앵커는 로그 후 제외)
+    - 풀이 아직 없으면(워밍업 전) RuntimeError — 메인 프로세스에서 조용히 대신 실행하지 않음
+    """
+    loop = asyncio.get_running_loop()
+    end = loop.time() + deadline_s
+    args = (target_km, tol, is_night, k, profile_name, lamps_ref())
+
+    if ROUTE_EXECUTOR == "inline":
+        for i, anc in enumerate(anchors):
+            if loop.time() >= end:
+                _log_dropped(len(anchors) - i, len(anchors), deadline_s)
+                break
+            try:
+                routes, buf = _route_anchor_job(anc, *args)
+            except Exception as e:
+                metrics.inc("anchor_failed")
+                log.warning(f"[executor] anchor {anc.get('name')} failed: {e}")
+                continue
+            metrics.merge(buf)
+            yield anc, routes
+        return
+
+    if _POOL is None:
+        raise RuntimeError("route executor not started")
+    waiting = deque(anchors)
+    futs: Dict[asyncio.Future, Dict[str, Any]] = {}
+    pending = set()
+    try:
+        while waiting or pending:
+            while waiting and len(pending) < ROUTE_WORKERS:
+                anc = waiting.popleft()
+                f = loop.run_in_executor(_POOL, _route_anchor_job, anc, *args)
+                futs[f] = anc
+                pending.add(f)
+            remain = end - loop.time()
+            if remain <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remain, return_when=asyncio.FIRST_COMPLETED)
+            for f in done:
+                try:
+                    routes, buf = f.result()
+                except Exception as e:
+                    metrics.inc("anchor_failed")
+                    log.warning(f"[executor] anchor {futs[f].get('name')} failed: {e}")
+                    continue
+                metrics.merge(buf)
+                yield futs[f], routes
+    finally:
+        for f in pending:
+            f.cancel()
+        if pending or waiting:
+            _log_dropped(len(pending) + len(waiting), len(anchors), deadline_s)
+
+
+async def run_anchors(anchors: List[Dict[str, Any]], target_km: float, tol: Optional[float],
+                      is_night: bool, deadline_s: float = ROUTE_DEADLINE_S,
+                      k: int = 3, profile_name: Optional[str] = None) -> List[tuple]:
+    """
+    앵커들을 병렬 처리
+    - 반환: [(anchor, routes)] — 마감 시간 안에 끝난 앵커만, 입력 순서 유지
+    """
+    order = {id(a): i for i, a in enumerate(anchors)}
+    results = [r async for r in iter_anchors(anchors, target_km, tol, is_night, deadline_s, k, profile_name)]
+    results.sort(key=lambda r: order[id(r[0])])
+    return results
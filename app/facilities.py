@@ -0,0 +1,125 @@
+# app/facilities.py
+"""
+로컬 시설 앵커 저장소 (육상 트랙 / 산책로 CSV → 격자 인덱스)
+- data/공공체육시설현황(육상).csv : 시설명, 트랙주로연장(m), WGS84위도/경도
+- data/인천광역시 미추홀구_산책로 현황_*.csv : 위치, 면적(제곱미터), 위도/경도
+- 두 파일 모두 CP949 인코딩
+- EPSG:3857 격자 인덱스(app.spatial.GridIndex)로 반경 질의 → search_anchors가 카카오 호출 전에 먼저 사용
+"""
+from __future__ import annotations
+import os, math, logging
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+import numpy as np
+from app.geostore import DATA_DIR
+from app.spatial import GridIndex
+from app.utils import to_mercator
+
+log = logging.getLogger("facilities")
+
+TRACKS_CSV = os.getenv("FACILITY_TRACKS_CSV", os.path.join(DATA_DIR, "공공체육시설현황(육상).csv"))
+TRAILS_CSV = os.getenv("FACILITY_TRAILS_CSV", os.path.join(DATA_DIR, "인천광역시 미추홀구_산책로 현황_2022-05-24.csv"))
+FACILITY_ENCODING = os.getenv("FACILITY_ENCODING", "cp949")
+_GRID_M = 500.0
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+TRACK, TRAIL = "track", "trail"
+# 앵커 키워드 → 로컬 시설 종류
+KEYWORD_KINDS = {"운동장": TRACK, "트랙": TRACK, "산책로": TRAIL}
+
+
+def _read(path: str, name_col: str, lat_col: str, lng_col: str, addr_cols: Sequence[str],
+          size_col: Optional[str]) -> pd.DataFrame:
+    import pandas as pd
+    df = pd.read_csv(path, encoding=FACILITY_ENCODING)
+    addr = None
+    for c in addr_cols:
+        if c in df.columns:
+            addr = df[c] if addr is None else addr.fillna(df[c])
+    return pd.DataFrame({
+        "name": df[name_col].astype(str),
+        "lat": pd.to_numeric(df[lat_col], errors="coerce"),
+        "lng": pd.to_numeric(df[lng_col], errors="coerce"),
+        "address": addr if addr is not None else None,
+        "size": pd.to_numeric(df[size_col], errors="coerce") if size_col in df.columns else np.nan,
+    })
+
+
+class FacilityStore:
+    """
+    시설 좌표는 NumPy 배열 + 격자 인덱스, 이름/주소는 리스트로 보관
+    - size: 트랙은 주로 연장(m), 산책로는 면적(㎡)
+    """
+    __slots__ = ("kinds", "names", "addresses", "lat", "lng", "size", "index")
+
+    def __init__(self, frames: Dict[str, pd.DataFrame]):
+        import pandas as pd
+        parts = [df.assign(kind=kind) for kind, df in frames.items() if df is not None and len(df)]
+        df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(
+            columns=["name", "lat", "lng", "address", "size", "kind"])
+        df = df[np.isfinite(df["lat"].to_numpy(dtype=float)) & np.isfinite(df["lng"].to_numpy(dtype=float))]
+        self.kinds = df["kind"].to_numpy(dtype=object)
+        self.names = df["name"].tolist()
+        self.addresses = [a if isinstance(a, str) else None for a in df["address"].tolist()]
+        self.lat = df["lat"].to_numpy(dtype=np.float64)
+        self.lng = df["lng"].to_numpy(dtype=np.float64)
+        self.size = df["size"].to_numpy(dtype=np.float64)
+        xs, ys = to_mercator(self.lng, self.lat)
+        self.index = GridIndex(np.asarray(xs), np.asarray(ys), cell_m=_GRID_M)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def near(self, lat: float, lng: float, radius_m: float, kind: Optional[str] = None,
+             limit: int = 10) -> List[Dict]:
+        """
+        (lat, lng) 반경 radius_m 이내 시설을 가까운 순으로 반환 (search_anchors 앵커 형식)
+        - EPSG:3857 거리는 위도에 따라 1/cos(lat)배 늘어나므로 반경/거리를 보정
+        """
+        if not len(self):
+            return []
+        k = 1.0 / math.cos(math.radians(lat))
+        x, y = to_mercator(lng, lat)
+        pos = self.index.query_radius(x, y, radius_m * k)
+        ids = self.index.ids[pos]
+        if kind is not None:
+            keep = self.kinds[ids] == kind
+            pos, ids = pos[keep], ids[keep]
+        d = np.hypot(self.index.xs[pos] - x, self.index.ys[pos] - y) / k
+        order = np.argsort(d, kind="stable")[:limit]
+        out = []
+        for j in order:
+            i = int(ids[j])
+            out.append({
+                "name": self.names[i],
+                "lat": float(self.lat[i]),
+                "lng": float(self.lng[i]),
+                "address": self.addresses[i],
+                "place_id": f"local:{self.kinds[i]}:{i}",
+                "distance_m": float(d[j]),
+                "size": None if np.isnan(self.size[i]) else float(self.size[i]),
+                "source": "local",
+            })
+        return out
+
+
+_STORE: Optional[FacilityStore] = None
+
+
+def load_facilities(tracks_csv: str = TRACKS_CSV, trails_csv: str = TRAILS_CSV) -> FacilityStore:
+    global _STORE
+    frames = {}
+    if os.path.exists(tracks_csv):
+        frames[TRACK] = _read(tracks_csv, "시설명", "WGS84위도", "WGS84경도",
+                              ("소재지도로명주소", "소재지지번주소"), "트랙주로연장(m)")
+    if os.path.exists(trails_csv):
+        frames[TRAIL] = _read(trails_csv, "위치", "위도", "경도", ("도로명주소",), "면적(제곱미터)")
+    _STORE = FacilityStore(frames)
+    log.info(f"[facilities] loaded tracks={len(frames.get(TRACK, ()))} trails={len(frames.get(TRAIL, ()))} "
+             f"indexed={len(_STORE)}")
+    return _STORE
+
+
+def get_facilities() -> FacilityStore:
+    return _STORE if _STORE is not None else load_facilities()
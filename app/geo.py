@@ -1,55 +1,174 @@
 # app/geo.py
 # 지오코딩 히트 수 로그
-import httpx, os, logging
+# - 모듈 전역 httpx.AsyncClient 하나를 재사용 (keep-alive, 가능하면 HTTP/2)
+# - 앵커 키워드 검색은 세마포어로 동시 요청 수를 제한해 병렬 전송
+# - 결과는 LRU+TTL 캐시 (정규화 질의 + 반올림 좌표/반경 키)
+# - 지오코딩은 로컬 저장소(app.geostore)를 먼저 조회하고, 온라인 결과는 저장소에 다시 기록
+# - 운동장/트랙/산책로 앵커는 로컬 시설 인덱스(app.facilities)에 반경 내 결과가 있으면 카카오 호출 생략
+import httpx, os, asyncio, logging
 from typing import Optional, Dict, Any, List
 from app.models import LatLng
+from app.cache import TTLCache, MISSING
+from app.geostore import get_geostore
+from app.facilities import KEYWORD_KINDS, get_facilities
+from app import metrics
 
 log = logging.getLogger("geo")
 KAKAO_KEY = os.getenv("KAKAO_REST_API_KEY")
 HEADERS = {"Authorization": f"KakaoAK {KAKAO_KEY}"}
+# 로컬 대역 서버로 바꿔 테스트할 수 있도록 베이스 URL 분리
+KAKAO_BASE_URL = os.getenv("KAKAO_BASE_URL", "https://dapi.kakao.com")
+KEYWORD_PATH = "/v2/local/search/keyword.json"
+KAKAO_CONCURRENCY = int(os.getenv("KAKAO_CONCURRENCY", "4"))
+GEO_CACHE_TTL_S = float(os.getenv("GEO_CACHE_TTL_S", "3600"))
+GEO_CACHE_SIZE = int(os.getenv("GEO_CACHE_SIZE", "4096"))
+LOCAL_ANCHORS = os.getenv("LOCAL_ANCHORS", "1") == "1"
+
+_GEOCODE_CACHE = TTLCache(GEO_CACHE_SIZE, GEO_CACHE_TTL_S)
+_KEYWORD_CACHE = TTLCache(GEO_CACHE_SIZE, GEO_CACHE_TTL_S)
+
+_CLIENT: Optional[httpx.AsyncClient] = None
+_SEM: Optional[asyncio.Semaphore] = None
+_LOOP = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (httpx의 HTTP/2 지원은 h2 패키지 필요)
+        return True
+    except ImportError:
+        return False
+
+
+def _client() -> httpx.AsyncClient:
+    """이벤트 루프당 1개의 풀링 클라이언트 (루프가 바뀌면 새로 생성)"""
+    global _CLIENT, _SEM, _LOOP
+    loop = asyncio.get_running_loop()
+    if _CLIENT is None or _LOOP is not loop:
+        _CLIENT = httpx.AsyncClient(
+            base_url=KAKAO_BASE_URL, headers=HEADERS, timeout=10,
+            http2=_http2_available(),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30),
+        )
+        _SEM = asyncio.Semaphore(KAKAO_CONCURRENCY)
+        _LOOP = loop
+    return _CLIENT
+
+
+async def aclose_client() -> None:
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
+
+def _norm_query(q: str) -> str:
+    return " ".join(q.split()).lower()
+
+
+async def _keyword(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    client = _client()
+    async with _SEM:
+        with metrics.timed("kakao_http"):
+            r = await client.get(KEYWORD_PATH, params=params)
+    r.raise_for_status()
+    return r.json().get("documents", [])
 
 
 async def geocode_location(query: str) -> Optional[LatLng]:
-    url = "https://dapi.kakao.com/v2/local/search/keyword.json"
-    params = {"query": query, "size": 1}
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.get(url, params=params, headers=HEADERS)
-        r.raise_for_status()
-        docs = r.json().get("documents", [])
-        log.info(f"[geocode] query={query}, hits={len(docs)}")
-        if not docs:
-            return None
+    with metrics.timed("geocode"):
+        return await _geocode(query)
+
+
+async def _geocode(query: str) -> Optional[LatLng]:
+    local = get_geostore().lookup(query)
+    if local is not None:
+        metrics.inc("geocode_local")
+        log.info(f"[geocode] query={query}, local={'hit' if local.found else 'not_found'}")
+        return local.to_latlng()
+
+    key = _norm_query(query)
+    hit = _GEOCODE_CACHE.get(key)
+    if hit is not MISSING:
+        metrics.inc("geocode_cache")
+        return hit
+
+    metrics.inc("geocode_online")
+    docs = await _keyword({"query": query, "size": 1})
+    log.info(f"[geocode] query={query}, hits={len(docs)}")
+    res = None
+    if docs:
         d = docs[0]
-        return LatLng(
+        res = LatLng(
             lat=float(d["y"]), lng=float(d["x"]),
             place_id=d.get("id"), name=d.get("place_name"),
             address=d.get("road_address_name") or d.get("address_name")
         )
-    
-    
+    _GEOCODE_CACHE.set(key, res)
+    get_geostore().record(query, res)
+    return res
+
+
+async def _anchor_docs(kw: str, center_lng: float, center_lat: float,
+                       radius: int, size: int) -> List[Dict[str, Any]]:
+    key = (_norm_query(kw), round(center_lat, 3), round(center_lng, 3), radius, size)
+    hit = _KEYWORD_CACHE.get(key)
+    if hit is not MISSING:
+        metrics.inc("anchor_kw_cache")
+        return hit
+    metrics.inc("anchor_kw_online")
+    params = {"query": kw, "x": center_lng, "y": center_lat, "radius": radius, "size": size, "page": 1}
+    docs = await _keyword(params)
+    _KEYWORD_CACHE.set(key, docs)
+    return docs
+
+
+def _local_anchors(kw: str, center_lng: float, center_lat: float,
+                   radius: int, size: int) -> List[Dict[str, Any]]:
+    kind = KEYWORD_KINDS.get(kw) if LOCAL_ANCHORS else None
+    if kind is None:
+        return []
+    try:
+        return [dict(a, keyword=kw) for a in get_facilities().near(center_lat, center_lng, radius, kind, size)]
+    except Exception as e:
+        log.warning(f"[anchors] local index failed: {e}")
+        return []
+
+
 async def search_anchors(center_lng: float, center_lat: float,
                          keywords: List[str], radius: int = 3000, size: int = 10) -> List[Dict[str, Any]]:
-    url = "https://dapi.kakao.com/v2/local/search/keyword.json"
+    with metrics.timed("anchors"):
+        return await _search_anchors(center_lng, center_lat, keywords, radius, size)
+
+
+async def _search_anchors(center_lng: float, center_lat: float,
+                          keywords: List[str], radius: int, size: int) -> List[Dict[str, Any]]:
+    kws = keywords[:7]
+    # 로컬 시설 인덱스에서 먼저 찾고, 반경 내 결과가 없는 키워드만 카카오로 검색
+    local = {kw: _local_anchors(kw, center_lng, center_lat, radius, size) for kw in kws}
+    online = [kw for kw in kws if not local[kw]]
+    metrics.inc("anchor_kw_local", len(kws) - len(online))
+    results = dict(zip(online, await asyncio.gather(
+        *[_anchor_docs(kw, center_lng, center_lat, radius, size) for kw in online])))
     anchors=[]
-    async with httpx.AsyncClient(timeout=10) as client:
-        for kw in keywords[:7]:
-            params = {"query": kw, "x": center_lng, "y": center_lat, "radius": radius, "size": size, "page": 1}
-            r = await client.get(url, params=params, headers=HEADERS)
-            r.raise_for_status()
-            for d in r.json().get("documents", []):
-                anchors.append({
-                    "name": d.get("place_name"),
-                    "lat": float(d["y"]),
-                    "lng": float(d["x"]),
-                    "address": d.get("road_address_name") or d.get("address_name"),
-                    "place_id": d.get("id"),
-                    "keyword": kw
-                })
+    for kw in kws:
+        if local[kw]:
+            anchors += local[kw]
+            continue
+        for d in results[kw]:
+            anchors.append({
+                "name": d.get("place_name"),
+                "lat": float(d["y"]),
+                "lng": float(d["x"]),
+                "address": d.get("road_address_name") or d.get("address_name"),
+                "place_id": d.get("id"),
+                "keyword": kw
+            })
     # 좌표 근접 중복 제거
     seen=set(); dedup=[]
     for a in anchors:
         k=(round(a["lat"],5), round(a["lng"],5))
         if k in seen: continue
         seen.add(k); dedup.append(a)
-    log.info(f"[anchors] kw={keywords} -> {len(dedup)}")
-    return dedup
\ No newline at end of file
+    log.info(f"[anchors] kw={keywords} local={len(kws) - len(online)}/{len(kws)} -> {len(dedup)}")
+    return dedup
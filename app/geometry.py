@@ -0,0 +1,140 @@
+# app/geometry.py
+"""
+경로 지오메트리 출력 단계 (좌표 → 응답용 polyline)
+- 단순화: Douglas–Peucker (허용 오차는 미터, 위도 기준 국소 평면 근사로 pyproj 없이 계산)
+- 인코딩: 여러 경로를 한 번에 처리하는 NumPy 벡터화 구글 polyline 인코더 (polyline 패키지와 같은 출력)
+- 상세도: 지도 줌 → 화면 픽셀 크기 기준 허용 오차 (줌이 없으면 POLYLINE_TOL_M)
+- 경로 좌표는 (n, 2) [lat, lng] float 배열로 주고받는다 (route_anchor / 루프 카탈로그 공통)
+"""
+import os, math
+from typing import List, Optional, Sequence
+import numpy as np
+
+POLYLINE_TOL_M = float(os.getenv("POLYLINE_TOL_M", "2.0"))       # 줌 미지정 시 단순화 허용 오차(m), 0이면 원본
+POLYLINE_PX_TOL = float(os.getenv("POLYLINE_PX_TOL", "0.5"))     # 줌 지정 시 허용 오차 = 픽셀 크기 x 이 값
+DEFAULT_PRECISION = 5
+
+_M_PER_DEG_LAT = 111111.0
+_M_PER_PX_Z0 = 156543.03392    # Web Mercator 줌 0의 적도 기준 픽셀 크기(m)
+_MAX_CHUNKS = 7                # 5비트 묶음 최대 개수 (precision 7, 경도 ±180까지)
+_DP_NUMPY_MIN = 64             # 구간 점 수가 이보다 적으면 NumPy 호출 오버헤드가 더 커서 스칼라 루프 사용
+
+
+def _farthest(xs: List[float], ys: List[float], s: int, e: int):
+    """구간 (s, e) 안에서 선분 s-e까지 가장 먼 점과 거리 제곱 (짧은 구간용)"""
+    x0, y0 = xs[s], ys[s]
+    dx, dy = xs[e] - x0, ys[e] - y0
+    L2 = dx * dx + dy * dy
+    best, bi = -1.0, s + 1
+    for m in range(s + 1, e):
+        px, py = xs[m] - x0, ys[m] - y0
+        if L2 > 0:
+            t = (px * dx + py * dy) / L2
+            t = 0.0 if t < 0 else (1.0 if t > 1 else t)
+            px -= t * dx
+            py -= t * dy
+        d = px * px + py * py
+        if d > best:
+            best, bi = d, m
+    return bi, best
+
+
+def tolerance_for(zoom: Optional[float], lat: float) -> float:
+    """줌 → 단순화 허용 오차(m). 줌이 없으면 기본값"""
+    if zoom is None:
+        return POLYLINE_TOL_M
+    return POLYLINE_PX_TOL * _M_PER_PX_Z0 * math.cos(math.radians(lat)) / (2.0 ** zoom)
+
+
+def simplify_mask(coords: np.ndarray, tol_m: float) -> np.ndarray:
+    """
+    Douglas–Peucker로 남길 점 마스크 (양 끝점은 항상 유지)
+    - 긴 구간은 선분까지 거리를 NumPy로 한 번에, 짧은 구간은 스칼라 루프로 계산 (재귀 대신 스택)
+    - 루프처럼 시작점 = 끝점인 구간도 선분 거리(점까지 거리)로 처리
+    """
+    n = len(coords)
+    keep = np.zeros(n, dtype=bool)
+    if n < 3 or tol_m <= 0:
+        keep[:] = True
+        return keep
+    lat0 = float(coords[:, 0].mean())
+    xy = np.column_stack([coords[:, 1] * (_M_PER_DEG_LAT * math.cos(math.radians(lat0))),
+                          coords[:, 0] * _M_PER_DEG_LAT])
+    xs, ys = xy[:, 0].tolist(), xy[:, 1].tolist()
+    keep[0] = keep[-1] = True
+    tol2 = tol_m * tol_m
+    stack = [(0, n - 1)]
+    while stack:
+        s, e = stack.pop()
+        if e - s < 2:
+            continue
+        if e - s - 1 < _DP_NUMPY_MIN:
+            m, dmax = _farthest(xs, ys, s, e)
+        else:
+            seg = xy[e] - xy[s]
+            pts = xy[s + 1:e] - xy[s]
+            L2 = float(seg @ seg)
+            t = np.clip(pts @ seg / L2, 0.0, 1.0) if L2 > 0 else np.zeros(len(pts))
+            d = pts - t[:, None] * seg
+            d2 = np.einsum("ij,ij->i", d, d)
+            i = int(np.argmax(d2))
+            m, dmax = s + 1 + i, float(d2[i])
+        if dmax > tol2:
+            keep[m] = True
+            stack.append((s, m))
+            stack.append((m, e))
+    return keep
+
+
+def simplify(coords: np.ndarray, tol_m: float) -> np.ndarray:
+    return coords[simplify_mask(coords, tol_m)]
+
+
+def _round_half_away(v: np.ndarray) -> np.ndarray:
+    # polyline 패키지와 같은 반올림 (0.5는 0에서 먼 쪽)
+    return (np.sign(v) * np.floor(np.abs(v) + 0.5)).astype(np.int64)
+
+
+def encode_polylines(routes: Sequence[np.ndarray], precision: int = DEFAULT_PRECISION) -> List[str]:
+    """
+    여러 경로 [(n_i, 2) lat/lng] → 구글 polyline 문자열 목록 (한 번의 벡터 연산)
+    - 정수화 → 경로별 차분(첫 점은 원점 기준) → zigzag → 5비트 묶음 + 연속 비트 → +63
+    """
+    if not len(routes):
+        return []
+    counts = np.array([len(r) for r in routes], dtype=np.int64)
+    if not counts.sum():
+        return [""] * len(routes)
+    q = _round_half_away(np.concatenate([np.asarray(r, dtype=np.float64).reshape(-1, 2) for r in routes])
+                         * (10 ** precision))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    d = q.copy()
+    d[1:] -= q[:-1]
+    nz = starts[counts > 0]
+    d[nz] = q[nz]
+    v = d.ravel()                                   # lat, lng 교대로
+    z = ((v << 1) ^ (v >> 63)).astype(np.uint64)    # zigzag (음수는 비트 반전)
+
+    shifts = np.arange(_MAX_CHUNKS, dtype=np.uint64) * np.uint64(5)
+    nch = 1 + (z[:, None] >= (np.uint64(1) << shifts[1:])[None, :]).sum(axis=1)
+    chunks = (z[:, None] >> shifts[None, :]) & np.uint64(31)
+    j = np.arange(_MAX_CHUNKS)[None, :]
+    chars = chunks + np.where(j < (nch - 1)[:, None], 0x20, 0) + 63
+    flat = chars[j < nch[:, None]].astype(np.uint8).tobytes()
+
+    # 경로별 문자 수 = 해당 경로 값들의 묶음 수 합
+    per_route = np.zeros(len(routes), dtype=np.int64)
+    has = counts > 0
+    per_route[has] = np.add.reduceat(nch, 2 * starts[has])
+    off = np.concatenate([[0], np.cumsum(per_route)])
+    return [flat[off[i]:off[i + 1]].decode("ascii") for i in range(len(routes))]
+
+
+def render_polylines(routes: Sequence[np.ndarray], zoom: Optional[float] = None,
+                     precision: int = DEFAULT_PRECISION) -> List[str]:
+    """응답용 polyline: 줌(또는 기본) 허용 오차로 단순화 → 배치 인코딩"""
+    out = []
+    for r in routes:
+        r = np.asarray(r, dtype=np.float64).reshape(-1, 2)
+        out.append(simplify(r, tolerance_for(zoom, float(r[0, 0]))) if len(r) else r)
+    return encode_polylines(out, precision)
@@ -0,0 +1,205 @@
+# app/geostore.py
+"""
+로컬 지오코딩 저장소 (HTTP 호출 전에 먼저 조회)
+- 시드: data/kakao_geocode_results.json (원본 지명 → status/좌표), data/normalized_courses.json
+- 색인: 원문 정확 일치 → 정규화 일치(공백/기호 제거, 소문자) → 정규화 접두 일치(좌표가 있는 항목이 하나일 때만)
+- 부정 결과(not_found)는 온라인 조회로 기록된 것만 GEOCODE_NEGATIVE_TTL_S 동안 신뢰 (시드의 부정 결과는
+  오프라인 일괄 조회 당시 값이라 카카오 재조회를 막지 않음)
+- 새 온라인 결과는 GEOCODE_STORE_PATH(JSONL)에 한 줄씩 추가 기록 → 다음 기동 때 함께 로딩
+"""
+from __future__ import annotations
+import os, re, json, time, bisect, logging, threading
+from typing import Dict, List, Optional
+from app.models import LatLng
+
+log = logging.getLogger("geostore")
+
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"))
+GEOCODE_RESULTS_JSON = os.getenv("GEOCODE_RESULTS_JSON", os.path.join(DATA_DIR, "kakao_geocode_results.json"))
+COURSES_JSON = os.getenv("COURSES_JSON", os.path.join(DATA_DIR, "normalized_courses.json"))
+GEOCODE_STORE_PATH = os.getenv("GEOCODE_STORE_PATH", os.path.join(DATA_DIR, "geocode_store.jsonl"))
+GEOCODE_TRUST_NEGATIVE = os.getenv("GEOCODE_TRUST_NEGATIVE", "1") == "1"        # 온라인 기록 부정 결과 신뢰 여부
+GEOCODE_NEGATIVE_TTL_S = float(os.getenv("GEOCODE_NEGATIVE_TTL_S", str(24 * 3600)))  # 신뢰 기간(초)
+
+_NORM_RE = re.compile(r"[\s\-~·・,./()\[\]_]+")
+
+
+def normalize_name(s: str) -> str:
+    """지명 정규화: 공백/구분기호 제거 + 소문자"""
+    return _NORM_RE.sub("", s or "").lower()
+
+
+class GeoEntry:
+    __slots__ = ("name", "found", "lat", "lng", "address", "place_id", "place_name", "ts")
+
+    def __init__(self, name: str, found: bool, lat: Optional[float] = None, lng: Optional[float] = None,
+                 address: Optional[str] = None, place_id: Optional[str] = None,
+                 place_name: Optional[str] = None, ts: Optional[float] = None):
+        self.name = name
+        self.found = found
+        self.lat, self.lng = lat, lng
+        self.address = address
+        self.place_id = place_id
+        self.place_name = place_name
+        self.ts = ts    # 온라인 조회 기록 시각 (시드 항목은 None)
+
+    def trusted_negative(self, now: Optional[float] = None) -> bool:
+        """온라인으로 기록된 not_found이고 TTL 안일 때만 True"""
+        if self.found or self.ts is None or not GEOCODE_TRUST_NEGATIVE:
+            return False
+        return (now or time.time()) - self.ts < GEOCODE_NEGATIVE_TTL_S
+
+    def to_latlng(self) -> Optional[LatLng]:
+        if not self.found:
+            return None
+        return LatLng(lat=self.lat, lng=self.lng, place_id=self.place_id,
+                      name=self.place_name or self.name, address=self.address)
+
+    def to_json(self) -> Dict:
+        d = dict(original=self.name, status="ok" if self.found else "not_found",
+                 lat=self.lat, lng=self.lng, address=self.address,
+                 place_id=self.place_id, kakao_name=self.place_name)
+        if self.ts is not None:
+            d["ts"] = round(self.ts, 3)
+        return d
+
+    @classmethod
+    def from_json(cls, d: Dict) -> Optional["GeoEntry"]:
+        """시드/기록 레코드 → GeoEntry (좌표 키는 lat/lng 또는 y/x 모두 허용)"""
+        name = d.get("original") or d.get("course_name") or d.get("name")
+        if not name:
+            return None
+        lat = d.get("lat", d.get("y"))
+        lng = d.get("lng", d.get("x"))
+        ts = d.get("ts")
+        ts = float(ts) if ts is not None else None
+        found = d.get("status", "ok") != "not_found" and lat is not None and lng is not None
+        if found:
+            return cls(name, True, float(lat), float(lng),
+                       d.get("address") or d.get("road_address_name") or d.get("address_name"),
+                       d.get("place_id") or d.get("id"),
+                       d.get("kakao_name") or d.get("place_name"), ts)
+        if d.get("status") == "not_found":
+            return cls(name, False, ts=ts)
+        return None
+
+
+class GeoStore:
+    """정확/정규화/접두 색인을 가진 지명 저장소"""
+
+    def __init__(self, store_path: Optional[str] = GEOCODE_STORE_PATH):
+        self.store_path = store_path
+        self._exact: Dict[str, GeoEntry] = {}
+        self._norm: Dict[str, GeoEntry] = {}
+        self._keys: List[str] = []     # 정규화 키 정렬 목록 (접두 검색)
+        self._lock = threading.Lock()
+        self.names: List[str] = []     # 알려진 코스/지명 (LLM 규칙 파서 사전 등)
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def _put(self, e: GeoEntry) -> None:
+        if e.name not in self._exact:
+            self.names.append(e.name)
+        self._exact[e.name] = e
+        k = normalize_name(e.name)
+        if not k:
+            return
+        old = self._norm.get(k)
+        # 같은 정규화 키라면 좌표가 있는 항목을 우선
+        if old is None or e.found or not old.found:
+            self._norm[k] = e
+        if old is None:
+            bisect.insort(self._keys, k)
+
+    def load_records(self, records) -> int:
+        n = 0
+        for d in records:
+            e = GeoEntry.from_json(d) if isinstance(d, dict) else None
+            if e is not None:
+                self._put(e); n += 1
+        return n
+
+    def load_json(self, path: str) -> int:
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path, encoding="utf-8") as f:
+            return self.load_records(json.load(f))
+
+    def load_jsonl(self, path: str) -> int:
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path, encoding="utf-8") as f:
+            return self.load_records(json.loads(line) for line in f if line.strip())
+
+    def add_names(self, names) -> None:
+        seen = set(self.names)
+        for nm in names:
+            if nm and nm not in seen:
+                self.names.append(nm); seen.add(nm)
+
+    def lookup(self, query: str) -> Optional[GeoEntry]:
+        """
+        로컬 조회
+        - 반환: GeoEntry (found=False면 신뢰할 수 있는 부정 결과), 모르거나 재조회가 필요하면 None
+        """
+        e = self._exact.get(query)
+        if e is None:
+            k = normalize_name(query)
+            if not k:
+                return None
+            e = self._norm.get(k)
+            if e is None:
+                # 접두 일치: 좌표가 있는 후보가 정확히 하나일 때만 채택
+                i = bisect.bisect_left(self._keys, k)
+                hits = []
+                while i < len(self._keys) and self._keys[i].startswith(k) and len(hits) < 2:
+                    c = self._norm[self._keys[i]]
+                    if c.found:
+                        hits.append(c)
+                    i += 1
+                e = hits[0] if len(hits) == 1 else None
+        if e is not None and not e.found and not e.trusted_negative():
+            return None
+        return e
+
+    def record(self, query: str, res: Optional[LatLng]) -> None:
+        """온라인 결과를 메모리 색인에 반영하고 JSONL에 한 줄 추가"""
+        now = time.time()
+        if res is None:
+            e = GeoEntry(query, False, ts=now)
+        else:
+            e = GeoEntry(query, True, res.lat, res.lng, res.address, res.place_id, res.name, now)
+        with self._lock:
+            self._put(e)
+            if not self.store_path:
+                return
+            try:
+                with open(self.store_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(e.to_json(), ensure_ascii=False) + "\n")
+            except OSError as ex:
+                log.warning(f"[geostore] write-back failed: {ex}")
+
+
+_STORE: Optional[GeoStore] = None
+
+
+def load_geostore() -> GeoStore:
+    """시드 파일 + 누적 기록(JSONL)을 읽어 전역 저장소 구성"""
+    global _STORE
+    st = GeoStore()
+    n_seed = st.load_json(GEOCODE_RESULTS_JSON)
+    n_course = 0
+    if os.path.exists(COURSES_JSON):
+        with open(COURSES_JSON, encoding="utf-8") as f:
+            courses = json.load(f)
+        n_course = st.load_records(c for c in courses if "lat" in c or "y" in c)
+        st.add_names(c.get("course_name") for c in courses)
+    n_rec = st.load_jsonl(GEOCODE_STORE_PATH)
+    _STORE = st
+    log.info(f"[geostore] loaded seed={n_seed} courses={n_course} recorded={n_rec} total={len(st)}")
+    return st
+
+
+def get_geostore() -> GeoStore:
+    return _STORE if _STORE is not None else load_geostore()
@@ -0,0 +1,401 @@
+# app/graphstore.py
+"""
+보행(walk) 그래프 타일 캐시
+- 격자 셀(GRAPH_TILE_DEG 단위 위경도 격자) 하나를 타일 1개로 보고 디스크에 pickle로 저장
+- 메모리 LRU (pickle 바이트 크기 기준 축출)
+- 요청 반경에 필요한 타일만 이어붙인(compose) 뒤 bbox로 잘라서 반환
+- 로컬 .osm / .pbf 추출본에서 타일을 한 번에 생성 (Overpass 호출 없이)
+
+타일 조회 순서: 메모리 LRU → 디스크 타일 → (허용 시) Overpass로 생성 후 저장
+- 디스크 타일 폴더 이름에 타일 버전(보존 태그 + 스키마 번호 해시)을 넣어, 태그가 바뀌면 예전 타일을 쓰지 않음
+- Overpass 오류(타임아웃/429/DNS 등)는 저장하지 않고 그대로 올림 → 빈 타일은 "영역에 보행 그래프 없음"일 때만 기록
+- 타일 생성 시 공원/수역 폴리곤·수로(PARK_WATER_TAGS)와 간선 중간점을 교차 판정해 간선 속성 park_water로 저장
+  (OSM 공원 보행로는 대부분 이름이 없어 이름 접미사만으로는 판정이 안 됨, app.pathengine 참고)
+"""
+from __future__ import annotations
+import os, math, json, pickle, hashlib, logging, threading, argparse
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Optional, Tuple
+import numpy as np
+import networkx as nx
+
+if TYPE_CHECKING:
+    import geopandas as gpd
+
+log = logging.getLogger("graphstore")
+
+GRAPH_TILE_DEG = float(os.getenv("GRAPH_TILE_DEG", "0.02"))          # 서울 기준 약 2.2km x 1.8km
+GRAPH_TILE_MARGIN_M = float(os.getenv("GRAPH_TILE_MARGIN_M", "150"))  # 타일 경계 간선 연결용 여유
+GRAPH_CACHE_DIR = os.getenv("GRAPH_CACHE_DIR", "/mnt/data/graph_tiles")
+GRAPH_CACHE_MAX_MB = float(os.getenv("GRAPH_CACHE_MAX_MB", "512"))
+GRAPH_FETCH_ONLINE = os.getenv("GRAPH_FETCH_ONLINE", "1") == "1"
+PARK_WATER_BUFFER_M = float(os.getenv("PARK_WATER_BUFFER_M", "25"))   # 폴리곤/수로에서 이 거리 안 간선도 포함 (강변길)
+
+_M_PER_DEG_LAT = 111111.0
+_CRS = "epsg:4326"
+
+# 경로 피처용으로 타일에 보존하는 OSM 태그 (신호등 횡단보도 / 공원·수변 간선, app.pathengine 참고)
+TILE_NODE_TAGS = ("crossing",)
+TILE_WAY_TAGS = ("leisure", "waterway")
+# 공원·수변 판정용 OSM 피처 (폴리곤 + 수로 선)
+PARK_WATER_TAGS = {
+    "leisure": ["park", "garden", "nature_reserve", "recreation_ground"],
+    "landuse": ["grass", "recreation_ground", "forest", "meadow", "village_green"],
+    "natural": ["water", "wood"],
+    "waterway": ["river", "riverbank", "stream", "canal"],
+}
+TILE_SCHEMA = 2   # 태그 외에 타일 내용(간선 속성 등)이 바뀌면 올림 (2: park_water 간선 속성)
+
+TileKey = Tuple[int, int]
+
+
+def _tile_key(lat: float, lng: float, tile_deg: float = GRAPH_TILE_DEG) -> TileKey:
+    return int(math.floor(lng / tile_deg)), int(math.floor(lat / tile_deg))
+
+
+def _tile_bbox(key: TileKey, tile_deg: float = GRAPH_TILE_DEG) -> Tuple[float, float, float, float]:
+    """타일 bbox (south, west, north, east)"""
+    ix, iy = key
+    return iy * tile_deg, ix * tile_deg, (iy + 1) * tile_deg, (ix + 1) * tile_deg
+
+
+def _expand_bbox(bbox, margin_m: float):
+    s, w, n, e = bbox
+    dlat = margin_m / _M_PER_DEG_LAT
+    dlng = margin_m / (_M_PER_DEG_LAT * math.cos(math.radians((s + n) / 2)))
+    return s - dlat, w - dlng, n + dlat, e + dlng
+
+
+def bbox_around(lat: float, lng: float, dist_m: float):
+    """중심점 기준 dist_m 반경을 덮는 bbox (south, west, north, east)"""
+    return _expand_bbox((lat, lng, lat, lng), dist_m)
+
+
+def crop_graph(G: nx.MultiDiGraph, bbox) -> nx.MultiDiGraph:
+    """bbox 안에 있는 노드만 남긴 부분 그래프 (osmnx 버전과 무관하게 동작)"""
+    s, w, n, e = bbox
+    keep = [u for u, d in G.nodes(data=True) if s <= d["y"] <= n and w <= d["x"] <= e]
+    return G.subgraph(keep).copy()
+
+
+def crop_graph_by_edge(G: nx.MultiDiGraph, bbox) -> nx.MultiDiGraph:
+    """bbox 안 노드에 닿는 간선을 모두 남긴 부분 그래프 (경계를 넘는 간선은 바깥 끝점까지 포함)"""
+    s, w, n, e = bbox
+    inside = [u for u, d in G.nodes(data=True) if s <= d["y"] <= n and w <= d["x"] <= e]
+    keep = set(inside)
+    H = G.edge_subgraph([(u, v, k) for u, v, k in G.edges(keys=True) if u in keep or v in keep]).copy()
+    H.add_nodes_from((u, G.nodes[u]) for u in inside if u not in H)   # 간선 없는 노드
+    return H
+
+
+def _empty_graph() -> nx.MultiDiGraph:
+    return nx.MultiDiGraph(crs=_CRS)
+
+
+def tile_version() -> str:
+    """보존 태그 + 스키마 번호 해시 (디스크 타일 폴더 이름에 사용)"""
+    spec = json.dumps([TILE_SCHEMA, TILE_NODE_TAGS, TILE_WAY_TAGS, PARK_WATER_TAGS, PARK_WATER_BUFFER_M])
+    return hashlib.sha1(spec.encode()).hexdigest()[:8]
+
+
+def _configure_osmnx():
+    import osmnx as ox
+    ox.settings.useful_tags_node = list(dict.fromkeys(list(ox.settings.useful_tags_node) + list(TILE_NODE_TAGS)))
+    ox.settings.useful_tags_way = list(dict.fromkeys(list(ox.settings.useful_tags_way) + list(TILE_WAY_TAGS)))
+    return ox
+
+
+def _is_empty_area(ex: Exception) -> bool:
+    """osmnx 예외가 '영역에 보행 그래프 없음'인지 (네트워크/서버 오류나 깨진 응답과 구분)"""
+    if type(ex).__name__ in ("InsufficientResponseError", "EmptyOverpassResponse"):
+        return ex.__cause__ is None    # JSON 파싱 실패 등은 원인 예외가 걸려 있음
+    return isinstance(ex, ValueError) and "no graph nodes" in str(ex).lower()
+
+
+def _edge_midpoints(G: nx.MultiDiGraph, edges) -> np.ndarray:
+    """간선 중간점 (lng, lat) — geometry가 있으면 선을 따라 절반 지점, 없으면 양 끝 노드의 중점"""
+    mids = np.empty((len(edges), 2), dtype=np.float64)
+    for i, (u, v, _, d) in enumerate(edges):
+        geom = d.get("geometry")
+        if geom is not None:
+            p = geom.interpolate(0.5, normalized=True)
+            mids[i] = p.x, p.y
+        else:
+            a, b = G.nodes[u], G.nodes[v]
+            mids[i] = (a["x"] + b["x"]) / 2, (a["y"] + b["y"]) / 2
+    return mids
+
+
+def annotate_park_water(G: nx.MultiDiGraph, features: Optional["gpd.GeoDataFrame"],
+                        buffer_m: float = PARK_WATER_BUFFER_M) -> int:
+    """
+    간선 중간점이 공원/수역 피처(buffer_m 여유)와 겹치는지 → 간선 속성 park_water(bool)
+    - features: PARK_WATER_TAGS로 받은 OSM 피처 (EPSG:4326). None/빈 값이면 모든 간선 False
+    - 판정은 EPSG:3857 STRtree 질의 (버퍼는 위도 배율 보정)
+    - 반환: park_water=True 간선 수
+    """
+    import shapely
+    from app.utils import to_mercator
+    edges = list(G.edges(keys=True, data=True))
+    if not edges:
+        return 0
+    hit = np.zeros(len(edges), dtype=bool)
+    if features is not None and len(features):
+        gdf = features if features.crs is not None else features.set_crs("EPSG:4326")
+        geoms = gdf.to_crs("EPSG:3857").geometry.values
+        geoms = np.asarray([g for g in geoms if g is not None and not g.is_empty], dtype=object)
+        if len(geoms):
+            mids = _edge_midpoints(G, edges)
+            scale = 1.0 / math.cos(math.radians(float(mids[:, 1].mean())))
+            tree = shapely.STRtree(shapely.buffer(geoms, buffer_m * scale))
+            x, y = to_mercator(mids[:, 0], mids[:, 1])
+            idx = tree.query(shapely.points(np.asarray(x), np.asarray(y)), predicate="intersects")
+            hit[idx[0]] = True
+    nx.set_edge_attributes(G, {(u, v, k): bool(h) for (u, v, k, _), h in zip(edges, hit)}, "park_water")
+    return int(hit.sum())
+
+
+class GraphStore:
+    """
+    타일 단위 보행 그래프 저장소
+    - cache_dir: 타일 pickle 저장 폴더 (None이면 디스크 캐시 미사용)
+    - max_bytes: 메모리 LRU 상한 (타일 pickle 크기 합)
+    - fetch_online: 디스크에 없는 타일을 Overpass로 받아올지 여부
+    """
+
+    def __init__(self, cache_dir: Optional[str] = GRAPH_CACHE_DIR,
+                 max_bytes: int = int(GRAPH_CACHE_MAX_MB * 1024 * 1024),
+                 tile_deg: float = GRAPH_TILE_DEG,
+                 fetch_online: bool = GRAPH_FETCH_ONLINE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.tile_deg = tile_deg
+        self.fetch_online = fetch_online
+        self._lru: "OrderedDict[TileKey, Tuple[nx.MultiDiGraph, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = dict(mem_hit=0, disk_hit=0, built=0, evicted=0)
+
+    # ---------- 경로/직렬화 ----------
+    def _tile_path(self, key: TileKey) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        sub = os.path.join(self.cache_dir, f"walk_{self.tile_deg:g}_{tile_version()}")
+        return os.path.join(sub, f"{key[0]}_{key[1]}.pkl")
+
+    def _write_tile(self, key: TileKey, blob: bytes) -> None:
+        path = self._tile_path(key)
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)  # 여러 워커가 동시에 써도 원자적으로 교체
+
+    def _read_tile(self, key: TileKey) -> Optional[bytes]:
+        path = self._tile_path(key)
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    # ---------- 메모리 LRU ----------
+    def _remember(self, key: TileKey, G: nx.MultiDiGraph, nbytes: int) -> None:
+        with self._lock:
+            if key in self._lru:
+                self._bytes -= self._lru.pop(key)[1]
+            self._lru[key] = (G, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._lru) > 1:
+                _, (_, nb) = self._lru.popitem(last=False)
+                self._bytes -= nb
+                self.stats["evicted"] += 1
+
+    def _lookup(self, key: TileKey) -> Optional[nx.MultiDiGraph]:
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit is None:
+                return None
+            self._lru.move_to_end(key)
+            self.stats["mem_hit"] += 1
+            return hit[0]
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._bytes
+
+    # ---------- 타일 생성 ----------
+    def put_tile(self, key: TileKey, G: nx.MultiDiGraph) -> None:
+        """타일 그래프를 디스크/메모리에 저장"""
+        blob = pickle.dumps(G, protocol=pickle.HIGHEST_PROTOCOL)
+        self._write_tile(key, blob)
+        self._remember(key, G, len(blob))
+
+    def put_graph(self, G: nx.MultiDiGraph) -> int:
+        """
+        큰 그래프(추출본 등)를 타일 단위로 잘라 저장
+        - 타일마다 GRAPH_TILE_MARGIN_M 만큼 여유를 둔 bbox에 끝점 하나라도 걸친 간선은 모두 보존
+          (여유보다 긴 경계 간선도 이웃 타일과 이어지도록)
+        - 반환: 저장한 타일 수
+        """
+        keys = set()
+        for _, d in G.nodes(data=True):
+            keys.add(_tile_key(d["y"], d["x"], self.tile_deg))
+        for key in sorted(keys):
+            bbox = _expand_bbox(_tile_bbox(key, self.tile_deg), GRAPH_TILE_MARGIN_M)
+            T = crop_graph_by_edge(G, bbox)
+            T.graph.setdefault("crs", G.graph.get("crs", _CRS))
+            self.put_tile(key, T)
+        log.info(f"[graphstore] put_graph nodes={G.number_of_nodes()} tiles={len(keys)}")
+        return len(keys)
+
+    def _fetch_tile(self, key: TileKey) -> nx.MultiDiGraph:
+        """Overpass로 타일 생성. 그래프가 없는 셀만 빈 그래프, 그 외 오류는 호출자에게 올림"""
+        ox = _configure_osmnx()
+        s, w, n, e = _expand_bbox(_tile_bbox(key, self.tile_deg), GRAPH_TILE_MARGIN_M)
+        clat, clng = (s + n) / 2, (w + e) / 2
+        half_m = max((n - s) / 2 * _M_PER_DEG_LAT,
+                     (e - w) / 2 * _M_PER_DEG_LAT * math.cos(math.radians(clat)))
+        ox.settings.use_cache = True
+        try:
+            G = ox.graph_from_point((clat, clng), dist=half_m, dist_type="bbox",
+                                    network_type="walk", simplify=True, truncate_by_edge=True)
+        except Exception as ex:
+            if not _is_empty_area(ex):
+                log.warning(f"[graphstore] fetch failed {key}: {type(ex).__name__}: {ex}")
+                raise
+            # 보행 가능한 도로가 없는 셀(바다/산지 등)은 빈 타일로 기록해 재요청을 막는다
+            log.info(f"[graphstore] empty tile {key}: {ex}")
+            return _empty_graph()
+        try:
+            feats = ox.features_from_point((clat, clng), tags=PARK_WATER_TAGS, dist=half_m)
+        except Exception as ex:
+            if not _is_empty_area(ex):
+                log.warning(f"[graphstore] park/water fetch failed {key}: {type(ex).__name__}: {ex}")
+                raise
+            feats = None   # 셀 안에 공원/수역 없음
+        annotate_park_water(G, feats)
+        # truncate_by_edge=True로 받은 경계 간선을 노드 기준으로 다시 자르지 않음 (seam 간선 유실 방지)
+        return G
+
+    def tile(self, key: TileKey) -> nx.MultiDiGraph:
+        G = self._lookup(key)
+        if G is not None:
+            return G
+        blob = self._read_tile(key)
+        if blob is not None:
+            G = pickle.loads(blob)
+            self._remember(key, G, len(blob))
+            self.stats["disk_hit"] += 1
+            return G
+        if not self.fetch_online:
+            return _empty_graph()
+        G = self._fetch_tile(key)   # 네트워크 오류는 저장 없이 예외 → 다음 요청에서 다시 시도
+        self.put_tile(key, G)
+        self.stats["built"] += 1
+        return G
+
+    # ---------- 조회 ----------
+    def tiles_for_bbox(self, bbox) -> List[TileKey]:
+        s, w, n, e = bbox
+        x0, y0 = _tile_key(s, w, self.tile_deg)
+        x1, y1 = _tile_key(n, e, self.tile_deg)
+        return [(ix, iy) for iy in range(y0, y1 + 1) for ix in range(x0, x1 + 1)]
+
+    def get_graph(self, lat: float, lng: float, dist_m: float) -> nx.MultiDiGraph:
+        """
+        (lat, lng) 중심 dist_m 반경 bbox의 보행 그래프
+        - 필요한 타일을 이어붙이고 bbox로 잘라 반환
+        - 그래프가 비어 있으면 ValueError
+        """
+        bbox = bbox_around(lat, lng, dist_m)
+        keys = self.tiles_for_bbox(bbox)
+        tiles = [T for T in (self.tile(k) for k in keys) if T.number_of_nodes()]
+        if not tiles:
+            raise ValueError(f"no walk graph around ({lat},{lng})")
+        G = tiles[0] if len(tiles) == 1 else nx.compose_all(tiles)
+        G = crop_graph(G, bbox)
+        G.graph["crs"] = _CRS
+        log.info(f"[graphstore] tiles={len(keys)} nodes={G.number_of_nodes()} "
+                 f"mem={self._bytes/1e6:.1f}MB stats={self.stats}")
+        return G
+
+
+def load_extract(path: str) -> nx.MultiDiGraph:
+    """
+    로컬 OSM 추출본을 walk 그래프로 로딩
+    - .osm / .xml / .osm.bz2 : osmnx.graph_from_xml
+    - .pbf : pyrosm (선택 의존성)
+    - 같은 추출본의 공원/수역 피처로 park_water 간선 속성 부여
+    """
+    if path.endswith(".pbf"):
+        try:
+            import pyrosm
+        except ImportError as ex:
+            raise RuntimeError(".pbf 추출본에는 pyrosm이 필요합니다 (pip install pyrosm)") from ex
+        osm = pyrosm.OSM(path)
+        nodes, edges = osm.get_network(network_type="walking", nodes=True)
+        G = osm.to_graph(nodes, edges, graph_type="networkx")
+        feats = osm.get_data_by_custom_criteria(custom_filter=PARK_WATER_TAGS, filter_type="keep",
+                                                keep_nodes=False)
+    else:
+        ox = _configure_osmnx()
+        G = ox.graph_from_xml(path, simplify=True)
+        try:
+            feats = ox.features_from_xml(path, tags=PARK_WATER_TAGS)
+        except Exception as ex:
+            if not _is_empty_area(ex):
+                raise
+            feats = None
+    G.graph.setdefault("crs", _CRS)
+    n = annotate_park_water(G, feats)
+    log.info(f"[graphstore] extract park/water edges={n}/{G.number_of_edges()}")
+    return G
+
+
+def build_tiles_from_extract(path: str, store: Optional["GraphStore"] = None, bbox=None) -> int:
+    """추출본 → 타일 일괄 생성 (bbox=(south, west, north, east)로 범위 제한 가능)"""
+    store = store or get_graph_store()
+    G = load_extract(path)
+    if bbox:
+        G = crop_graph(G, bbox)
+    return store.put_graph(G)
+
+
+# 프로세스 전역 저장소 (첫 사용 시 생성)
+_STORE: Optional[GraphStore] = None
+
+
+def get_graph_store() -> GraphStore:
+    global _STORE
+    if _STORE is None:
+        _STORE = GraphStore()
+    return _STORE
+
+
+if __name__ == "__main__":
+    # 예) python -m app.graphstore build seoul.osm.pbf --bbox 37.42,126.76,37.70,127.18
+    #     python -m app.graphstore warm 37.5446,127.0374 --dist 2000
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser(description="walk 그래프 타일 캐시 생성")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="로컬 .osm/.pbf 추출본에서 타일 생성")
+    b.add_argument("extract")
+    b.add_argument("--bbox", help="south,west,north,east")
+    wp = sub.add_parser("warm", help="지점 주변 타일을 Overpass로 미리 생성")
+    wp.add_argument("point", nargs="+", help="lat,lng")
+    wp.add_argument("--dist", type=float, default=2000)
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        box = tuple(float(v) for v in args.bbox.split(",")) if args.bbox else None
+        n = build_tiles_from_extract(args.extract, bbox=box)
+        print(f"tiles written: {n} -> {GRAPH_CACHE_DIR}")
+    else:
+        st = get_graph_store()
+        for pt in args.point:
+            lat, lng = (float(v) for v in pt.split(","))
+            G = st.get_graph(lat, lng, args.dist)
+            print(f"({lat},{lng}) nodes={G.number_of_nodes()} edges={G.number_of_edges()}")
+        print(st.stats)
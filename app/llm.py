@@ -1,12 +1,30 @@
 # LLM interaction stubs
 # app/llm.py
 # app/llm.py
-import json, os, httpx, re
-from typing import List
+import json, os, httpx, re, asyncio, logging
+from typing import List, Optional
 from app.models import ParsedParams
+from app.cache import TTLCache, MISSING
+from app.batcher import MicroBatcher
+from app.geostore import get_geostore, normalize_name
+from app import metrics
 
+log = logging.getLogger("llm")
 HF_ENDPOINT = os.getenv("HF_TGI_URL", "http://localhost:8080")
 MODEL_ID = os.getenv("KANANA_MODEL", "kakaocorp/kanana-1.5-8b-instruct-2505")
+LLM_RULE_FIRST = os.getenv("LLM_RULE_FIRST", "1") == "1"      # 규칙으로 확실히 파싱되면 LLM 생략
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", "3600"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+# 동시 파싱 요청 마이크로 배칭: 최대 개수 / 대기 시간(ms) / 전송 방식
+#  - pipeline: 배치 항목을 풀링 연결 위에서 동시에 전송 (표준 TGI)
+#  - list    : inputs 배열 1회 POST (배열 입력을 받는 TGI 호환 서버용)
+TGI_BATCH_MAX = int(os.getenv("TGI_BATCH_MAX", "8"))
+TGI_BATCH_WAIT_MS = float(os.getenv("TGI_BATCH_WAIT_MS", "5"))
+TGI_BATCH_MODE = os.getenv("TGI_BATCH_MODE", "pipeline")
+
+_PARSE_CACHE = TTLCache(LLM_CACHE_SIZE, LLM_CACHE_TTL_S)
+_CLIENT: Optional[httpx.AsyncClient] = None
+_LOOP = None
 
 BASE_KEYWORDS = [
     "공원","하천","산책로","운동장","트랙","둘레길","강변","호수공원","체육공원","수변","강","천","호수"
@@ -32,17 +50,70 @@ INSTRUCTIONS = """당신은 러닝 코스 추천 시스템의 파라미터 파
   - "30분" → 30/9 ≈ 3.3
 """
 
-def _post_tgi(payload):
-    with httpx.Client(timeout=30) as client:
-        r = client.post(f"{HF_ENDPOINT}/generate", json=payload)
+def _client() -> httpx.AsyncClient:
+    """이벤트 루프당 1개의 풀링 TGI 클라이언트"""
+    global _CLIENT, _LOOP
+    loop = asyncio.get_running_loop()
+    if _CLIENT is None or _LOOP is not loop:
+        _CLIENT = httpx.AsyncClient(base_url=HF_ENDPOINT, timeout=30,
+                                    limits=httpx.Limits(max_connections=16, max_keepalive_connections=8))
+        _LOOP = loop
+    return _CLIENT
+
+
+async def aclose_client() -> None:
+    global _CLIENT
+    await _BATCHER.aclose()
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
+
+def _generated_text(data) -> str:
+    # TGI: "generated_text" 또는 "outputs"[0]["text"] 계열 구현체가 다를 수 있어 보정
+    if "generated_text" in data:
+        return data["generated_text"]
+    if "outputs" in data and data["outputs"]:
+        return data["outputs"][0].get("text", "")
+    return ""
+
+
+async def _post_one(payload) -> str:
+    r = await _client().post("/generate", json=payload)
+    r.raise_for_status()
+    return _generated_text(r.json())
+
+
+async def _post_tgi_batch(payloads: List[dict]) -> List:
+    """배치 전송 — 항목별 결과 문자열 또는 예외 객체 리스트"""
+    metrics.inc("tgi_batches")
+    metrics.inc("tgi_batch_items", len(payloads))
+    with metrics.timed("tgi_batch"):
+        return await _send_tgi_batch(payloads)
+
+
+async def _send_tgi_batch(payloads: List[dict]) -> List:
+    same_params = all(p.get("parameters") == payloads[0].get("parameters") for p in payloads)
+    if TGI_BATCH_MODE == "list" and len(payloads) > 1 and same_params:
+        body = dict(payloads[0], inputs=[p["inputs"] for p in payloads])
+        r = await _client().post("/generate", json=body)
         r.raise_for_status()
         data = r.json()
-        # TGI: "generated_text" 또는 "outputs"[0]["text"] 계열 구현체가 다를 수 있어 보정
-        if "generated_text" in data:
-            return data["generated_text"]
-        if "outputs" in data and data["outputs"]:
-            return data["outputs"][0].get("text", "")
-        return ""
+        if isinstance(data, list) and len(data) == len(payloads):
+            return [_generated_text(d) for d in data]
+        raise ValueError("TGI batch response size mismatch")
+    return await asyncio.gather(*[_post_one(p) for p in payloads], return_exceptions=True)
+
+
+_BATCHER = MicroBatcher(_post_tgi_batch, max_batch=TGI_BATCH_MAX, max_wait_ms=TGI_BATCH_WAIT_MS)
+
+
+def batch_stats() -> dict:
+    return _BATCHER.stats()
+
+
+async def _post_tgi(payload):
+    return await _BATCHER.submit(payload)
 
 def _to_km_from_text(txt: str):
     # 3~5km, 3-5km, 3.5km, 30분, 45 min 등 처리
@@ -98,9 +169,9 @@ def _normalize_keywords(arr) -> List[str]:
     # 과도하게 많으면 상위 5개만
     return picked[:7]
 
-def parse_running_query(text: str) -> ParsedParams:
+async def _llm_parse(text: str) -> ParsedParams:
     prompt = f"{INSTRUCTIONS}\n\n사용자:\n{text}\n\nJSON:"
-    out = _post_tgi({
+    out = await _post_tgi({
         "model": MODEL_ID,
         "inputs": prompt,
         "parameters": {
@@ -124,6 +195,7 @@ def parse_running_query(text: str) -> ParsedParams:
             distance_km=_to_km_from_text(text),
             time=_infer_time(text),
             keywords=_fallback_keywords(text),
+            source="fallback",
         )
 
     # 후처리/보정
@@ -145,7 +217,108 @@ def parse_running_query(text: str) -> ParsedParams:
 
     keywords = _normalize_keywords(data.get("keywords"))
 
-    return ParsedParams(location=loc, distance_km=dist, time=tval, keywords=keywords)
+    return ParsedParams(location=loc, distance_km=dist, time=tval, keywords=keywords, source="llm")
+
+# =========================
+# 규칙 기반 빠른 경로
+# =========================
+# 장소로 볼 토큰 접미사 / 떼어낼 조사
+_PLACE_SUFFIXES = ("공원", "숲", "역", "천", "강", "호수", "지구", "둘레길", "산책로", "운동장",
+                   "경기장", "트랙", "광장", "대교", "유원지", "캠퍼스", "못")
+_MIN_STEM = 2   # 접미사 앞 고유 이름 최소 글자 수 ('건강'·'지역'·'못' 같은 일반어 오탐 방지)
+_GENERIC_PLACES = set(_PLACE_SUFFIXES) | set(BASE_KEYWORDS) | {"근처", "주변", "동네", "집", "지역"}
+_PARTICLES = ("에서", "근처", "주변", "부근", "쪽", "에", "의", "을", "를", "로", "으로")
+_LEXICON: Optional[set] = None
+
+
+def _lexicon() -> set:
+    """알려진 코스/지명 (로컬 지오코딩 저장소의 이름 목록) 정규화 집합"""
+    global _LEXICON
+    if _LEXICON is None:
+        _LEXICON = {normalize_name(n) for n in get_geostore().names if n}
+    return _LEXICON
+
+
+def _strip_particle(tok: str) -> str:
+    for p in _PARTICLES:
+        if tok.endswith(p) and len(tok) > len(p) + 1:
+            return tok[: -len(p)]
+    return tok
+
+
+def _is_place_token(tok: str) -> bool:
+    """
+    확실한 장소 토큰: 알려진 지명(사전) 또는 2글자 이상 고유 이름 + 장소 접미사 (예: '서울숲', '양재천')
+    - 접미사/키워드만인 일반어('공원', '산책로')와 짧은 단어('건강', '못')는 제외 → LLM으로 넘김
+    """
+    if not re.fullmatch(r"[가-힣A-Za-z0-9]+", tok) or re.fullmatch(r"[0-9.]+[A-Za-z가-힣]*", tok):
+        return False
+    if tok in _GENERIC_PLACES:
+        return False
+    if normalize_name(tok) in _lexicon():
+        return True
+    return any(tok.endswith(sfx) and len(tok) - len(sfx) >= _MIN_STEM for sfx in _PLACE_SUFFIXES)
+
+
+def _infer_location(text: str) -> Optional[str]:
+    """연속된 장소 토큰의 첫 묶음을 위치로 사용 (예: '한강공원 잠원지구 3km 밤' → '한강공원 잠원지구')"""
+    run = []
+    for raw in text.split():
+        tok = _strip_particle(raw.strip(",.!?~"))
+        if _is_place_token(tok):
+            run.append(tok)
+            if tok != raw.strip(",.!?~"):
+                break   # 조사가 붙은 토큰에서 장소 표현이 끝남
+        elif run:
+            break
+    return " ".join(run) or None
+
+
+def _rule_parse(text: str) -> Optional[ParsedParams]:
+    """
+    규칙 기반 파싱 (LLM 생략용)
+    - 위치와 거리가 모두 확실히 잡힐 때만 결과 반환, 아니면 None
+    """
+    loc = _infer_location(text)
+    dist = _to_km_from_text(text)
+    if not loc or dist is None:
+        return None
+    # 토큰 끝말 기준으로만 키워드 채택 ('강남역'의 '강' 같은 오탐 방지)
+    toks = [_strip_particle(t.strip(",.!?~")) for t in text.split()]
+    picked = [b for b in BASE_KEYWORDS if any(t.endswith(b) for t in toks)]
+    keywords = list(dict.fromkeys(picked + _fallback_keywords(text)))[:7]
+    return ParsedParams(location=loc, distance_km=dist, time=_infer_time(text),
+                        keywords=keywords, source="rule")
+
+
+async def parse_running_query(text: str) -> ParsedParams:
+    """
+    자연어 → ParsedParams
+    - 정규화 질의 기준 LRU+TTL 캐시 → 규칙 기반 빠른 경로 → LLM(TGI) 순
+    - 응답의 source에 처리 경로 기록 (cache / rule / llm / fallback)
+    """
+    key = " ".join(text.split())
+    hit = _PARSE_CACHE.get(key)
+    if hit is not MISSING:
+        metrics.inc("parse_cache")
+        return hit.model_copy(update={"source": "cache"})
+
+    res = _rule_parse(text) if LLM_RULE_FIRST else None
+    if res is None:
+        try:
+            with metrics.timed("llm_parse"):
+                res = await _llm_parse(text)
+        except (httpx.HTTPError, ValueError) as e:
+            # ValueError: list 모드 배치 응답 크기 불일치 등
+            metrics.inc("parse_fallback")
+            log.warning(f"[parse] TGI failed: {e}")
+            return ParsedParams(location=_infer_location(text), distance_km=_to_km_from_text(text),
+                                time=_infer_time(text), keywords=_fallback_keywords(text),
+                                source="fallback")
+    metrics.inc(f"parse_{res.source}")
+    log.info(f"[parse] source={res.source} text={key}")
+    _PARSE_CACHE.set(key, res)
+    return res
 
 def explain_route(route_data: dict) -> str:
     f = route_data.get("features", {})
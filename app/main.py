@@ -1,80 +1,286 @@
 '''
 FastAPI 엔드포인트 → LLM 파싱 → 루프 생성 → 스코어 → 응답
+- 무거운 자원(가로등/그래프/워커 풀 등)은 import 시점이 아니라 app.warmup 단계에서 로딩 (GET /ready)
 '''
-import os, uuid, logging
-from fastapi import FastAPI, HTTPException
+import time
+_IMPORT_T0 = time.perf_counter()
+
+import os, json, uuid, logging  # noqa: E402
+from typing import List, Optional  # noqa: E402
+import numpy as np  # noqa: E402
+from fastapi import FastAPI, HTTPException, Request  # noqa: E402
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse  # noqa: E402
 from app.models import ParseRequest, ParsedParams, FindCourseRequest, FindCourseResponse, RouteItem, LatLng
+from app.models import SearchCoursesRequest, SearchCoursesResponse, CourseItem
 from app.llm import parse_running_query, explain_route
-from app.geo import geocode_location, search_anchors
-from app.routegen import generate_loop_candidates
-from app.utils import encode_linestring_to_polyline, estimate_features, badges_from_features
-from app.utils import load_lamps_csv, lighting_index_for_route
-from app.scoring import beginner_score
+from app.llm import aclose_client as aclose_llm_client, batch_stats
+from app.geo import geocode_location, search_anchors, aclose_client
+from app.catalog import get_catalog
+from app.routecat import get_route_catalog
+from app.utils import badges_from_features, lamps_version
+from app.executor import shutdown_executor, run_anchors, iter_anchors
+from app.warmup import start_warmup, readiness, is_ready, reset as reset_warmup
+from app.cache import TTLCache, SingleFlight, MISSING
+from app.scoring import top_k
+from app.geometry import render_polylines
+from app import metrics
 
 log = logging.getLogger("api")
 app = FastAPI(title="Running RecSys (MVP)")
 
+# /find_course 결과 캐시: 비슷한 질의(같은 중심/거리 구간/시간대/키워드)는 앵커 탐색~스코어를 재사용
+RESULT_CACHE_TTL_S = float(os.getenv("RESULT_CACHE_TTL_S", "600"))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+RESULT_KM_BUCKET = float(os.getenv("RESULT_KM_BUCKET", "0.5"))
+DEFAULT_KEYWORDS = ["공원","하천","산책로","운동장","트랙"]
+
+# 단계별 Server-Timing 헤더: 0=끔, 1=항상, header=요청에 'X-Server-Timing: 1'이 있을 때만
+SERVER_TIMING = os.getenv("SERVER_TIMING", "header")
+# 헤더가 본문보다 먼저 나가는 스트리밍 엔드포인트 → 헤더 대신 마지막 NDJSON 이벤트의 timing으로 보고
+_STREAMING_PATHS = {"/find_course/stream"}
+
+_RESULTS = TTLCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL_S)
+_FLIGHT = SingleFlight()
+
+
+def _server_timing_on(request: Request) -> bool:
+    return SERVER_TIMING == "1" or (SERVER_TIMING == "header" and request.headers.get("x-server-timing") == "1")
+
+
+@app.middleware("http")
+async def _timing(request: Request, call_next):
+    """요청 전체 시간(라우트 경로별) 기록 + 요청 안에서 잰 단계 시간을 Server-Timing으로 노출"""
+    timings, token = metrics.begin_request()
+    t0 = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.end_request(token)
+    route = request.scope.get("route")
+    if route is not None and route.path != "/metrics":
+        total = time.perf_counter() - t0
+        metrics.REGISTRY.observe(f"http {request.method} {route.path}", total)
+        if route.path not in _STREAMING_PATHS and _server_timing_on(request):
+            timings["total"] = total * 1000.0
+            response.headers["Server-Timing"] = metrics.server_timing(timings)
+    return response
+
+_IMPORT_S = time.perf_counter() - _IMPORT_T0
+
+
 @app.on_event("startup")
 def _load_resources():
-    csv_path = os.getenv("LAMPS_CSV", "/mnt/data/서울시 가로등 위치 정보.csv")
-    try:
-        load_lamps_csv(csv_path, lon_col="경도", lat_col="위도") 
-        log.info(f"[startup] lamps loaded: {csv_path}")
-    except Exception as e:
-        log.warning(f"[startup] lamps load failed: {e}")
+    # 가로등 → 지오코딩 저장소 → 코스/시설/루프 카탈로그 → (핫스팟 그래프) → 워커 풀 (WARMUP_MODE)
+    log.info(f"[startup] app import {_IMPORT_S:.3f}s")
+    start_warmup(import_s=_IMPORT_S)
+
+@app.on_event("shutdown")
+async def _release_resources():
+    shutdown_executor()
+    reset_warmup()
+    await aclose_client()
+    await aclose_llm_client()
+
+@app.get("/ready")
+def ready():
+    """준비 상태: 워밍업이 끝나야 200 (그 전에는 503). import/워밍업 단계별 소요 시간 포함"""
+    state = readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
 
 @app.post("/parse", response_model=ParsedParams)
 async def parse(req: ParseRequest):
-    return parse_running_query(req.text) 
+    return await parse_running_query(req.text)
 
-@app.post("/find_course", response_model=FindCourseResponse)
-async def find_course(req: FindCourseRequest):
-    p = req.params
+@app.get("/stats")
+def stats():
+    """내부 통계 (LLM 배치 채움률/추가 지연, 결과 캐시 hit/miss/coalesce 등)"""
+    return {"llm_batch": batch_stats(),
+            "result_cache": dict(_RESULTS.stats(), **_FLIGHT.stats()),
+            "metrics": metrics.snapshot()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """단계별 지연 히스토그램/이벤트 카운터 (Prometheus 텍스트 형식)"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/search_courses", response_model=SearchCoursesResponse)
+def search_courses(req: SearchCoursesRequest):
+    """큐레이션 코스 검색 (메모리 역색인, DB 왕복 없음)"""
+    t0 = time.perf_counter()
+    hits = get_catalog().search(req.params, limit=req.limit)
+    took_ms = (time.perf_counter() - t0) * 1000.0
+    courses = [CourseItem(score=round(s, 3), **{k: c.get(k) for k in CourseItem.model_fields if k != "score"})
+               for c, s in hits]
+    return SearchCoursesResponse(courses=courses, total=len(courses), took_ms=took_ms)
+
+def _require_ready() -> None:
+    """워밍업(워커 풀 시작 포함)이 끝나기 전에는 경로 생성 요청을 503으로 돌려보냄"""
+    if not is_ready():
+        metrics.inc("not_ready_rejected")
+        raise HTTPException(503, "warming up", headers={"Retry-After": "1"})
+
+
+async def _resolve(p: ParsedParams):
+    """지오코딩 → (중심 좌표, 목표 거리, 야간 여부)"""
     if not p.location:
         raise HTTPException(400, "location is required")
 
-    # 1) 지오코딩
     center = await geocode_location(p.location)
     if not center:
         raise HTTPException(404, "location not found")
 
-    # 2) 앵커 탐색
-    keywords = p.keywords or ["공원","하천","산책로","운동장","트랙"]
+    target_km = p.distance_km or float(os.getenv("TARGET_DISTANCE_KM", "3.0"))
+    is_night = (p.time == "night")
+    return center, target_km, is_night
+
+
+async def _anchors(p: ParsedParams, center: LatLng):
+    """중심 주변 앵커 탐색 (없으면 중심 자체를 앵커로)"""
+    keywords = p.keywords or DEFAULT_KEYWORDS
     anchors = await search_anchors(center.lng, center.lat, keywords, radius=int(os.getenv("DEFAULT_RADIUS_M","2000")))
     if not anchors:
         anchors = [{"name": p.location, "lat": center.lat, "lng": center.lng, "address": center.address or ""}]
+    return anchors[:3]  # 상위 몇 개만
+
+
+def _result_key(p: ParsedParams, center: LatLng, target_km: float, profile: Optional[str]) -> tuple:
+    """결과 캐시 키: 반올림 중심(~100m) + 거리 구간 + 시간대 + 정렬 키워드 (+ 가중치 프로필, 가로등 데이터 버전)"""
+    bucket = round(target_km / RESULT_KM_BUCKET) * RESULT_KM_BUCKET
+    kws = tuple(sorted(set(p.keywords or DEFAULT_KEYWORDS)))
+    return (round(center.lat, 3), round(center.lng, 3), bucket, p.tolerance,
+            p.time or "day", kws, profile, lamps_version())
+
+
+def _from_catalog(anchors, target_km: float, tol: Optional[float], is_night: bool, profile: Optional[str]):
+    """
+    사전 계산 카탈로그에 가까운 출발점이 있는 앵커는 카탈로그 결과로 채우고 나머지만 실시간 생성 대상으로
+    - 반환: ([(anchor, routes)], 실시간 생성할 앵커 목록). 카탈로그 앵커는 루프 시작점 좌표로 교체
+    """
+    cat = get_route_catalog()
+    if cat is None:
+        return [], anchors
+    served, live = [], []
+    for anc in anchors:
+        with metrics.timed("route_catalog"):
+            hit = cat.lookup(anc["lat"], anc["lng"], target_km, is_night, profile_name=profile, tol=tol)
+        metrics.inc("route_catalog_miss" if hit is None else "route_catalog_hit")
+        if hit is None:
+            live.append(anc)
+        else:
+            ca, routes = hit
+            served.append((dict(anc, lat=ca["lat"], lng=ca["lng"]), routes))
+    return served, live
+
+
+async def _compute(p: ParsedParams, center: LatLng, target_km: float, is_night: bool,
+                   profile: Optional[str], key: tuple):
+    """앵커 탐색 → (카탈로그 | 앵커별 루프/스코어) (모든 앵커가 마감 안에 끝난 경우에만 캐시에 저장)"""
+    anchors = await _anchors(p, center)
+    results, live = _from_catalog(anchors, target_km, p.tolerance, is_night, profile)
+    if live:
+        results += await run_anchors(live, target_km, p.tolerance, is_night, profile_name=profile)
+    if results and len(results) == len(anchors):
+        _RESULTS.set(key, results)
+    return results
+
+
+def _route_items(pairs: List[tuple], p: ParsedParams, req: FindCourseRequest) -> List[RouteItem]:
+    """[(anchor, route)] → RouteItem 목록 (좌표는 요청 줌/정밀도로 단순화 후 한 번에 polyline 인코딩)"""
+    with metrics.timed("polyline"):
+        polys = render_polylines([r["coords"] for _, r in pairs], zoom=req.zoom, precision=req.precision)
+    items = []
+    for (anc, r), poly in zip(pairs, polys):
+        idx, feats = r["idx"], r["features"]
+        items.append(RouteItem(
+            route_id=f"loop_{idx}_{uuid.uuid4().hex[:6]}",
+            name=f"{(anc.get('name') or p.location)} 루프 #{idx+1}",
+            start=LatLng(lat=anc["lat"], lng=anc["lng"], name=anc.get("name"), address=anc.get("address")),
+            polyline=poly,
+            polyline_precision=req.precision,
+            features=feats,
+            scores={"beginner": r["score"]},
+            badges=badges_from_features(feats)
+        ))
+    return items
+
+
+def _top3(pairs: List[tuple]) -> List[tuple]:
+    """[(anchor, route)] → 점수 상위 3개 (argpartition)"""
+    scores = np.fromiter((r["score"] for _, r in pairs), dtype=np.float64, count=len(pairs))
+    return [pairs[i] for i in top_k(scores, 3)]
 
-    routes_json = []
-    target_km = p.distance_km or float(os.getenv("TARGET_DISTANCE_KM", "3.0"))
-    is_night = (p.time == "night")
 
-    # 3) 앵커별 루프 생성 → 조명지수 덮어쓰기 → 스코어
-    for anc in anchors[:3]:  # 상위 몇 개만
-        start = LatLng(lat=anc["lat"], lng=anc["lng"], name=anc.get("name"), address=anc.get("address"))
-        cands = generate_loop_candidates(start)
-        for idx, c in enumerate(cands):
-            feats = estimate_features(c["length_m"], is_night=is_night)
-            try:
-                li, lamps_pk = lighting_index_for_route(c["geom"])
-                feats["lighting_index"] = li
-                feats["lamps_per_km"] = lamps_pk
-            except Exception as e:
-                log.debug(f"[lighting] skip: {e}")
-            score = beginner_score(feats, target_km, is_night=is_night)
-            poly = encode_linestring_to_polyline(c["geom"])
-            item = RouteItem(
-                route_id=f"loop_{idx}_{uuid.uuid4().hex[:6]}",
-                name=f"{(anc.get('name') or p.location)} 루프 #{idx+1}",
-                start=start,
-                polyline=poly,
-                features=feats,
-                scores={"beginner": score},
-                badges=badges_from_features(feats)
-            )
-            routes_json.append(item)
-
-    if not routes_json:
+@app.post("/find_course", response_model=FindCourseResponse)
+async def find_course(req: FindCourseRequest):
+    _require_ready()
+    p = req.params
+    center, target_km, is_night = await _resolve(p)
+
+    # 캐시 → (미스면) 같은 키의 동시 요청은 계산 1회로 합쳐서
+    # 앵커 탐색 → 앵커별 루프 생성 → 조명지수 → 스코어 (워커 풀에서 병렬, 마감 시간 내 결과만)
+    key = _result_key(p, center, target_km, req.profile)
+    results = _RESULTS.get(key)
+    if results is MISSING:
+        results = await _FLIGHT.do(key, lambda: _compute(p, center, target_km, is_night, req.profile, key))
+
+    pairs = [(anc, r) for anc, routes in results for r in routes]
+    if not pairs:
         raise HTTPException(503, "no loop candidate found")
 
-    routes_json.sort(key=lambda r: r.scores["beginner"], reverse=True)
-    return FindCourseResponse(routes=routes_json[:3])
+    # RouteItem(polyline 인코딩 포함)은 최종 상위 3개만 생성
+    return FindCourseResponse(routes=_route_items(_top3(pairs), p, req))
+
+
+@app.post("/find_course/stream")
+async def find_course_stream(req: FindCourseRequest, request: Request):
+    """
+    /find_course 스트리밍 버전 (NDJSON, 한 줄 = 이벤트 1개)
+    - {"type": "route", "route": RouteItem}        : 앵커 하나가 끝날 때마다 해당 앵커의 상위 루프들
+    - {"type": "final", "routes": [RouteItem x3]}  : 전체 상위 3개 (마지막 이벤트)
+    - {"type": "error", "status": 503, ...}         : 후보가 하나도 없을 때
+    결과 캐시에 있으면 바로 내보내고, 없으면 스트리밍으로 계산한 뒤 캐시에 저장
+    Server-Timing이 켜져 있으면 final/error 이벤트에 "timing": {stage: ms, "total": ms} (헤더 대신)
+    """
+    _require_ready()
+    t0 = time.perf_counter()
+    timings = metrics.current_request() if _server_timing_on(request) else None
+    p = req.params
+    center, target_km, is_night = await _resolve(p)
+    key = _result_key(p, center, target_km, req.profile)
+    cached = _RESULTS.get(key)
+    anchors = await _anchors(p, center) if cached is MISSING else []
+
+    async def source():
+        if cached is not MISSING:
+            for r in cached:
+                yield r
+            return
+        done, live = _from_catalog(anchors, target_km, p.tolerance, is_night, req.profile)
+        for r in done:
+            yield r
+        async for r in iter_anchors(live, target_km, p.tolerance, is_night, profile_name=req.profile):
+            done.append(r)
+            yield r
+        if done and len(done) == len(anchors):
+            _RESULTS.set(key, done)
+
+    def _last(ev: dict) -> str:
+        if timings is not None:
+            ev["timing"] = dict({k: round(v, 1) for k, v in timings.items()},
+                                total=round((time.perf_counter() - t0) * 1000.0, 1))
+        return json.dumps(ev, ensure_ascii=False) + "\n"
+
+    async def events():
+        pairs, items = [], {}
+        async for anc, routes in source():
+            batch = [(anc, r) for r in routes]
+            for (_, r), item in zip(batch, _route_items(batch, p, req)):
+                pairs.append((anc, r)); items[id(r)] = item
+                yield json.dumps({"type": "route", "route": item.model_dump()}, ensure_ascii=False) + "\n"
+        if not pairs:
+            yield _last({"type": "error", "status": 503, "detail": "no loop candidate found"})
+            return
+        final = [items[id(r)].model_dump() for _, r in _top3(pairs)]
+        yield _last({"type": "final", "routes": final})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
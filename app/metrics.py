@@ -0,0 +1,182 @@
+# app/metrics.py
+"""
+경량 계측 (단계별 지연 히스토그램 + 이벤트 카운터)
+- timed("stage"): 구간 시간을 고정 버킷 히스토그램에 기록 (perf_counter 2회 + bisect, 락은 기록 순간만)
+- inc("event", n): 카운터 증가 (시도/채택 후보 수, 캐시 경로 등)
+- 요청 단위 수집: begin_request()로 contextvar에 dict를 걸어두면 같은 요청 안의 timed() 합계가 모여
+  Server-Timing 헤더로 내보낼 수 있음 (asyncio 태스크는 생성 시 컨텍스트를 복사하므로 gather 하위 작업도 포함)
+  스트리밍 응답은 헤더가 본문보다 먼저 나가므로 current_request()로 본문 마지막에 합계를 실어 보냄
+- 워커 프로세스: collect()로 기록을 전역 레지스트리 대신 로컬 버퍼에 모아 결과와 함께 반환 → 부모가 merge()
+- render(): Prometheus 텍스트 형식 (GET /metrics)
+"""
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 초 단위 버킷 상한 (+Inf는 렌더링 시 추가)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIX = "runrec"
+
+# 요청별 {stage: 누적 ms}
+_REQUEST: ContextVar[Optional[Dict[str, float]]] = ContextVar("metrics_request", default=None)
+# 워커 로컬 버퍼 {"t": [(stage, s)], "c": {event: n}} (설정돼 있으면 전역 레지스트리 대신 여기에 기록)
+_BUFFER: ContextVar[Optional[dict]] = ContextVar("metrics_buffer", default=None)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Registry:
+    """단계별 히스토그램 + 이벤트 카운터 (프로세스 전역 1개)"""
+
+    def __init__(self):
+        self._hist: Dict[str, Histogram] = {}
+        self._count: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        i = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            h = self._hist.get(stage)
+            if h is None:
+                h = self._hist[stage] = Histogram()
+            h.counts[i] += 1
+            h.sum += seconds
+            h.count += 1
+
+    def inc(self, event: str, n: float = 1) -> None:
+        with self._lock:
+            self._count[event] = self._count.get(event, 0) + n
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hist.clear()
+            self._count.clear()
+
+    def snapshot(self) -> dict:
+        """{stage: {count, sum_ms, avg_ms}}, {event: n} (GET /stats 용 요약)"""
+        with self._lock:
+            stages = {k: dict(count=h.count, sum_ms=h.sum * 1000.0, avg_ms=h.sum * 1000.0 / max(h.count, 1))
+                      for k, h in self._hist.items()}
+            return dict(stages=stages, counters=dict(self._count))
+
+    def render(self) -> str:
+        """Prometheus 텍스트 노출 형식 (0.0.4)"""
+        with self._lock:
+            hist = {k: (list(h.counts), h.sum, h.count) for k, h in sorted(self._hist.items())}
+            counters = sorted(self._count.items())
+        name = f"{PREFIX}_stage_duration_seconds"
+        lines = [f"# HELP {name} Latency of internal pipeline stages.", f"# TYPE {name} histogram"]
+        for stage, (counts, total, n) in hist.items():
+            acc = 0
+            for le, c in zip(BUCKETS, counts):
+                acc += c
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {acc}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {n}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {n}')
+        name = f"{PREFIX}_events_total"
+        lines += [f"# HELP {name} Pipeline event counters.", f"# TYPE {name} counter"]
+        for event, v in counters:
+            lines.append(f'{name}{{event="{event}"}} {v:g}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def observe(stage: str, seconds: float) -> None:
+    buf = _BUFFER.get()
+    if buf is not None:
+        buf["t"].append((stage, seconds))
+        return
+    REGISTRY.observe(stage, seconds)
+    req = _REQUEST.get()
+    if req is not None:
+        req[stage] = req.get(stage, 0.0) + seconds * 1000.0
+
+
+def inc(event: str, n: float = 1) -> None:
+    buf = _BUFFER.get()
+    if buf is not None:
+        buf["c"][event] = buf["c"].get(event, 0) + n
+        return
+    REGISTRY.inc(event, n)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """with timed("geocode"): ... — 예외가 나도 걸린 시간은 기록"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - t0)
+
+
+# ----- 워커 ↔ 부모 전달 -----
+
+@contextmanager
+def collect() -> Iterator[dict]:
+    """
+    블록 안의 기록을 로컬 버퍼에 모음 (워커 함수에서 사용, 버퍼는 pickle 가능한 기본 타입)
+    - 스레드/프로세스 워커 모두 같은 방식 → 부모가 merge()로 한 번만 반영 (중복 집계 없음)
+    """
+    buf = {"t": [], "c": {}}
+    token = _BUFFER.set(buf)
+    try:
+        yield buf
+    finally:
+        _BUFFER.reset(token)
+
+
+def merge(buf: Optional[dict]) -> None:
+    """워커 버퍼 → 전역 레지스트리 (+ 현재 요청의 Server-Timing)"""
+    if not buf:
+        return
+    for stage, seconds in buf["t"]:
+        observe(stage, seconds)
+    for event, n in buf["c"].items():
+        inc(event, n)
+
+
+# ----- 요청 단위 Server-Timing -----
+
+def begin_request() -> Tuple[Dict[str, float], object]:
+    timings: Dict[str, float] = {}
+    return timings, _REQUEST.set(timings)
+
+
+def end_request(token) -> None:
+    _REQUEST.reset(token)
+
+
+def current_request() -> Optional[Dict[str, float]]:
+    """현재 요청의 {stage: ms} (begin_request 밖이면 None) — 스트리밍 응답은 본문 끝에서 이 값을 보고"""
+    return _REQUEST.get()
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """{stage: ms} → 'geocode;dur=12.3, anchors;dur=40.1' (헤더 토큰에 쓸 수 없는 문자는 '_'로)"""
+    parts: List[str] = []
+    for stage, ms in timings.items():
+        token = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in stage)
+        parts.append(f"{token};dur={ms:.1f}")
+    return ", ".join(parts)
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+def snapshot() -> dict:
+    return REGISTRY.snapshot()
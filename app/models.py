@@ -1,5 +1,5 @@
 # Pydantic models placeholder
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict
 
 class LatLng(BaseModel):
@@ -15,21 +15,48 @@ class ParseRequest(BaseModel):
 class ParsedParams(BaseModel):
     location: Optional[str] = None
     distance_km: Optional[float] = None
+    tolerance: Optional[float] = Field(None, gt=0, lt=1)   # 거리 허용 오차 비율 (예: 0.1 = ±10%)
     time: Optional[str] = None
     keywords: Optional[List[str]] = None 
+    source: Optional[str] = None   # 파싱 경로: rule | llm | fallback | cache
 
 class FindCourseRequest(BaseModel):
     params: Optional[ParsedParams] = None
     text: Optional[str] = None  # 자연어 쿼리 (params 대신 사용)
+    profile: Optional[str] = None  # 스코어 가중치 프로필 이름 (기본 beginner)
+    zoom: Optional[float] = Field(None, ge=0, le=22)   # 표시할 지도 줌 → polyline 단순화 상세도 (없으면 기본 허용 오차)
+    precision: int = Field(5, ge=4, le=7)              # polyline 좌표 정밀도 (소수 자릿수, 구글 표준 5)
 
 class RouteItem(BaseModel):
     route_id: str
     name: str
     start: LatLng
     polyline: str
+    polyline_precision: int = 5
     features: Dict
     scores: Dict[str, float]
     badges: List[str]
 
 class FindCourseResponse(BaseModel):
     routes: List[RouteItem]
+
+class SearchCoursesRequest(BaseModel):
+    params: ParsedParams
+    limit: int = 20
+
+class CourseItem(BaseModel):
+    course_name: str
+    description: Optional[str] = None
+    course_type: Optional[str] = None
+    difficulty: Optional[str] = None
+    elevation: Optional[str] = None
+    length_km: Optional[float] = None
+    city: Optional[str] = None
+    district: Optional[str] = None
+    tags: List[str] = []
+    score: float
+
+class SearchCoursesResponse(BaseModel):
+    courses: List[CourseItem]
+    total: int
+    took_ms: float
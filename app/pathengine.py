@@ -0,0 +1,191 @@
+# app/pathengine.py
+"""
+보행 그래프 최단경로 엔진
+- networkx 그래프를 한 번만 CSR 인접행렬(scipy.sparse) + 노드 좌표 배열로 변환
+- 단일 출발 Dijkstra 트리(거리 + 선행 노드)를 출발 노드별로 캐시해 여러 시도(trial)에서 재사용
+- 최근접 노드 탐색은 KD-tree (osmnx.nearest_nodes 호출마다 트리를 다시 만들지 않음)
+- 경로 피처용 배열: 노드별 교차 도로 수/신호등 여부, 간선별 공원·수변 여부 → path_features는 배열 gather만 사용
+- 스레드 워커가 엔진을 공유하므로 트리 캐시/루프 비율 갱신은 엔진 락 안에서 (Dijkstra 계산은 락 밖)
+"""
+from __future__ import annotations
+import os, math, threading
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+import networkx as nx
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+
+PATH_TREE_CACHE = int(os.getenv("PATH_TREE_CACHE", "64"))   # 엔진당 보관할 Dijkstra 트리 수
+
+_M_PER_DEG = 111111.0
+_MIN_EDGE_M = 1e-3   # 길이 0 간선도 간선으로 인식되도록 하한
+
+# 공원/수변 간선 판정: OSM 태그 + 폴리곤 교차(park_water), 없으면 이름 토큰 접미사
+_PARK_WATER_SUFFIXES = ("공원", "호수", "강", "천", "숲", "숲길", "둘레길", "산책로", "수변", "강변", "천변", "호수길")
+_PARK_WATER_NAMES = ("공원", "한강", "호수", "유수지", "저수지")
+_PARK_LANDUSE = {"park", "grass", "recreation_ground", "forest", "meadow", "village_green"}
+
+
+def _values(v) -> List[str]:
+    """osmnx 단순화 그래프는 병합된 속성을 리스트로 가질 수 있음"""
+    if v is None:
+        return []
+    return [str(x) for x in v] if isinstance(v, (list, tuple, set)) else [str(v)]
+
+
+def is_park_water_edge(data: Dict) -> bool:
+    """
+    공원·수변 간선 판정
+    - 간선 자체 태그(leisure/landuse/waterway/natural) → 타일 생성 시 폴리곤 교차 결과(park_water, app.graphstore)
+    - park_water가 없는 그래프(예전 타일/합성 그래프)에서만 이름 접미사 휴리스틱
+    """
+    if any(v in _PARK_LANDUSE for v in _values(data.get("landuse")) + _values(data.get("leisure"))):
+        return True
+    if data.get("waterway") or "water" in _values(data.get("natural")):
+        return True
+    pw = data.get("park_water")
+    if pw is not None:
+        return bool(pw)
+    for name in _values(data.get("name")):
+        if any(k in name for k in _PARK_WATER_NAMES):
+            return True
+        if any(tok.endswith(_PARK_WATER_SUFFIXES) for tok in name.split()):
+            return True
+    return False
+
+
+def is_signal_node(data: Dict) -> bool:
+    return "traffic_signals" in _values(data.get("highway")) + _values(data.get("crossing"))
+
+
+class PathEngine:
+    """
+    CSR 기반 최단경로 엔진
+    - node_ids[i]: i번 노드의 OSM id
+    - lat/lng: 노드 좌표 배열
+    - tree(src): src에서의 (거리 배열, 선행 노드 배열), LRU 캐시
+    - loop_ratio: 루프 실경로 길이 / 링 반경 관측 평균 (add_loop_ratios로 갱신)
+    - street_count/signal: 노드별 교차 도로 수, 신호등 여부
+    - edge_key/edge_len/edge_pw: (u*N+v) 정렬 키, 간선 길이, 공원·수변 여부 (CSR과 같은 간선 집합)
+    """
+
+    def __init__(self, G: nx.MultiDiGraph, tree_cache: int = PATH_TREE_CACHE):
+        self.node_ids = np.fromiter(G.nodes, dtype=np.int64, count=G.number_of_nodes())
+        pos = {n: i for i, n in enumerate(self.node_ids.tolist())}
+        self.lat = np.array([G.nodes[n]["y"] for n in self.node_ids.tolist()], dtype=np.float64)
+        self.lng = np.array([G.nodes[n]["x"] for n in self.node_ids.tolist()], dtype=np.float64)
+        N = len(self.node_ids)
+
+        rows, cols, w, pw = [], [], [], []
+        for u, v, data in G.edges(data=True):
+            length = data.get("length")
+            if length is None:
+                continue
+            rows.append(pos[u]); cols.append(pos[v]); w.append(length)
+            pw.append(is_park_water_edge(data))
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        w = np.maximum(np.asarray(w, dtype=np.float64), _MIN_EDGE_M)
+        # 멀티엣지(u, v 중복)는 가장 짧은 것만 남김 (csr_matrix는 중복을 합산하므로 미리 정리)
+        order = np.lexsort((w, rows * N + cols))
+        key = (rows * N + cols)[order]
+        first = np.ones(len(key), dtype=bool)
+        first[1:] = key[1:] != key[:-1]
+        sel = order[first]
+        self.csr = csr_matrix((w[sel], (rows[sel], cols[sel])), shape=(N, N))
+        self.edge_key = key[first]
+        self.edge_len = w[sel]
+        self.edge_pw = np.asarray(pw, dtype=bool)[sel] if len(sel) else np.zeros(0, dtype=bool)
+
+        # 노드 피처: 교차 도로 수(osmnx street_count, 없으면 무방향 이웃 수), 신호등 여부
+        und = self.csr + self.csr.T
+        deg = np.diff(und.indptr)
+        sc = [G.nodes[n].get("street_count") for n in self.node_ids.tolist()]
+        self.street_count = np.array([d if c is None else c for c, d in zip(sc, deg)], dtype=np.int16)
+        self.signal = np.array([is_signal_node(G.nodes[n]) for n in self.node_ids.tolist()], dtype=bool)
+
+        # 최근접 탐색용 평면 좌표(미터 근사)
+        self._coslat = math.cos(math.radians(float(self.lat.mean()))) if N else 1.0
+        self._kd = cKDTree(self._xy(self.lat, self.lng)) if N else None
+        self._trees: "OrderedDict[int, Tuple[np.ndarray, np.ndarray, float]]" = OrderedDict()
+        self._tree_cache = tree_cache
+        self._lock = threading.Lock()
+        self.dijkstra_runs = 0
+        self.loop_ratio = 2 * math.pi   # 루프 실경로 길이 / 링 반경 (routegen이 관측값으로 갱신)
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def _xy(self, lat, lng) -> np.ndarray:
+        return np.column_stack([np.asarray(lng) * _M_PER_DEG * self._coslat,
+                                np.asarray(lat) * _M_PER_DEG])
+
+    def nearest(self, lat: float, lng: float) -> int:
+        """가장 가까운 노드 인덱스"""
+        _, i = self._kd.query(self._xy([lat], [lng])[0])
+        return int(i)
+
+    def tree(self, src: int, limit: float = np.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        src 출발 Dijkstra 트리 (dist, pred)
+        - limit: 이 거리(미터)까지만 탐색. 캐시된 트리가 더 넓은 limit으로 계산됐으면 그대로 재사용
+        """
+        with self._lock:
+            hit = self._trees.get(src)
+            if hit is not None and hit[2] >= limit:
+                self._trees.move_to_end(src)
+                return hit[0], hit[1]
+        dist, pred = dijkstra(self.csr, directed=True, indices=src,
+                              return_predecessors=True, limit=limit)
+        with self._lock:
+            self.dijkstra_runs += 1
+            hit = self._trees.get(src)
+            if hit is None or hit[2] < limit:   # 다른 스레드가 더 넓은 트리를 먼저 넣었으면 유지
+                self._trees[src] = (dist, pred, limit)
+            self._trees.move_to_end(src)
+            while len(self._trees) > self._tree_cache:
+                self._trees.popitem(last=False)
+        return dist, pred
+
+    def add_loop_ratios(self, samples: Sequence[float]) -> float:
+        """이번 요청의 관측 비율을 현재 값과 평균해 반영 (동시 요청의 갱신이 서로 덮어쓰지 않도록 락 안에서)"""
+        with self._lock:
+            if samples:
+                self.loop_ratio = (self.loop_ratio + sum(samples)) / (1 + len(samples))
+            return self.loop_ratio
+
+    def dist(self, src: int, dst: int, limit: float = np.inf) -> float:
+        return float(self.tree(src, limit)[0][dst])
+
+    def path(self, src: int, dst: int, limit: float = np.inf) -> List[int]:
+        """src → dst 노드 인덱스 경로 (도달 불가면 빈 리스트)"""
+        dist, pred = self.tree(src, limit)
+        if not np.isfinite(dist[dst]):
+            return []
+        out = [dst]
+        while out[-1] != src:
+            out.append(int(pred[out[-1]]))
+        out.reverse()
+        return out
+
+    def path_features(self, path: Sequence[int]) -> Dict[str, float]:
+        """
+        노드 인덱스 경로 → 교차로/신호등 밀도(개/km), 공원·수변 구간 비율
+        - 교차로: 경유 노드(시작/끝 제외) 중 교차 도로 3개 이상, 같은 노드를 다시 지나면 다시 셈
+        - 간선은 (u*N+v) 정렬 키에서 searchsorted로 한 번에 조회
+        """
+        p = np.asarray(path, dtype=np.int64)
+        if len(p) < 2:
+            return dict(intersections_per_km=0.0, signals_per_km=0.0, water_park_ratio=0.0)
+        e = np.searchsorted(self.edge_key, p[:-1] * len(self.node_ids) + p[1:])
+        e = np.minimum(e, len(self.edge_key) - 1)
+        L = self.edge_len[e]
+        km = max(float(L.sum()) / 1000.0, 1e-6)
+        inner = p[1:-1]
+        return dict(
+            intersections_per_km=float(np.count_nonzero(self.street_count[inner] >= 3)) / km,
+            signals_per_km=float(np.count_nonzero(self.signal[inner])) / km,
+            water_park_ratio=float(L[self.edge_pw[e]].sum()) / (km * 1000.0),
+        )
@@ -0,0 +1,259 @@
+# app/routecat.py
+"""
+사전 계산 루프 카탈로그 (인기 출발점 × 표준 거리 × 낮/밤)
+- 오프라인 배치(python -m app.routecat build)로 route_anchor(루프 생성 → 조명지수 → 스코어)를 미리 돌려 .npz 1개로 저장
+- 파일 구성: 앵커 좌표/이름 배열, 루프별 (앵커 번호, 표준 거리, 야간 여부, 피처 열), 경로 좌표는 정수(1e-6도) 배열 + 오프셋
+- 조회: 앵커 격자 인덱스(EPSG:3857)로 반경 내 최근접 앵커 → (앵커, 거리, 야간) 행 구간 → 요청 거리/프로필로 점수만 다시 계산
+- /find_course는 카탈로그에 가까운 앵커가 있으면 그 결과를 쓰고, 없으면 실시간 생성
+"""
+from __future__ import annotations
+import os, json, math, time, logging, argparse
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.spatial import GridIndex
+from app.scoring import FEATURE_COLS, beginner_scores, profile, top_k
+from app.utils import to_mercator
+
+log = logging.getLogger("routecat")
+
+ROUTE_CATALOG_PATH = os.getenv("ROUTE_CATALOG_PATH", "/mnt/data/route_catalog.npz")
+ROUTE_CATALOG_RADIUS_M = float(os.getenv("ROUTE_CATALOG_RADIUS_M", "300"))   # 앵커 ↔ 카탈로그 출발점 허용 거리
+ROUTE_CATALOG_KM_TOL = float(os.getenv("ROUTE_CATALOG_KM_TOL", "0.15"))     # 요청 거리 ↔ 표준 거리 허용 비율
+LOOP_TOLERANCE = float(os.getenv("LOOP_TOLERANCE", "0.10"))   # 요청에 tolerance가 없을 때 (app.routegen과 같은 기본값)
+STANDARD_KM = (3.0, 5.0, 7.0, 10.0)
+_EXTRA_COLS = ("lamps_per_km", "duration_min_est", "elev_gain_m")
+
+
+class RouteCatalog:
+    """
+    .npz 카탈로그 (읽기 전용)
+    - a_lat/a_lng/a_name: 앵커
+    - r_anchor/r_km/r_night/r_idx: 루프 행 (앵커, 거리, 야간 순으로 정렬)
+    - r_feat: (행 수, len(cols)) 피처 열, cols는 feat_cols
+    - c_e6/c_off: 모든 루프 좌표 (점 수, 2) [lat, lng] x 1e6 정수와 행별 시작 오프셋 (길이 = 행 수 + 1)
+      (응답 시 요청 줌/정밀도로 단순화·인코딩하므로 원본 해상도로 보관)
+    - 이전 형식(poly_blob/poly_off: polyline 바이트)도 읽을 수 있음
+    """
+    __slots__ = ("path", "a_lat", "a_lng", "a_name", "r_km", "r_idx", "r_feat", "feat_cols",
+                 "c_e6", "c_off", "poly_blob", "poly_off", "ranges", "index", "meta")
+
+    def __init__(self, path: str):
+        self.path = path
+        with np.load(path, allow_pickle=False) as z:
+            self.a_lat, self.a_lng, self.a_name = z["a_lat"], z["a_lng"], z["a_name"]
+            r_anchor, self.r_km, r_night = z["r_anchor"], z["r_km"], z["r_night"]
+            self.r_idx, self.r_feat = z["r_idx"], z["r_feat"]
+            self.feat_cols = [str(c) for c in z["feat_cols"]]
+            if "c_e6" in z:
+                self.c_e6, self.c_off = z["c_e6"], z["c_off"]
+                self.poly_blob = self.poly_off = None
+            else:
+                self.c_e6 = self.c_off = None
+                self.poly_blob, self.poly_off = z["poly_blob"], z["poly_off"]
+            self.meta = json.loads(str(z["meta"]))
+        # (앵커, 표준 거리, 야간) → 행 구간 [s, e)
+        self.ranges: Dict[Tuple[int, float, bool], Tuple[int, int]] = {}
+        if len(r_anchor):
+            key = np.column_stack([r_anchor, self.r_km, r_night])
+            cut = np.flatnonzero(np.any(key[1:] != key[:-1], axis=1)) + 1
+            bounds = np.concatenate([[0], cut, [len(r_anchor)]])
+            for s, e in zip(bounds[:-1], bounds[1:]):
+                self.ranges[(int(r_anchor[s]), float(self.r_km[s]), bool(r_night[s]))] = (int(s), int(e))
+        xs, ys = to_mercator(self.a_lng, self.a_lat)
+        self.index = GridIndex(np.asarray(xs), np.asarray(ys), cell_m=500.0)
+
+    def __len__(self) -> int:
+        return len(self.r_idx)
+
+    def nearest_anchor(self, lat: float, lng: float, radius_m: float = ROUTE_CATALOG_RADIUS_M) -> Optional[int]:
+        k = 1.0 / math.cos(math.radians(lat))    # EPSG:3857 축척 보정
+        x, y = to_mercator(lng, lat)
+        pos = self.index.query_radius(x, y, radius_m * k)
+        if not len(pos):
+            return None
+        d2 = (self.index.xs[pos] - x) ** 2 + (self.index.ys[pos] - y) ** 2
+        return int(self.index.ids[pos[int(np.argmin(d2))]])
+
+    def _coords(self, row: int) -> np.ndarray:
+        if self.c_e6 is not None:
+            return self.c_e6[self.c_off[row]:self.c_off[row + 1]] / 1e6
+        import polyline as pl
+        return np.array(pl.decode(self.poly_blob[self.poly_off[row]:self.poly_off[row + 1]].tobytes().decode("ascii")),
+                        dtype=np.float64).reshape(-1, 2)
+
+    def lookup(self, lat: float, lng: float, target_km: float, is_night: bool,
+               k: int = 3, profile_name: Optional[str] = None,
+               tol: Optional[float] = None) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        (lat, lng) 근처 카탈로그 앵커와 그 루프 상위 k개 (route_anchor 반환 형식), 없으면 None
+        - 표준 거리 중 요청 거리에 가장 가까운 것이 허용 비율 안일 때만 사용
+        - 실시간 생성과 같은 거리 창(|dist_km - target| <= tol x target) 밖의 루프는 제외, 남는 루프가 없으면 None
+        - 점수는 저장된 피처 열로 요청 거리/프로필 기준 다시 계산
+        """
+        a = self.nearest_anchor(lat, lng)
+        if a is None:
+            return None
+        km = min(self.meta.get("kms", STANDARD_KM), key=lambda s: abs(s - target_km))
+        if abs(km - target_km) / target_km > ROUTE_CATALOG_KM_TOL:
+            return None
+        rng = self.ranges.get((a, km, is_night))
+        if rng is None:
+            return None
+        s, e = rng
+        tol = LOOP_TOLERANCE if tol is None else tol
+        dist = self.r_feat[s:e, self.feat_cols.index("dist_km")]
+        rows = s + np.flatnonzero(np.abs(dist - target_km) <= tol * target_km)
+        if not len(rows):
+            return None
+        X = self.r_feat[rows]
+        cols = [self.feat_cols.index(c) for c in FEATURE_COLS]
+        scores = beginner_scores(X[:, cols], target_km, profile(profile_name, is_night))
+        out = []
+        for j in top_k(scores, k):
+            row = int(rows[j])
+            out.append(dict(
+                idx=int(self.r_idx[row]),
+                coords=self._coords(row),
+                features={c: float(v) for c, v in zip(self.feat_cols, self.r_feat[row]) if np.isfinite(v)},
+                score=float(scores[j]),
+                source="catalog",
+            ))
+        return self.anchor(a), out
+
+    def anchor(self, i: int) -> Dict[str, Any]:
+        return {"name": str(self.a_name[i]) or None, "lat": float(self.a_lat[i]),
+                "lng": float(self.a_lng[i]), "address": None, "source": "catalog"}
+
+
+_CATALOG: Optional[RouteCatalog] = None
+_LOADED = False
+
+
+def get_route_catalog() -> Optional[RouteCatalog]:
+    """카탈로그 파일이 있으면 한 번만 로딩 (없으면 None → 항상 실시간 생성)"""
+    global _CATALOG, _LOADED
+    if not _LOADED:
+        _LOADED = True
+        if os.path.exists(ROUTE_CATALOG_PATH):
+            try:
+                _CATALOG = RouteCatalog(ROUTE_CATALOG_PATH)
+                log.info(f"[routecat] loaded {ROUTE_CATALOG_PATH}: anchors={len(_CATALOG.a_lat)} routes={len(_CATALOG)}")
+            except Exception as e:
+                log.warning(f"[routecat] load failed: {e}")
+    return _CATALOG
+
+
+# =========================
+# 오프라인 빌드
+# =========================
+
+def grid_points(bbox: Sequence[float], step_m: float) -> List[Dict[str, Any]]:
+    """bbox(south,west,north,east) 안의 step_m 간격 격자점"""
+    s, w, n, e = bbox
+    dlat = step_m / 111111.0
+    dlng = step_m / (111111.0 * math.cos(math.radians((s + n) / 2)))
+    return [{"name": "", "lat": float(lat), "lng": float(lng)}
+            for lat in np.arange(s, n + 1e-12, dlat) for lng in np.arange(w, e + 1e-12, dlng)]
+
+
+def _build_one(anchor: Dict[str, Any], km: float, is_night: bool, k: int):
+    from app.executor import route_anchor
+    try:
+        return route_anchor(anchor, km, None, is_night, k)
+    except Exception as ex:
+        log.warning(f"[routecat] {anchor.get('name') or (anchor['lat'], anchor['lng'])} {km}km failed: {ex}")
+        return []
+
+
+def build_catalog(anchors: List[Dict[str, Any]], out_path: str, kms: Sequence[float] = STANDARD_KM,
+                  k: int = 6, workers: int = 1, lamps_csv: Optional[str] = None) -> int:
+    """
+    앵커 × 거리 × 낮/밤 루프를 계산해 .npz로 저장, 저장한 루프 수 반환
+    - k: (앵커, 거리, 낮/밤)당 보관할 루프 수 (조회 시 요청 프로필로 다시 상위 3개 선택)
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing as mp
+    from app.executor import _worker_init, ROUTE_MP_START
+
+    jobs = [(ai, km, night) for ai in range(len(anchors)) for km in kms for night in (False, True)]
+    t0 = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context(ROUTE_MP_START),
+                                 initializer=_worker_init, initargs=(lamps_csv, "")) as pool:
+            results = list(pool.map(_build_one, [anchors[a] for a, _, _ in jobs],
+                                    [j[1] for j in jobs], [j[2] for j in jobs], [k] * len(jobs)))
+    else:
+        _worker_init(lamps_csv, "")
+        results = [_build_one(anchors[a], km, night, k) for a, km, night in jobs]
+
+    cols = list(FEATURE_COLS) + list(_EXTRA_COLS)
+    r_anchor, r_km, r_night, r_idx, feats, coords = [], [], [], [], [], []
+    for (ai, km, night), routes in zip(jobs, results):
+        for r in routes:
+            r_anchor.append(ai); r_km.append(km); r_night.append(night); r_idx.append(r["idx"])
+            feats.append([float(r["features"].get(c, np.nan)) for c in cols])
+            coords.append(np.round(r["coords"] * 1e6).astype(np.int32))
+    off = np.zeros(len(coords) + 1, dtype=np.int64)
+    off[1:] = np.cumsum([len(c) for c in coords])
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp = out_path + ".tmp.npz"
+    np.savez(tmp,
+             a_lat=np.array([a["lat"] for a in anchors], dtype=np.float64),
+             a_lng=np.array([a["lng"] for a in anchors], dtype=np.float64),
+             a_name=np.array([a.get("name") or "" for a in anchors], dtype=str),
+             r_anchor=np.array(r_anchor, dtype=np.int32),
+             r_km=np.array(r_km, dtype=np.float64),
+             r_night=np.array(r_night, dtype=bool),
+             r_idx=np.array(r_idx, dtype=np.int16),
+             r_feat=np.array(feats, dtype=np.float32).reshape(-1, len(cols)),
+             feat_cols=np.array(cols),
+             c_e6=np.concatenate(coords) if coords else np.zeros((0, 2), dtype=np.int32),
+             c_off=off,
+             meta=np.array(json.dumps(dict(built_at=time.time(), kms=list(kms), k=k, lamps_csv=lamps_csv))))
+    os.replace(tmp, out_path)
+    log.info(f"[routecat] built {out_path}: anchors={len(anchors)} jobs={len(jobs)} routes={len(coords)} "
+             f"in {time.perf_counter() - t0:.1f}s")
+    return len(coords)
+
+
+if __name__ == "__main__":
+    # 예) python -m app.routecat build --points "37.5446,127.0374,서울숲;37.5172,126.9950,반포한강공원"
+    #     python -m app.routecat build --bbox 37.50,126.98,37.56,127.06 --step-m 1000 --workers 3
+    #     python -m app.routecat build --facilities     (app.facilities 트랙/산책로 전체)
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser(description="사전 계산 루프 카탈로그 생성")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("--out", default=ROUTE_CATALOG_PATH)
+    b.add_argument("--points", help="lat,lng[,name];lat,lng[,name]")
+    b.add_argument("--bbox", help="south,west,north,east (격자점)")
+    b.add_argument("--step-m", type=float, default=1000)
+    b.add_argument("--facilities", action="store_true", help="로컬 트랙/산책로 시설을 앵커로 사용")
+    b.add_argument("--km", default=",".join(str(int(v)) for v in STANDARD_KM))
+    b.add_argument("--k", type=int, default=6)
+    b.add_argument("--workers", type=int, default=1)
+    b.add_argument("--lamps", default=os.getenv("LAMPS_CSV", "/mnt/data/서울시 가로등 위치 정보.csv"))
+    i = sub.add_parser("info")
+    i.add_argument("path", nargs="?", default=ROUTE_CATALOG_PATH)
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        anchors: List[Dict[str, Any]] = []
+        for part in (args.points or "").split(";"):
+            if part.strip():
+                v = part.split(",")
+                anchors.append({"name": v[2].strip() if len(v) > 2 else "", "lat": float(v[0]), "lng": float(v[1])})
+        if args.bbox:
+            anchors += grid_points([float(v) for v in args.bbox.split(",")], args.step_m)
+        if args.facilities:
+            from app.facilities import get_facilities
+            fs = get_facilities()
+            anchors += [{"name": fs.names[j], "lat": float(fs.lat[j]), "lng": float(fs.lng[j])} for j in range(len(fs))]
+        kms = [float(v) for v in args.km.split(",")]
+        n = build_catalog(anchors, args.out, kms, k=args.k, workers=args.workers, lamps_csv=args.lamps)
+        print(f"routes written: {n} -> {args.out}")
+    else:
+        cat = RouteCatalog(args.path)
+        print(dict(anchors=len(cat.a_lat), routes=len(cat), groups=len(cat.ranges),
+                   bytes=os.path.getsize(args.path), **cat.meta))
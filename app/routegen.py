@@ -2,71 +2,151 @@
 # OSMnx 루프 후보 생성
 # 로깅/ 파라미터 표시 추가
 # 중심, 반경, 타깃거리, 생성된 후보 수/시도 횟수 로그
-import math, os, random, uuid, logging
-import osmnx as ox
-import networkx as nx
+import math, os, random, time, logging, threading
+from collections import OrderedDict
+import numpy as np
 from shapely.geometry import LineString
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from app.models import LatLng
+from app.graphstore import get_graph_store
+from app.pathengine import PathEngine
+from app import metrics
 
 log = logging.getLogger("routegen")
 TARGET_KM = float(os.getenv("TARGET_DISTANCE_KM", "3.0"))
 TOL = float(os.getenv("LOOP_TOLERANCE", "0.10"))
 RADIUS_M = int(os.getenv("DEFAULT_RADIUS_M", "2000"))
+RING_SLOTS = int(os.getenv("LOOP_RING_SLOTS", "24"))       # waypoint 방위각 이산화 개수 (Dijkstra 트리 재사용)
+ENGINE_CACHE = int(os.getenv("PATH_ENGINE_CACHE", "8"))    # 중심점별 최단경로 엔진 보관 수
 
-def _nearest_node(G, lat, lng):
-    return ox.distance.nearest_nodes(G, X=lng, Y=lat)
+_ENGINES: "OrderedDict[tuple, PathEngine]" = OrderedDict()
+_ENGINES_LOCK = threading.Lock()   # 스레드 워커끼리 엔진 캐시 공유
 
-def generate_loop_candidates(center: LatLng, n_candidates: int = 6) -> List[Dict[str, Any]]:
-    ox.settings.use_cache = True
-    log.info(f"[routegen] center=({center.lat},{center.lng}) R={RADIUS_M} target={TARGET_KM}km tol={TOL}")
-    G = ox.graph_from_point((center.lat, center.lng),
-                            dist=RADIUS_M, network_type="walk", simplify=True)
-    G = ox.add_edge_lengths(G)
 
-    target_m = TARGET_KM * 1000
-    low, high = target_m * (1 - TOL), target_m * (1 + TOL)
-    ring_r = target_m / (2*math.pi)
-    start = _nearest_node(G, center.lat, center.lng)
+def _engine_for(center: LatLng) -> PathEngine:
+    """중심점(약 100m 단위 반올림) 기준으로 CSR 엔진을 캐시 (생성은 락 밖에서, 같은 키가 동시에 만들어지면 먼저 넣은 것 사용)"""
+    key = (round(center.lat, 3), round(center.lng, 3), RADIUS_M)
+    with _ENGINES_LOCK:
+        eng = _ENGINES.get(key)
+        if eng is not None:
+            _ENGINES.move_to_end(key)
+    if eng is not None:
+        metrics.inc("engine_hit")
+        return eng
+    metrics.inc("engine_miss")
+    # 타일 캐시에서 반경 그래프를 꺼낸다 (캐시 미스 타일만 Overpass로 생성)
+    with metrics.timed("graph_load"):
+        G = get_graph_store().get_graph(center.lat, center.lng, RADIUS_M)
+    with metrics.timed("engine_build"):
+        eng = PathEngine(G)
+    with _ENGINES_LOCK:
+        eng = _ENGINES.setdefault(key, eng)
+        _ENGINES.move_to_end(key)
+        while len(_ENGINES) > ENGINE_CACHE:
+            _ENGINES.popitem(last=False)
+    return eng
+
+
+def generate_loop_candidates(center: LatLng, n_candidates: int = 6,
+                             target_km: Optional[float] = None,
+                             tol: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    center 주변 루프 후보 생성
+    - target_km/tol: 요청 거리/허용 오차 (없으면 env 기본값)
+    - 링 반경은 이전 시도의 (실경로 길이 / 링 반경) 비율로 적응 조정 (엔진에 누적되어 다음 요청에도 사용)
+    - 구간 거리 합이 상한(high)을 넘으면 남은 구간을 계산하지 않고 바로 기각 (비율에는 상한 기준 하한값으로 반영)
+    - 도달 불가(inf) 구간이 있는 시도는 기각하고 비율 표본에서도 제외
+    """
+    target_km = target_km or TARGET_KM
+    tol = TOL if tol is None else tol
+    log.info(f"[routegen] center=({center.lat},{center.lng}) R={RADIUS_M} target={target_km}km tol={tol}")
+    eng = _engine_for(center)
+    runs0 = eng.dijkstra_runs
+
+    target_m = target_km * 1000
+    low, high = target_m * (1 - tol), target_m * (1 + tol)
+    start = eng.nearest(center.lat, center.lng)
+    base_ratio = eng.loop_ratio   # 이전 요청까지의 관측 비율 (초기값 2π = 완전한 원)
+    ratios = []                   # 이번 요청의 관측 비율 (끝나면 엔진에 반영)
+
+    def _ring_step():
+        # 링 반경을 5% 단위로 양자화 → 같은 단계에서는 waypoint 노드/Dijkstra 트리 재사용
+        r = target_m / ((base_ratio + sum(ratios)) / (1 + len(ratios)))
+        return max(1, int(round(math.log(r) / math.log(1.05))))
+
+    # 링 위 waypoint 후보 노드 (반경 단계 x 방위각 슬롯별로 한 번만 스냅)
+    slot_nodes = {}
+    def _slot_node(step, slot):
+        if (step, slot) not in slot_nodes:
+            r = 1.05 ** step
+            theta = 2*math.pi*slot/RING_SLOTS
+            lat_off = (r*math.cos(theta))/111111
+            lng_off = (r*math.sin(theta))/ (111111*math.cos(math.radians(center.lat)))
+            slot_nodes[(step, slot)] = eng.nearest(center.lat+lat_off, center.lng+lng_off)
+        return slot_nodes[(step, slot)]
 
     candidates = []
-    trials = 0
+    seen = set()
+    trials = early = 0
+    legs_s = 0.0     # 구간 거리 합산(Dijkstra 포함) 누적 시간
     while len(candidates) < n_candidates and trials < n_candidates*5:
         trials += 1
-        # 2~3개 waypoint
+        # 2~3개 waypoint (방위각 순으로 돌아 루프 모양 유지)
         k = random.choice([2, 3])
-        wps = []
-        for i in range(k):
-            theta = random.random()*2*math.pi
-            lat_off = (ring_r*math.cos(theta))/111111
-            lng_off = (ring_r*math.sin(theta))/ (111111*math.cos(math.radians(center.lat)))
-            node = _nearest_node(G, center.lat+lat_off, center.lng+lng_off)
-            wps.append(node)
+        step = _ring_step()
+        slots = sorted(random.sample(range(RING_SLOTS), k))
+        wps = [_slot_node(step, s) for s in slots]
+        legs = [start] + wps + [start]
+        if len(set(wps)) < k or tuple(legs) in seen:
+            continue
+        seen.add(tuple(legs))
 
-        path = [start]
+        # 캐시된 Dijkstra 트리에서 구간 거리를 바로 합산, 상한 초과 시 조기 기각
         total_m = 0.0
-        ok = True
-        for node in wps + [start]:
-            try:
-                seg = nx.shortest_path(G, path[-1], node, weight="length")
-            except nx.NetworkXNoPath:
-                ok = False; break
-            for u, v in zip(seg[:-1], seg[1:]):
-                data = G.get_edge_data(u, v)
-                # MultiEdge 안전 처리
-                length = data[0]["length"] if 0 in data else list(data.values())[0]["length"]
-                total_m += length
-            path = seg if len(path)==1 else path + seg[1:]
+        complete = reachable = True
+        t0 = time.perf_counter()
+        for a, b in zip(legs[:-1], legs[1:]):
+            d = eng.dist(a, b, limit=high)
+            if not np.isfinite(d):
+                # 도달 불가(다른 연결 요소) 또는 limit 밖 → 실경로 길이를 알 수 없음
+                reachable = complete = False
+                break
+            total_m += d
+            if total_m > high:
+                complete = False
+                break
+        legs_s += time.perf_counter() - t0
+        if not complete:
+            early += 1
+            # 조기 기각: 유한한 부분 합이 상한을 넘은 경우만 "실경로 > high" 하한값으로 비율에 반영
+            # (빼 버리면 짧은 루프만 남아 비율이 계속 작아지고 링이 커져 기각이 늘어남)
+            # 구간이 inf면 끊긴 waypoint일 수 있어 표본에서 제외
+            if reachable:
+                ratios.append(high / 1.05 ** step)
+            continue
+        ratios.append(total_m / 1.05 ** step)
+        if not (low <= total_m <= high):
+            continue
 
-        if ok and low <= total_m <= high:
-            xs = [G.nodes[n]["x"] for n in path]
-            ys = [G.nodes[n]["y"] for n in path]
-            geom = LineString(list(zip(xs, ys)))
-            candidates.append({
-                "node_path": path,
-                "length_m": total_m,
-                "geom": geom
-            })
+        path = [start]
+        for a, b in zip(legs[:-1], legs[1:]):
+            path += eng.path(a, b, limit=high)[1:]
+        geom = LineString(np.column_stack([eng.lng[path], eng.lat[path]]))
+        candidates.append({
+            "node_path": eng.node_ids[path].tolist(),
+            "length_m": total_m,
+            "geom": geom,
+            "features": eng.path_features(path),   # 교차로/신호등 밀도, 공원·수변 비율
+        })
 
-    log.info(f"[routegen] candidates={len(candidates)} (trials={trials})")
+    eng.add_loop_ratios(ratios)
+    rate = len(candidates) / max(trials, 1)
+    metrics.observe("dijkstra_legs", legs_s)
+    metrics.inc("loop_trials", trials)
+    metrics.inc("loop_accepted", len(candidates))
+    metrics.inc("loop_early_reject", early)
+    metrics.inc("dijkstra_runs", eng.dijkstra_runs - runs0)
+    log.info(f"[routegen] candidates={len(candidates)} (trials={trials}, accept={rate:.0%}, "
+             f"early_reject={early}, ring_r={1.05 ** _ring_step():.0f}m, "
+             f"dijkstra={eng.dijkstra_runs - runs0})")
     return candidates
@@ -1,20 +1,73 @@
 # 초보자 적합도 스코어
-from typing import Dict
-import math
+# - 피처 행렬(후보 x FEATURE_COLS) 한 번에 계산하는 배치 스코어러 + argpartition top-k
+# - 가중치 프로필은 모듈 로딩 시 벡터로 미리 만들어 두고 요청마다 이름으로 선택 (야간 조정 포함)
+import os, json
+from typing import Dict, Optional, Sequence
+import numpy as np
 
 DEFAULT_W = dict(w1=25, w2=20, w3=15, w4=10, w5=20, w6=10)
+NIGHT_LIGHTING_BONUS = 10  # 야간 조명 가중 강화 (w5 +10)
+# 밀도 피처(개/km) 정규화 기준: 이 값 이상이면 1.0
+INTERSECTIONS_REF_PER_KM = 10.0
+SIGNALS_REF_PER_KM = 4.0
 
-def beginner_score(features: Dict, target_km: float, is_night: bool) -> float:
-    w = DEFAULT_W.copy()
+FEATURE_COLS = ("dist_km", "elev_gain_norm", "intersections_per_km",
+                "signals_per_km", "lighting_index", "water_park_ratio")
+# 열별 부호: 거리 오차/고도/교차로/신호등은 감점, 조명/수변·공원은 가점
+_SIGNS = np.array([-1, -1, -1, -1, 1, 1], dtype=np.float64)
+_DENSITY_REF = np.array([1, 1, INTERSECTIONS_REF_PER_KM, SIGNALS_REF_PER_KM, 1, 1], dtype=np.float64)
+_DENSITY_COLS = np.array([False, False, True, True, False, False])
+
+def weights_vector(w: Dict, is_night: bool = False) -> np.ndarray:
+    """w1..w6 dict → 부호 포함 가중치 벡터 (FEATURE_COLS 순서)"""
+    v = np.array([w["w1"], w["w2"], w["w3"], w["w4"], w["w5"], w["w6"]], dtype=np.float64)
     if is_night:
-        w["w5"] += 10  # 조명 가중 강화
-
-    dist_pen = abs(features["dist_km"] - target_km)
-    sc = 100 \
-        - w["w1"] * dist_pen \
-        - w["w2"] * features["elev_gain_norm"] \
-        - w["w3"] * features["intersections_per_km"] \
-        - w["w4"] * features["signals_per_km"] \
-        + w["w5"] * features["lighting_index"] \
-        + w["w6"] * features["water_park_ratio"]
-    return max(0.0, min(100.0, sc))
+        v[4] += NIGHT_LIGHTING_BONUS
+    return v * _SIGNS
+
+def _load_profiles() -> Dict[str, Dict]:
+    """기본 프로필 + SCORING_PROFILES_JSON 파일({"이름": {"w1": .., ...}}, 빠진 키는 기본값)"""
+    profiles = {"beginner": DEFAULT_W}
+    path = os.getenv("SCORING_PROFILES_JSON")
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for name, w in json.load(f).items():
+                profiles[name] = dict(DEFAULT_W, **w)
+    return profiles
+
+# (프로필 이름, 야간 여부) → 가중치 벡터 (읽기 전용으로 공유)
+PROFILES: Dict[tuple, np.ndarray] = {}
+for _name, _w in _load_profiles().items():
+    for _night in (False, True):
+        _v = weights_vector(_w, _night)
+        _v.setflags(write=False)
+        PROFILES[(_name, _night)] = _v
+
+def profile(name: Optional[str] = None, is_night: bool = False) -> np.ndarray:
+    """가중치 벡터 선택 (없는 이름이면 기본 프로필)"""
+    return PROFILES.get((name or "beginner", is_night), PROFILES[("beginner", is_night)])
+
+def feature_matrix(feats: Sequence[Dict]) -> np.ndarray:
+    """피처 dict 목록 → (n, len(FEATURE_COLS)) 행렬"""
+    return np.array([[f[c] for c in FEATURE_COLS] for f in feats], dtype=np.float64).reshape(-1, len(FEATURE_COLS))
+
+def beginner_scores(X: np.ndarray, target_km: float, w: np.ndarray) -> np.ndarray:
+    """
+    배치 스코어: 100 + Σ w_j * z_j, [0, 100]으로 자름
+    - z_0 = |dist_km - target_km|, 밀도 열은 기준값으로 나눠 [0, 1]로 자름
+    """
+    Z = X / _DENSITY_REF
+    Z[:, _DENSITY_COLS] = np.clip(Z[:, _DENSITY_COLS], 0.0, 1.0)
+    Z[:, 0] = np.abs(X[:, 0] - target_km)
+    return np.clip(100.0 + Z @ w, 0.0, 100.0)
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """점수 상위 k개 위치 (점수 내림차순) — 전체 정렬 대신 argpartition"""
+    n = len(scores)
+    if n <= k:
+        return np.argsort(-scores, kind="stable")
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+def beginner_score(features: Dict, target_km: float, is_night: bool) -> float:
+    return float(beginner_scores(feature_matrix([features]), target_km, profile(None, is_night))[0])
@@ -0,0 +1,106 @@
+# app/spatial.py
+"""
+미터 좌표계(EPSG:3857) 포인트용 균일 격자 버킷 인덱스
+- 포인트를 (셀 행, 셀 열) 순으로 정렬해 연속 배열로 보관 (CSR 형태)
+- bbox 질의: 셀 행마다 연속 구간 1개만 잘라오므로 비용은 주변 밀도에만 비례
+- 반경 질의: bbox 사전 필터 + 거리 검사
+- save/load: .npy 파일 묶음으로 저장하고 memory-map으로 다시 열 수 있음 (워커 간 페이지 캐시 공유)
+"""
+from __future__ import annotations
+import os, json, math
+from typing import Optional, Tuple
+import numpy as np
+
+_ARRAYS = ("ids", "xs", "ys", "cell_keys", "starts", "ends")
+
+
+class GridIndex:
+    """
+    균일 격자 버킷 인덱스
+    - xs, ys: 미터 좌표 배열
+    - cell_m: 격자 셀 한 변 길이(미터)
+    - ids: 포인트별 원본 행 번호 (없으면 0..n-1)
+    * 내부 좌표(xs/ys)는 셀 순서로 정렬되어 있으며, ids[i]가 원본 행 번호
+    """
+
+    def __init__(self, xs, ys, cell_m: float = 100.0, ids: Optional[np.ndarray] = None):
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        self.cell_m = float(cell_m)
+        n = len(xs)
+        if n:
+            self.x0, self.y0 = float(xs.min()), float(ys.min())
+            self.ncols = int((xs.max() - self.x0) // self.cell_m) + 1
+            self.nrows = int((ys.max() - self.y0) // self.cell_m) + 1
+        else:
+            self.x0 = self.y0 = 0.0
+            self.ncols = self.nrows = 0
+        key = self._cell_keys(xs, ys)
+        order = np.argsort(key, kind="stable")
+        self.ids = order if ids is None else np.asarray(ids, dtype=np.int64)[order]
+        self.xs = xs[order]
+        self.ys = ys[order]
+        self.cell_keys, self.starts = np.unique(key[order], return_index=True)
+        self.ends = np.append(self.starts[1:], n)
+
+    def _cell_keys(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        cx = ((xs - self.x0) // self.cell_m).astype(np.int64)
+        cy = ((ys - self.y0) // self.cell_m).astype(np.int64)
+        return cy * self.ncols + cx
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def _cell_range(self, lo: float, hi: float, origin: float, count: int) -> Tuple[int, int]:
+        a = max(0, int(math.floor((lo - origin) / self.cell_m)))
+        b = min(count - 1, int(math.floor((hi - origin) / self.cell_m)))
+        return a, b
+
+    def query_bbox(self, minx: float, miny: float, maxx: float, maxy: float) -> np.ndarray:
+        """bbox 안의 포인트 위치(정렬 배열 기준 인덱스) 반환"""
+        if not len(self.xs):
+            return np.empty(0, dtype=np.int64)
+        c0, c1 = self._cell_range(minx, maxx, self.x0, self.ncols)
+        r0, r1 = self._cell_range(miny, maxy, self.y0, self.nrows)
+        if c0 > c1 or r0 > r1:
+            return np.empty(0, dtype=np.int64)
+        rows = np.arange(r0, r1 + 1, dtype=np.int64) * self.ncols
+        lo = np.searchsorted(self.cell_keys, rows + c0, side="left")
+        hi = np.searchsorted(self.cell_keys, rows + c1, side="right")
+        spans = [(self.starts[a], self.ends[b - 1]) for a, b in zip(lo, hi) if b > a]
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+        pos = np.concatenate([np.arange(s, e, dtype=np.int64) for s, e in spans])
+        x, y = self.xs[pos], self.ys[pos]
+        return pos[(x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy)]
+
+    def query_radius(self, x: float, y: float, r: float) -> np.ndarray:
+        """(x, y)에서 r 미터 이내 포인트 위치 반환"""
+        pos = self.query_bbox(x - r, y - r, x + r, y + r)
+        d2 = (self.xs[pos] - x) ** 2 + (self.ys[pos] - y) ** 2
+        return pos[d2 <= r * r]
+
+    def nbytes(self) -> int:
+        return sum(getattr(self, a).nbytes for a in _ARRAYS)
+
+    # ---------- 저장 / 로딩 ----------
+    def save(self, dirpath: str) -> None:
+        """배열은 .npy, 격자 파라미터는 grid.json으로 저장"""
+        os.makedirs(dirpath, exist_ok=True)
+        for a in _ARRAYS:
+            np.save(os.path.join(dirpath, f"{a}.npy"), np.ascontiguousarray(getattr(self, a)))
+        with open(os.path.join(dirpath, "grid.json"), "w", encoding="utf-8") as f:
+            json.dump(dict(cell_m=self.cell_m, x0=self.x0, y0=self.y0,
+                           ncols=self.ncols, nrows=self.nrows), f)
+
+    @classmethod
+    def load(cls, dirpath: str, mmap_mode: Optional[str] = "r") -> "GridIndex":
+        """save()로 저장한 인덱스를 열기 (기본: 읽기 전용 memory-map, 배열 복사 없음)"""
+        with open(os.path.join(dirpath, "grid.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self = cls.__new__(cls)
+        for k, v in meta.items():
+            setattr(self, k, v)
+        for a in _ARRAYS:
+            setattr(self, a, np.load(os.path.join(dirpath, f"{a}.npy"), mmap_mode=mmap_mode))
+        return self
@@ -8,15 +8,22 @@
 """
 
 from __future__ import annotations
-from typing import Dict, Tuple, Optional
+from typing import TYPE_CHECKING, Dict, Tuple, Optional, Sequence
 import os
 import re
-import pandas as pd
-import geopandas as gpd
-from shapely.geometry import LineString, Point
-from shapely.ops import transform
-import pyproj
-import polyline as pl
+import json
+import shutil
+import hashlib
+import logging
+import numpy as np
+from app.spatial import GridIndex
+
+# pandas / shapely / pyproj는 처음 쓰는 함수 안에서 import (API 프로세스 기동 시간 단축, app.warmup에서 미리 로딩)
+if TYPE_CHECKING:
+    import pandas as pd
+    from shapely.geometry import LineString
+
+log = logging.getLogger("utils")
 
 # =========================
 # Polyline / 기본 피처
@@ -24,37 +31,38 @@ import polyline as pl
 
 def encode_linestring_to_polyline(ls: LineString) -> str:
     """
-    Shapely LineString(경로)을 구글 polyline 문자열로 인코딩
-    LineString 좌표는 (x=lon, y=lat) 순서이므로 lat/lng로 뒤집어 인코딩
+    Shapely LineString(경로)을 구글 polyline 문자열로 인코딩 (원본 해상도, 단순화 없음)
+    LineString 좌표는 (x=lon, y=lat) 순서이므로 열 순서만 뒤집어 벡터 인코더(app.geometry)로 처리
     precision=5 (모바일 맵에서 일반적으로 사용하는 정밀도)
+    * 응답용(단순화/줌별 상세도)은 app.geometry.render_polylines
     """
-    coords = list(ls.coords)
-    latlngs = [(y, x) for (x, y) in coords]
-    return pl.encode(latlngs, precision=5)
+    from app.geometry import encode_polylines
+    return encode_polylines([np.asarray(ls.coords)[:, ::-1]], precision=5)[0]
 
 
 def estimate_features(length_m: float, is_night: bool = False) -> Dict:
     """
     루프 길이(미터)만으로 계산 가능한 기본 피처를 추정
-    * 이후 고도/교차로/신호등/수변/공원 등은 별도 함수로 덮어쓰기 권장
+    * 교차로/신호등/수변·공원은 PathEngine.path_features, 조명은 lighting_indices_for_routes,
+      상승고도는 app.elevation.gain_batch(로컬 DEM)로 덮어쓴다
     """
     dist_km = length_m / 1000.0
     # 초보자 러닝 가정 페이스 (분/킬로)
     pace_min_per_km = 9.0
     duration_min_est = dist_km * pace_min_per_km
 
-    # 스텁 값(후속 단계에서 실제 값으로 교체)
-    elev_gain_norm = 0.1            # TODO: DEM 반영
-    intersections_per_km = 0.6      # TODO: OSM 교차로 집계
-    signals_per_km = 0.2            # TODO: OSM 신호등 집계
+    # 기본값 (그래프/가로등/DEM 피처를 못 구했을 때)
+    elev_gain_norm = 0.1            # 완만한 도심 평지 수준 (DEM 없을 때)
+    intersections_per_km = 6.0      # 도심 보행망 평균 수준 (개/km)
+    signals_per_km = 0.8            # (개/km)
     lighting_index = 0.7 if is_night else 0.5  # 이후 실제 가로등 데이터로 덮어쓰기
-    water_park_ratio = 0.5          # TODO: 수변/공원 버퍼 overlap
+    water_park_ratio = 0.5
 
     return dict(
         dist_km=dist_km,
         duration_min_est=duration_min_est,
-        elev_gain_m=0.0,                    # TODO
-        elev_gain_norm=elev_gain_norm,      # TODO
+        elev_gain_m=0.0,
+        elev_gain_norm=elev_gain_norm,
         intersections_per_km=intersections_per_km,
         signals_per_km=signals_per_km,
         lighting_index=lighting_index,
@@ -66,7 +74,7 @@ def badges_from_features(f: Dict) -> list[str]:
     badges = []
     if f.get("lighting_index", 0.0) >= 0.6:
         badges.append("조명좋음")
-    if f.get("intersections_per_km", 1.0) <= 0.7:
+    if f.get("intersections_per_km", 99.0) <= 7.0:
         badges.append("교차로적음")
     if f.get("elev_gain_norm", 1.0) <= 0.2:
         badges.append("평탄")
@@ -86,14 +94,47 @@ def badges_from_features(f: Dict) -> list[str]:
 # 3. DB에 사전 계산된 데이터 저장
 # 4. 조회 시 DB에서 사전 계산된 데이터 사용
 
-# 내부 전역(앱 시작 시 한 번 로딩)
-_LAMPS_GDF: Optional[gpd.GeoDataFrame] = None
+# 내부 전역(앱 시작 시 한 번 로딩) — LampStore는 아래에 정의
+_LAMPS: Optional["LampStore"] = None
+_LAMPS_VERSION: Optional[str] = None   # 로딩한 CSV의 "경로:mtime_ns:size" (결과 캐시 키, 워커 동기화용)
+
+# 가로등 격자 인덱스 셀 크기(미터) / 바이너리 캐시 폴더 (비우면 CSV 옆 .lamps_cache)
+_LAMPS_GRID_M = float(os.getenv("LAMPS_GRID_M", "100"))
+_LAMPS_CACHE_DIR = os.getenv("LAMPS_CACHE_DIR", "")
+
+# 좌표계 변환기 (WGS84 <-> Web Mercator) — 첫 사용 시 생성해 재사용
+_WGS84 = "EPSG:4326"
+_WEBM = "EPSG:3857"
+_TRANSFORMERS: Dict[Tuple[str, str], object] = {}
+
+
+def _transformer(src: str, dst: str):
+    t = _TRANSFORMERS.get((src, dst))
+    if t is None:
+        import pyproj
+        t = _TRANSFORMERS[(src, dst)] = pyproj.Transformer.from_crs(src, dst, always_xy=True)
+    return t
+
+
+def to_mercator(lon, lat):
+    """WGS84 경도/위도 → EPSG:3857 x/y(미터). 스칼라/배열 모두 한 번에 변환"""
+    return _transformer(_WGS84, _WEBM).transform(lon, lat)
 
-# 좌표계 변환기 (WGS84 <-> Web Mercator)
-_WGS84 = pyproj.CRS("EPSG:4326")
-_WEBM = pyproj.CRS("EPSG:3857")
-_TO_M = pyproj.Transformer.from_crs(_WGS84, _WEBM, always_xy=True).transform
-_TO_DEG = pyproj.Transformer.from_crs(_WEBM, _WGS84, always_xy=True).transform
+
+def from_mercator(x, y):
+    """EPSG:3857 x/y(미터) → WGS84 경도/위도"""
+    return _transformer(_WEBM, _WGS84).transform(x, y)
+
+
+def project(lon, lat, crs: str):
+    """WGS84 경도/위도 → 임의 좌표계 (변환기는 좌표계 쌍별로 캐시)"""
+    return _transformer(_WGS84, crs).transform(lon, lat)
+
+
+def warm_transformers() -> None:
+    """좌표 변환기 생성(+PROJ DB 로딩)을 미리 끝내 둔다"""
+    to_mercator(127.0, 37.5)
+    from_mercator(14137575.0, 4509031.0)
 
 # 가로등 밀도 정규화 상한 (경험값: 50개/km → index=1.0)
 _DEFAULT_LAMPS_PER_KM_MAX = 50.0
@@ -116,39 +157,249 @@ def _infer_lon_lat_columns(df: pd.DataFrame) -> Tuple[str, str]:
         if lon_key in cols and lat_key in cols:
             return cols[lon_key], cols[lat_key]
     # 최후: 숫자형 2개 컬럼을 찾는다
+    import pandas as pd
     numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
     if len(numeric_cols) >= 2:
         return numeric_cols[0], numeric_cols[1]
     raise ValueError("경도/위도 컬럼을 찾을 수 없습니다. (예: lon/lat, lng/lat)")
 
 
+def _file_sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _lamps_cache_dir(path: str) -> str:
+    base = _LAMPS_CACHE_DIR or os.path.join(os.path.dirname(os.path.abspath(path)), ".lamps_cache")
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(base, f"{name}.grid{_LAMPS_GRID_M:g}m")
+
+
+def _load_lamps_cache(path: str, cache_dir: str) -> Optional[Tuple[GridIndex, Dict]]:
+    """
+    캐시가 원본 CSV와 같은 내용이면 memory-map으로 열기
+    - mtime/size가 같으면 바로 사용, 다르면 sha1까지 비교 (touch만 된 경우 재빌드 방지)
+    """
+    meta_path = os.path.join(cache_dir, "source.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    st = os.stat(path)
+    if (meta.get("mtime_ns"), meta.get("size")) != (st.st_mtime_ns, st.st_size):
+        if meta.get("size") != st.st_size or meta.get("sha1") != _file_sha1(path):
+            return None
+        meta.update(mtime_ns=st.st_mtime_ns)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+    return GridIndex.load(cache_dir, mmap_mode="r"), meta
+
+
+def _write_lamps_cache(path: str, cache_dir: str, index: GridIndex, lon_col: str, lat_col: str) -> None:
+    """임시 폴더에 쓰고 rename으로 교체 (여러 워커가 동시에 만들어도 안전)"""
+    st = os.stat(path)
+    tmp = f"{cache_dir}.{os.getpid()}.tmp"
+    index.save(tmp)
+    with open(os.path.join(tmp, "source.json"), "w", encoding="utf-8") as f:
+        json.dump(dict(source=os.path.abspath(path), mtime_ns=st.st_mtime_ns, size=st.st_size,
+                       sha1=_file_sha1(path), lon_col=lon_col, lat_col=lat_col), f, ensure_ascii=False)
+    if os.path.exists(cache_dir):
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp, cache_dir)
+
+
+def _build_lamps_index(path: str, lon_col: Optional[str], lat_col: Optional[str]) -> Tuple[GridIndex, str, str]:
+    """CSV에서 경도/위도 두 컬럼만 읽어 한 번에 EPSG:3857로 변환 후 격자 인덱스 생성"""
+    import pandas as pd
+    if lon_col is None or lat_col is None:
+        lon_col, lat_col = _infer_lon_lat_columns(pd.read_csv(path, nrows=100))
+    df = pd.read_csv(path, usecols=[lon_col, lat_col])
+    lon = pd.to_numeric(df[lon_col], errors="coerce").to_numpy(dtype=np.float64)
+    lat = pd.to_numeric(df[lat_col], errors="coerce").to_numpy(dtype=np.float64)
+    xs, ys = to_mercator(lon, lat)
+    xs, ys = np.asarray(xs), np.asarray(ys)
+    ok = np.isfinite(xs) & np.isfinite(ys)   # 결측/범위 밖 좌표 제외
+    return GridIndex(xs[ok], ys[ok], cell_m=_LAMPS_GRID_M, ids=np.flatnonzero(ok)), lon_col, lat_col
+
+
+class LampStore:
+    """
+    가로등 저장소 — 좌표만 연속 NumPy 배열(격자 인덱스)로 보관
+    - index: EPSG:3857 격자 인덱스 (xs/ys/ids, 캐시가 있으면 memory-map)
+    - 관리번호 등 나머지 CSV 컬럼은 metadata()를 처음 부를 때만 읽는다
+    """
+    __slots__ = ("path", "index", "lon_col", "lat_col", "_meta")
+
+    def __init__(self, path: str, index: GridIndex, lon_col: Optional[str], lat_col: Optional[str]):
+        self.path = path
+        self.index = index
+        self.lon_col = lon_col
+        self.lat_col = lat_col
+        self._meta: Optional[pd.DataFrame] = None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def metadata(self, pos: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        좌표 외 컬럼(관리번호 등) 조회 — 최초 호출 시 CSV에서 로딩
+        - pos: 인덱스 위치 배열 (query 결과). None이면 전체
+        """
+        if self._meta is None:
+            import pandas as pd
+            df = pd.read_csv(self.path)
+            self._meta = df.drop(columns=[c for c in (self.lon_col, self.lat_col) if c in df.columns])
+        if pos is None:
+            return self._meta
+        return self._meta.iloc[self.index.ids[pos]]
+
+    def nbytes(self) -> int:
+        """좌표/인덱스 배열 크기 (메타데이터 제외)"""
+        return self.index.nbytes()
+
+    def mb_per_million(self) -> float:
+        """가로등 100만 개당 메모리(MB) — 파드 메모리 산정용 (개당 바이트 수와 같은 값)"""
+        return self.nbytes() / max(len(self), 1)
+
+
+def get_lamp_store() -> Optional[LampStore]:
+    return _LAMPS
+
+
+def lamps_version() -> Optional[str]:
+    """현재 프로세스에 올라간 가로등 데이터 버전 (프로세스가 달라도 같은 파일이면 같은 값)"""
+    return _LAMPS_VERSION
+
+
+def lamps_ref() -> Optional[Dict]:
+    """워커에 넘길 가로등 데이터 참조 (경로/컬럼/버전). 로딩 전이거나 파일이 없으면 None"""
+    if _LAMPS is None:
+        return None
+    return dict(path=_LAMPS.path, lon_col=_LAMPS.lon_col, lat_col=_LAMPS.lat_col, version=_LAMPS_VERSION)
+
+
+def sync_lamps(ref: Optional[Dict]) -> None:
+    """부모 프로세스와 가로등 데이터 버전이 다르면 다시 로딩 (프로세스 워커용, 같은 프로세스/스레드면 아무 일 없음)"""
+    if ref is None or ref["version"] == _LAMPS_VERSION:
+        return
+    log.info(f"[lamps] reload in worker: {_LAMPS_VERSION} -> {ref['version']}")
+    load_lamps_csv(ref["path"], lon_col=ref["lon_col"], lat_col=ref["lat_col"])
+
+
 def load_lamps_csv(
     path: str = "/mnt/data/서울시 가로등 위치 정보.csv",
     lon_col: Optional[str] = None,
     lat_col: Optional[str] = None,
 ) -> None:
     """
-    가로등 위치 CSV를 읽어 전역 GeoDataFrame(_LAMPS_GDF)에 로딩.
+    가로등 위치 CSV를 전역 LampStore(_LAMPS)로 로딩.
     - path: CSV 파일 경로
     - lon_col/lat_col: 경도/위도 컬럼명(없으면 자동 추론)
+    * 투영 좌표 + 인덱스를 .npy 캐시(LAMPS_CACHE_DIR)로 저장해 두고,
+      다음 기동부터는 memory-map으로 열어 재계산 없이 사용 (CSV가 바뀌면 재생성)
     """
-    global _LAMPS_GDF
+    global _LAMPS, _LAMPS_VERSION
     if not os.path.exists(path):
         # 파일이 없으면 패스 (야간 지수는 기본값으로 동작)
-        _LAMPS_GDF = None
+        _LAMPS, _LAMPS_VERSION = None, None
         return
+    st = os.stat(path)
+    _LAMPS_VERSION = f"{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}"
 
-    df = pd.read_csv(path)
-    if lon_col is None or lat_col is None:
-        lon_col, lat_col = _infer_lon_lat_columns(df)
+    cache_dir = _lamps_cache_dir(path)
+    try:
+        hit = _load_lamps_cache(path, cache_dir)
+    except Exception as e:
+        log.warning(f"[lamps] cache read failed: {e}")
+        hit = None
+    if hit is not None:
+        index, meta = hit
+        _LAMPS = LampStore(path, index, meta.get("lon_col"), meta.get("lat_col"))
+        log.info(f"[lamps] cache hit: {cache_dir} n={len(index)} "
+                 f"mem={_LAMPS.nbytes()/1e6:.2f}MB ({_LAMPS.mb_per_million():.1f}MB/1M lamps)")
+        return
 
-    gdf = gpd.GeoDataFrame(
-        df,
-        geometry=[Point(xy) for xy in zip(df[lon_col], df[lat_col])],
-        crs=_WGS84,
-    ).to_crs(_WEBM)
+    index, lon_col, lat_col = _build_lamps_index(path, lon_col, lat_col)
+    _LAMPS = LampStore(path, index, lon_col, lat_col)
+    log.info(f"[lamps] loaded: n={len(index)} "
+             f"mem={_LAMPS.nbytes()/1e6:.2f}MB ({_LAMPS.mb_per_million():.1f}MB/1M lamps)")
+    try:
+        _write_lamps_cache(path, cache_dir, index, lon_col, lat_col)
+        log.info(f"[lamps] cache written: {cache_dir}")
+    except OSError as e:
+        # 읽기 전용 볼륨 등: 캐시 없이 메모리 인덱스로 동작
+        log.warning(f"[lamps] cache write failed: {e}")
 
-    _LAMPS_GDF = gdf
+
+def _min_dist2_to_polyline(px: np.ndarray, py: np.ndarray,
+                           xs: np.ndarray, ys: np.ndarray, chunk: int = 2048) -> np.ndarray:
+    """
+    포인트들(px, py)에서 폴리라인(xs, ys)까지의 최소 거리 제곱 (NumPy 브로드캐스팅)
+    - 포인트를 chunk 단위로 나눠 (포인트 x 세그먼트) 행렬 메모리를 제한
+    """
+    ax, ay = xs[:-1], ys[:-1]
+    dx, dy = xs[1:] - ax, ys[1:] - ay
+    seg2 = dx * dx + dy * dy
+    seg2 = np.where(seg2 > 0, seg2, 1.0)
+    out = np.empty(len(px), dtype=np.float64)
+    for s in range(0, len(px), chunk):
+        qx = px[s:s + chunk, None]
+        qy = py[s:s + chunk, None]
+        t = np.clip(((qx - ax) * dx + (qy - ay) * dy) / seg2, 0.0, 1.0)
+        ex = qx - (ax + t * dx)
+        ey = qy - (ay + t * dy)
+        out[s:s + chunk] = (ex * ex + ey * ey).min(axis=1)
+    return out
+
+
+def lighting_indices_for_routes(
+    routes: Sequence[LineString],
+    buf_m: float = 25.0,
+    lamps_per_km_max: float = _DEFAULT_LAMPS_PER_KM_MAX,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    여러 루트의 조명 지수를 한 번에 계산 (요청당 1회 호출용)
+    - 모든 루트 좌표를 한 번의 Transformer 호출로 EPSG:3857 변환
+    - 루트마다 격자 인덱스로 주변 가로등만 추린 뒤, NumPy로 점-폴리라인 거리 ≤ buf_m 개수 집계
+    - 반환: (lighting_index 배열[0~1], lamps_per_km 배열)
+
+    * 가로등이 로딩되지 않았거나 길이가 0인 루트는 (0.5, 0.0)
+    """
+    n = len(routes)
+    li = np.full(n, 0.5, dtype=np.float64)
+    lpk = np.zeros(n, dtype=np.float64)
+    if n == 0 or _LAMPS is None or len(_LAMPS) == 0:
+        return li, lpk
+    index = _LAMPS.index
+
+    import shapely
+    geoms = np.asarray(routes, dtype=object)
+    xy = shapely.get_coordinates(geoms)
+    counts = shapely.get_num_coordinates(geoms)
+    xm, ym = to_mercator(xy[:, 0], xy[:, 1])       # EPSG:3857, 한 번에 변환
+    xm, ym = np.asarray(xm), np.asarray(ym)
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+
+    for i in range(n):
+        xs, ys = xm[bounds[i]:bounds[i + 1]], ym[bounds[i]:bounds[i + 1]]
+        if len(xs) < 2:
+            continue
+        length_km = float(np.hypot(np.diff(xs), np.diff(ys)).sum()) / 1000.0
+        if length_km <= 0:
+            continue
+        cand = index.query_bbox(xs.min() - buf_m, ys.min() - buf_m,
+                                xs.max() + buf_m, ys.max() + buf_m)
+        n_in = 0
+        if len(cand):
+            d2 = _min_dist2_to_polyline(index.xs[cand], index.ys[cand], xs, ys)
+            n_in = int(np.count_nonzero(d2 <= buf_m * buf_m))
+        lpk[i] = n_in / length_km
+        # 간단 정규화 → 0~1
+        li[i] = min(1.0, lpk[i] / float(lamps_per_km_max))
+    return li, lpk
 
 
 def lighting_index_for_route(
@@ -165,22 +416,9 @@ def lighting_index_for_route(
     DB에 저장된 코스(running_courses_2025_11_19_10_42)의 경우, 
     사전 계산된 lighting_score를 사용하세요 (precompute_course_safety_data 스크립트 참조).
 
-    * _LAMPS_GDF가 로딩되지 않았다면 (0.5, 0.0) 기본값을 반환
+    * 가로등이 로딩되지 않았다면 (0.5, 0.0) 기본값을 반환
     * lamps_per_km_max는 데이터 분포에 맞게 조정하면 좋다(예: 30~80 사이)
+    * 후보가 여러 개면 lighting_indices_for_routes로 한 번에 계산할 것
     """
-    if _LAMPS_GDF is None or _LAMPS_GDF.empty:
-        return 0.5, 0.0
-
-    # 경로를 미터 좌표계로 변환 후 버퍼 계산
-    ls_m = transform(_TO_M, ls)              # EPSG:3857
-    length_km = ls_m.length / 1000.0
-    if length_km <= 0:
-        return 0.5, 0.0
-
-    buf = ls_m.buffer(buf_m)
-    lamps_in = _LAMPS_GDF[_LAMPS_GDF.intersects(buf)]
-
-    lamps_per_km = float(len(lamps_in)) / length_km
-    # 간단 정규화 → 0~1
-    idx = max(0.0, min(1.0, lamps_per_km / float(lamps_per_km_max)))
-    return float(idx), float(lamps_per_km)
+    li, lpk = lighting_indices_for_routes([ls], buf_m, lamps_per_km_max)
+    return float(li[0]), float(lpk[0])
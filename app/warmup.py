@@ -0,0 +1,124 @@
+# app/warmup.py
+"""
+기동 워밍업 / 준비 상태(readiness)
+- app.main은 가벼운 모듈만 import하고, 무거운 자원은 여기 단계에서 미리 올린다
+  transformers → lamps → dem → geostore → catalog → facilities → route_catalog → route_stack → graphs → executor
+- WARMUP_MODE=background(기본): 서버는 바로 요청을 받고 워밍업은 스레드에서 진행 (끝날 때까지 GET /ready = 503)
+  WARMUP_MODE=blocking  : startup 이벤트에서 워밍업이 끝날 때까지 기다림
+- 경로 생성 엔드포인트는 준비 전에는 503 (is_ready) — 워커 풀 없이 API 프로세스에서 대신 계산하지 않음
+- 핫스팟 그래프는 ROUTE_WARM_POINTS 지점 (프로세스 풀이면 워커 초기화에서, thread/inline이면 이 프로세스에서 로딩)
+- app.main import 시간과 단계별 소요 시간은 /ready 응답, 로그, metrics(stage=warmup_*)로 보고
+"""
+import os, time, logging, threading
+from typing import Callable, Dict, Optional
+from app import metrics
+from app.geostore import DATA_DIR
+
+log = logging.getLogger("warmup")
+
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background")
+_LAMPS_NAME = "서울시 가로등 위치 정보.csv"
+
+_STATE: Dict = dict(ready=False, running=False, import_s=None, warmup_s=None, steps={}, errors={})
+_LOCK = threading.Lock()
+
+
+def lamps_csv_path() -> str:
+    """LAMPS_CSV > /mnt/data(배포 볼륨) > 저장소 data/ 순으로 가로등 CSV 경로 결정"""
+    path = os.getenv("LAMPS_CSV")
+    if path:
+        return path
+    mnt = os.path.join("/mnt/data", _LAMPS_NAME)
+    return mnt if os.path.exists(mnt) else os.path.join(DATA_DIR, _LAMPS_NAME)
+
+
+def _step(name: str, fn: Callable[[], object], required: bool = False) -> None:
+    t0 = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        _STATE["errors"][name] = str(e)
+        log.warning(f"[warmup] {name} failed: {e}")
+        if required:
+            raise
+    finally:
+        dt = time.perf_counter() - t0
+        _STATE["steps"][name] = round(dt, 4)
+        metrics.REGISTRY.observe(f"warmup_{name}", dt)
+
+
+def _route_stack() -> None:
+    """경로 생성 스택 import (networkx/scipy/shapely) — 프로세스 풀이면 부모에서는 쓰지 않으므로 생략"""
+    import app.routegen  # noqa: F401
+
+
+def _graphs() -> None:
+    from app.executor import _parse_points, ROUTE_WARM_POINTS
+    from app.routegen import _engine_for
+    for pt in _parse_points(ROUTE_WARM_POINTS):
+        _engine_for(pt)
+
+
+def run_warmup() -> None:
+    """워밍업 단계 실행 (동기). 워커 풀 시작이 실패하면 준비 상태가 되지 않는다"""
+    from app.utils import load_lamps_csv, warm_transformers
+    from app.elevation import load_dem
+    from app.geostore import load_geostore
+    from app.catalog import load_catalog
+    from app.facilities import load_facilities
+    from app.routecat import get_route_catalog
+    from app.executor import ROUTE_EXECUTOR, start_executor
+
+    with _LOCK:
+        if _STATE["running"] or _STATE["ready"]:
+            return
+        _STATE["running"] = True
+    t0 = time.perf_counter()
+    csv_path = lamps_csv_path()
+    try:
+        _step("transformers", warm_transformers)
+        _step("lamps", lambda: load_lamps_csv(csv_path, lon_col="경도", lat_col="위도"))
+        if ROUTE_EXECUTOR != "process":
+            _step("dem", load_dem)
+        _step("geostore", load_geostore)
+        _step("catalog", load_catalog)
+        _step("facilities", load_facilities)
+        _step("route_catalog", get_route_catalog)
+        if ROUTE_EXECUTOR != "process":
+            _step("route_stack", _route_stack)
+            _step("graphs", _graphs)
+        # 프로세스 워커는 같은 CSV의 memory-map 캐시, DEM, ROUTE_WARM_POINTS 그래프를 초기화에서 올린다
+        _step("executor", lambda: start_executor(csv_path), required=True)
+        _STATE["ready"] = True
+    except Exception as e:
+        log.error(f"[warmup] not ready: {e}")
+    finally:
+        _STATE["running"] = False
+        _STATE["warmup_s"] = round(time.perf_counter() - t0, 4)
+        log.info(f"[warmup] ready={_STATE['ready']} import={_STATE['import_s']}s "
+                 f"warmup={_STATE['warmup_s']}s steps={_STATE['steps']}")
+
+
+def start_warmup(import_s: Optional[float] = None) -> None:
+    """startup 이벤트에서 호출: WARMUP_MODE에 따라 바로 실행하거나 백그라운드 스레드로 실행"""
+    if import_s is not None:
+        _STATE["import_s"] = round(import_s, 4)
+        metrics.REGISTRY.observe("import_app", import_s)
+    if WARMUP_MODE == "blocking":
+        run_warmup()
+    else:
+        threading.Thread(target=run_warmup, name="warmup", daemon=True).start()
+
+
+def is_ready() -> bool:
+    return _STATE["ready"]
+
+
+def readiness() -> Dict:
+    return dict(ready=_STATE["ready"], running=_STATE["running"], import_s=_STATE["import_s"],
+                warmup_s=_STATE["warmup_s"], steps=dict(_STATE["steps"]), errors=dict(_STATE["errors"]))
+
+
+def reset() -> None:
+    """종료 시 호출: 다음 startup에서 다시 워밍업하도록 상태 초기화"""
+    _STATE.update(ready=False, warmup_s=None, steps={}, errors={})
@@ -0,0 +1,277 @@
+# bench/run.py
+"""
+find_course 파이프라인 오프라인 벤치마크
+
+    python -m bench.run                                   # 결과 JSON → bench_output.txt
+    python -m bench.run --repeat 50 --concurrency 1,4,16 --out /tmp/a.json
+    python -m bench.run --compare /tmp/a.json             # 이전 결과와 단계별 비교
+
+- 외부 의존 없음: Kakao/TGI는 bench.stubs 대역 서버, 보행 그래프는 고정 시드 합성 그래프(GraphStore.put_graph로 주입)
+- 가로등은 실제 data/서울시 가로등 위치 정보.csv 사용
+- 단계별 시간(캐시를 매번 비운 상태) + 동시성 수준별 /find_course 지연/처리량
+  (/find_course는 결과 캐시만 끄고 지오코딩/키워드 캐시는 운영과 같이 유지)
+"""
+import os, sys, json, time, math, shutil, asyncio, argparse, platform, subprocess, tempfile, statistics
+from typing import Any, Awaitable, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CENTER = (37.5446, 127.0374)   # 서울숲 부근 (가로등 데이터가 있는 지역)
+PLACE = "벤치공원"
+
+
+def _stats(samples_s: List[float]) -> Dict[str, float]:
+    ms = sorted(s * 1000.0 for s in samples_s)
+    return dict(n=len(ms), mean_ms=statistics.fmean(ms), p50_ms=ms[len(ms) // 2],
+                p95_ms=ms[min(len(ms) - 1, int(math.ceil(len(ms) * 0.95)) - 1)], min_ms=ms[0])
+
+
+def _time(fn: Callable[[], Any], repeat: int, before: Callable[[], None] = lambda: None) -> Dict[str, float]:
+    out = []
+    for _ in range(repeat):
+        before()
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return _stats(out)
+
+
+async def _atime(fn: Callable[[], Awaitable[Any]], repeat: int,
+                 before: Callable[[], None] = lambda: None) -> Dict[str, float]:
+    out = []
+    for _ in range(repeat):
+        before()
+        t0 = time.perf_counter()
+        await fn()
+        out.append(time.perf_counter() - t0)
+    return _stats(out)
+
+
+def _git_meta() -> Dict[str, Any]:
+    def git(*a):
+        try:
+            return subprocess.run(["git", *a], cwd=ROOT, capture_output=True, text=True, timeout=30).stdout.strip()
+        except Exception:
+            return ""
+    return dict(commit=git("rev-parse", "--short", "HEAD"), dirty=bool(git("status", "--porcelain", "--", "app")))
+
+
+def _setup_env(args, stub_url: str, workdir: str) -> None:
+    """app 모듈을 import하기 전에 환경 변수로 외부 의존을 모두 로컬로 돌린다"""
+    os.environ.update(
+        KAKAO_BASE_URL=stub_url,
+        HF_TGI_URL=stub_url,
+        GRAPH_CACHE_DIR=os.path.join(workdir, "tiles"),
+        GRAPH_FETCH_ONLINE="0",
+        LAMPS_CSV=args.lamps,
+        LAMPS_CACHE_DIR=os.path.join(workdir, "lamps"),
+        GEOCODE_RESULTS_JSON=os.path.join(workdir, "none.json"),
+        GEOCODE_STORE_PATH="",
+        ROUTE_CATALOG_PATH=os.path.join(workdir, "none.npz"),
+        ROUTE_EXECUTOR=args.executor,
+        ROUTE_WORKERS=str(args.workers),
+        ROUTE_WARM_POINTS=f"{CENTER[0]},{CENTER[1]}",
+        RESULT_CACHE_SIZE="0",     # 결과 캐시를 꺼서 매 요청 전체 파이프라인 측정
+        WARMUP_MODE="blocking",    # startup 핸들러가 끝나면 워밍업 완료 상태
+        DEM_PATH=os.path.join(workdir, "dem.npy"),
+    )
+
+
+async def _stage_benchmarks(args, G) -> Dict[str, Dict[str, float]]:
+    from app import llm, geo
+    from app.models import LatLng
+    from app.pathengine import PathEngine
+    from app import routegen
+    from app.utils import (load_lamps_csv, lighting_index_for_route, lighting_indices_for_routes,
+                           estimate_features, encode_linestring_to_polyline)
+    from app.scoring import beginner_score, beginner_scores, feature_matrix, profile
+    from app.geometry import render_polylines
+    from app.elevation import get_dem, gain_batch
+    import numpy as np
+
+    R = args.repeat
+    center = LatLng(lat=CENTER[0], lng=CENTER[1])
+    st: Dict[str, Dict[str, float]] = {}
+
+    lamps_dir = os.environ["LAMPS_CACHE_DIR"]
+    st["lamps_load_cold"] = _time(lambda: load_lamps_csv(args.lamps, lon_col="경도", lat_col="위도"), 1,
+                                  before=lambda: shutil.rmtree(lamps_dir, ignore_errors=True))
+    st["lamps_load_warm"] = _time(lambda: load_lamps_csv(args.lamps, lon_col="경도", lat_col="위도"), max(3, R // 5))
+
+    st["parse_running_query.rule"] = await _atime(
+        lambda: llm.parse_running_query(f"{PLACE} 근처에서 밤에 5km 달리기"), R, before=llm._PARSE_CACHE.clear)
+    st["parse_running_query.llm"] = await _atime(
+        lambda: llm.parse_running_query(f"{PLACE}에서 가볍게 뛰고 싶어"), R, before=llm._PARSE_CACHE.clear)
+    # 온라인 결과는 로컬 지오코딩 저장소에도 기록되므로 매번 새 지명으로 조회
+    names = iter(f"{PLACE}{i}" for i in range(R))
+    st["geocode_location"] = await _atime(lambda: geo.geocode_location(next(names)), R)
+    st["search_anchors"] = await _atime(
+        lambda: geo.search_anchors(center.lng, center.lat, ["공원", "하천", "산책로", "운동장", "트랙"], radius=2000),
+        R, before=geo._KEYWORD_CACHE.clear)
+
+    st["path_engine_build"] = _time(lambda: PathEngine(G), max(3, R // 5))
+    routegen._engine_for(center)   # 엔진 캐시 채움 (이후 후보 생성은 warm 엔진 기준)
+    cands: List[Dict[str, Any]] = []
+    st["generate_loop_candidates"] = _time(
+        lambda: cands.__setitem__(slice(None), routegen.generate_loop_candidates(center, target_km=args.km)), R)
+    geoms = [c["geom"] for c in cands]
+    if not geoms:
+        raise SystemExit("no loop candidates on the synthetic graph")
+
+    st["lighting_index_for_route"] = _time(lambda: [lighting_index_for_route(g) for g in geoms], R)
+    st["lighting_indices_for_routes"] = _time(lambda: lighting_indices_for_routes(geoms), R)
+    route_coords = [np.asarray(g.coords)[:, ::-1] for g in geoms]
+    st["elevation_gain.batch"] = _time(lambda: gain_batch(get_dem(), route_coords), R)
+    feats = []
+    for c in cands:
+        f = estimate_features(c["length_m"], is_night=True)
+        f.update(c["features"])
+        feats.append(f)
+    st["beginner_score"] = _time(lambda: [beginner_score(f, args.km, True) for f in feats], R)
+    st["beginner_scores.batch"] = _time(
+        lambda: beginner_scores(feature_matrix(feats), args.km, profile(None, True)), R)
+    st["polyline_encode"] = _time(lambda: [encode_linestring_to_polyline(g) for g in geoms], R)
+    st["polyline_render.batch"] = _time(lambda: render_polylines(route_coords), R)
+    for k in st:
+        st[k]["per_call"] = len(geoms) if k in ("lighting_index_for_route", "beginner_score", "polyline_encode") else 1
+    return st, _geometry_report(route_coords)
+
+
+def _geometry_report(coords) -> Dict[str, Any]:
+    """후보 경로 polyline 크기: 원본 해상도 vs 기본 단순화 vs 줌별 (합계 바이트/점 수)"""
+    from app.geometry import encode_polylines, simplify, tolerance_for
+    out = {"full": dict(points=int(sum(len(c) for c in coords)),
+                        bytes=sum(map(len, encode_polylines(coords))))}
+    for label, zoom in (("default", None), ("z16", 16), ("z14", 14), ("z12", 12)):
+        simp = [simplify(c, tolerance_for(zoom, float(c[0, 0]))) for c in coords]
+        out[label] = dict(points=int(sum(len(c) for c in simp)), bytes=sum(map(len, encode_polylines(simp))),
+                          tol_m=round(tolerance_for(zoom, CENTER[0]), 2))
+    return out
+
+
+async def _find_course_benchmarks(args) -> Dict[str, Dict[str, float]]:
+    import httpx
+    from app.main import app
+
+    out: Dict[str, Dict[str, float]] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        seq = 0
+
+        async def one() -> float:
+            nonlocal seq
+            seq += 1
+            # tolerance를 요청마다 조금씩 바꿔 single-flight 합치기 없이 독립 요청으로 측정
+            body = {"params": {"location": PLACE, "distance_km": args.km, "time": "night",
+                               "tolerance": 0.10 + seq * 1e-9}}
+            t0 = time.perf_counter()
+            r = await client.post("/find_course", json=body)
+            r.raise_for_status()
+            return time.perf_counter() - t0
+
+        await one()   # 워커/엔진 warm-up
+        for conc in args.concurrency:
+            n = max(args.requests, conc * 2)
+            sem = asyncio.Semaphore(conc)
+
+            async def bounded():
+                async with sem:
+                    return await one()
+
+            t0 = time.perf_counter()
+            lat = await asyncio.gather(*[bounded() for _ in range(n)])
+            wall = time.perf_counter() - t0
+            out[f"c{conc}"] = dict(_stats(lat), concurrency=conc, requests=n, rps=n / wall)
+    return out
+
+
+def _print_table(res: Dict[str, Any], base: Dict[str, Any] = None) -> None:
+    rows = [(f"stage.{k}", v) for k, v in res["stages"].items()] + \
+           [(f"find_course.{k}", v) for k, v in res["find_course"].items()]
+    print(f"{'metric':42s} {'p50 ms':>10s} {'p95 ms':>10s} {'mean ms':>10s}" + ("  vs base p50" if base else ""))
+    for name, v in rows:
+        line = f"{name:42s} {v['p50_ms']:10.3f} {v['p95_ms']:10.3f} {v['mean_ms']:10.3f}"
+        if base:
+            sect, key = name.split(".", 1)
+            b = base.get("stages" if sect == "stage" else "find_course", {}).get(key)
+            if b:
+                line += f"  x{v['p50_ms'] / max(b['p50_ms'], 1e-9):.2f}"
+        if "rps" in v:
+            line += f"  rps={v['rps']:.1f}"
+        print(line)
+    full = res.get("geometry", {}).get("full")
+    for label, g in res.get("geometry", {}).items():
+        print(f"geometry.{label:33s} points={g['points']:6d} bytes={g['bytes']:7d}"
+              + (f"  ({100.0 * g['bytes'] / max(full['bytes'], 1):.0f}%, tol={g['tol_m']}m)" if "tol_m" in g else ""))
+
+
+async def _run_handlers(handlers) -> None:
+    """FastAPI on_event 핸들러 실행 (서버 없이 ASGI 앱을 직접 띄울 때)"""
+    for h in handlers:
+        r = h()
+        if asyncio.iscoroutine(r):
+            await r
+
+
+async def _main(args) -> Dict[str, Any]:
+    from bench.stubs import serve
+    from bench.synth import synth_walk_graph, synth_dem
+
+    srv, calls = serve(CENTER, latency_ms=args.stub_latency_ms)
+    workdir = tempfile.mkdtemp(prefix="runrec_bench_")
+    _setup_env(args, f"http://127.0.0.1:{srv.server_port}", workdir)
+    synth_dem(os.environ["DEM_PATH"], CENTER[0], CENTER[1], seed=args.seed)
+
+    from app.graphstore import get_graph_store
+    G = synth_walk_graph(CENTER[0], CENTER[1], n=args.grid, seed=args.seed)
+    get_graph_store().put_graph(G)
+
+    from app.main import app
+    await _run_handlers(app.router.on_startup)
+    try:
+        stages, geometry = await _stage_benchmarks(args, G)
+        find_course = await _find_course_benchmarks(args)
+    finally:
+        await _run_handlers(app.router.on_shutdown)
+        srv.shutdown()
+
+    import numpy as np
+    return dict(
+        meta=dict(_git_meta(), timestamp=time.time(), python=platform.python_version(), numpy=np.__version__,
+                  platform=platform.platform(), cpu_count=os.cpu_count(), args=vars(args),
+                  graph=dict(nodes=G.number_of_nodes(), edges=G.number_of_edges()), stub_calls=calls),
+        stages=stages,
+        find_course=find_course,
+        geometry=geometry,
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="find_course 파이프라인 오프라인 벤치마크")
+    ap.add_argument("--out", default=os.path.join(ROOT, "bench_output.txt"))
+    ap.add_argument("--compare", help="비교할 이전 결과 JSON")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--requests", type=int, default=16, help="동시성 수준별 최소 요청 수")
+    ap.add_argument("--concurrency", type=lambda s: [int(v) for v in s.split(",")], default=[1, 4, 16])
+    ap.add_argument("--km", type=float, default=3.0)
+    ap.add_argument("--grid", type=int, default=60, help="합성 그래프 한 변 노드 수 (100m 간격)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--executor", default=os.getenv("ROUTE_EXECUTOR", "process"))
+    ap.add_argument("--workers", type=int, default=int(os.getenv("ROUTE_WORKERS", "3")))
+    ap.add_argument("--stub-latency-ms", type=float, default=30.0)
+    ap.add_argument("--lamps", default=os.path.join(ROOT, "data", "서울시 가로등 위치 정보.csv"))
+    args = ap.parse_args()
+
+    sys.path.insert(0, ROOT)
+    res = asyncio.run(_main(args))
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(res, f, ensure_ascii=False, indent=1)
+    base = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            base = json.load(f)
+    _print_table(res, base)
+    print(f"-> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# bench/stubs.py
+"""
+벤치마크용 로컬 대역 서버 (표준 라이브러리 http.server)
+- Kakao 키워드 검색(GET /v2/local/search/keyword.json): 질의별로 고정된 좌표를 중심 주변에 결정적으로 생성
+- TGI(POST /generate): 사용자 문장에서 지명/거리를 뽑아 파서 JSON을 돌려줌 (inputs 배열이면 배열로 응답)
+- latency_ms로 외부 API 왕복 지연을 흉내냄
+"""
+import json, re, time, zlib, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    center = (37.5446, 127.0374)
+    latency_ms = 30.0
+    calls = None
+
+    def log_message(self, *a):
+        pass
+
+    def _send(self, obj) -> None:
+        b = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(b)))
+        self.end_headers()
+        self.wfile.write(b)
+
+    def do_GET(self):
+        time.sleep(self.latency_ms / 1000.0)
+        q = parse_qs(urlparse(self.path).query)
+        query = q.get("query", [""])[0]
+        size = int(q.get("size", ["10"])[0])
+        lat0 = float(q["y"][0]) if "y" in q else self.center[0]
+        lng0 = float(q["x"][0]) if "x" in q else self.center[1]
+        seed = zlib.crc32(query.encode("utf-8"))
+        docs = []
+        for i in range(min(size, 3)):
+            h = zlib.crc32(f"{seed}:{i}".encode())
+            dlat = ((h & 0xFFFF) / 0xFFFF - 0.5) * 0.008
+            dlng = (((h >> 16) & 0xFFFF) / 0xFFFF - 0.5) * 0.010
+            docs.append({"place_name": f"{query}{i}", "id": str(h), "y": str(lat0 + dlat), "x": str(lng0 + dlng),
+                         "road_address_name": f"벤치시 {query}로 {i}"})
+        self.calls["kakao"] += 1
+        self._send({"documents": docs})
+
+    def do_POST(self):
+        time.sleep(self.latency_ms / 1000.0)
+        n = int(self.headers.get("Content-Length", "0"))
+        body = json.loads(self.rfile.read(n) or b"{}")
+
+        def gen(inp: str):
+            text = inp.rsplit("사용자:", 1)[-1].strip().split("\n")[0]
+            m = re.search(r"(\d+(?:\.\d+)?)\s*km", text)
+            out = {"location": text.split()[0] if text else None,
+                   "distance_km": float(m.group(1)) if m else None,
+                   "time": "night" if "밤" in text else None,
+                   "keywords": ["공원", "하천", "산책로"]}
+            return {"generated_text": json.dumps(out, ensure_ascii=False)}
+
+        inputs = body.get("inputs", "")
+        self.calls["tgi"] += 1
+        self._send([gen(i) for i in inputs] if isinstance(inputs, list) else gen(inputs))
+
+
+def serve(center=(37.5446, 127.0374), latency_ms: float = 30.0):
+    """백그라운드 스레드로 대역 서버 기동 → (server, calls 카운터)"""
+    calls = {"kakao": 0, "tgi": 0}
+    handler = type("Handler", (_Handler,), {"center": center, "latency_ms": latency_ms, "calls": calls})
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, calls
@@ -0,0 +1,66 @@
+# bench/synth.py
+"""
+고정 시드 합성 보행 그래프 / DEM
+- 격자(n x n) + 좌표 흔들림 + 일부 간선 제거 → osmnx walk 그래프와 같은 속성(x, y, street_count, length)
+- 일부 노드는 신호등(highway=traffic_signals), 일부 간선은 공원/하천 이름 → 그래프 피처 경로도 함께 측정
+- DEM: 중심 주변 언덕 몇 개를 합친 .npy + .json (app.elevation 형식)
+"""
+import math, json, random
+import numpy as np
+import networkx as nx
+
+
+def synth_dem(path: str, lat0: float = 37.5446, lng0: float = 127.0374, size: int = 2000,
+              res_deg: float = 1 / 3600, seed: int = 0) -> None:
+    """size x size 격자(기본 1초 ≈ 30m) 가우시안 언덕 지형을 path(.npy)와 사이드카 JSON으로 저장"""
+    rng = np.random.default_rng(seed)
+    half = size * res_deg / 2
+    lat = lat0 + half - (np.arange(size) + 0.5) * res_deg
+    lng = lng0 - half + (np.arange(size) + 0.5) * res_deg
+    z = np.full((size, size), 20.0, dtype=np.float32)
+    for _ in range(12):
+        cy, cx = lat0 + rng.uniform(-half, half), lng0 + rng.uniform(-half, half)
+        s = rng.uniform(0.003, 0.01)
+        z += (rng.uniform(20, 120) * np.exp(-((lat[:, None] - cy) ** 2 + (lng[None, :] - cx) ** 2) / (2 * s * s))
+              ).astype(np.float32)
+    np.save(path, z)
+    with open(path[:-4] + ".json", "w", encoding="utf-8") as f:
+        json.dump(dict(crs="EPSG:4326", x0=lng0 - half, y0=lat0 + half, dx=res_deg, dy=res_deg, nodata=None), f)
+
+
+def synth_walk_graph(lat0: float = 37.5446, lng0: float = 127.0374, n: int = 60,
+                     step_m: float = 100.0, seed: int = 0) -> nx.MultiDiGraph:
+    rnd = random.Random(seed)
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    dlat = step_m / 111111.0
+    dlng = step_m / (111111.0 * math.cos(math.radians(lat0)))
+    h = n // 2
+    for i in range(n):
+        for j in range(n):
+            attrs = dict(y=lat0 + (i - h) * dlat + rnd.uniform(-0.2, 0.2) * dlat,
+                         x=lng0 + (j - h) * dlng + rnd.uniform(-0.2, 0.2) * dlng)
+            if rnd.random() < 0.08:
+                attrs["highway"] = "traffic_signals"
+            G.add_node(i * n + j + 1, **attrs)
+
+    def length(u, v):
+        a, b = G.nodes[u], G.nodes[v]
+        return math.hypot((a["y"] - b["y"]) * 111111.0,
+                          (a["x"] - b["x"]) * 111111.0 * math.cos(math.radians(lat0)))
+
+    for i in range(n):
+        for j in range(n):
+            u = i * n + j + 1
+            for v in ([u + 1] if j < n - 1 else []) + ([u + n] if i < n - 1 else []):
+                if rnd.random() < 0.1:
+                    continue
+                data = dict(length=length(u, v), highway="footway")
+                if i < n // 5:
+                    data["name"] = "벤치천 산책로"
+                elif j < n // 6:
+                    data["name"] = "벤치공원"
+                G.add_edge(u, v, **data)
+                G.add_edge(v, u, **data)
+    for node in G.nodes:
+        G.nodes[node]["street_count"] = len(set(G.predecessors(node)) | set(G.successors(node)))
+    return G
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+STEP 4: 코스 × 안전데이터 매핑 (오프라인, 로컬 CSV만 사용)
+
+- 입력: data/normalized_courses.json + 지오코딩 결과(data/kakao_geocode_results.json, GEOCODE_STORE_PATH 누적 기록)
+- 안전데이터: 가로등 CSV(app.utils LampStore 격자 인덱스) + 육상 트랙/산책로 CSV(app.facilities)
+- 코스별 점수(조명 밀도/시설)를 프로세스 풀에서 계산하고 결과를 JSONL에 한 줄씩 바로 기록
+- 코스 내용 + 좌표 + 입력 데이터 지문으로 해시를 만들어, 다시 돌리면 바뀐 코스만 재계산
+
+사용 예:
+    python scripts/step4_compute_course_safety_mapping.py
+    python scripts/step4_compute_course_safety_mapping.py --workers 4 --radius-m 1000 --out data/course_safety.jsonl
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.geostore import COURSES_JSON, DATA_DIR, load_geostore  # noqa: E402
+from app.facilities import TRACKS_CSV, TRAILS_CSV  # noqa: E402
+
+LAMPS_CSV = os.getenv("LAMPS_CSV", os.path.join(DATA_DIR, "서울시 가로등 위치 정보.csv"))
+OUT_PATH = os.getenv("COURSE_SAFETY_OUT", os.path.join(DATA_DIR, "course_safety.jsonl"))
+ALGO_VERSION = "1"          # 점수 계산식이 바뀌면 올려서 전체 재계산
+LAMPS_PER_KM_MAX = 50.0     # 조명 점수 100점 기준 밀도 (app.utils 조명지수와 같은 기준)
+
+
+def _input_fingerprint(paths):
+    """입력 CSV 지문 (경로, 크기, 수정 시각) — 안전데이터가 바뀌면 모든 해시가 바뀜"""
+    parts = []
+    for p in paths:
+        st = os.stat(p) if os.path.exists(p) else None
+        parts.append(f"{os.path.basename(p)}:{st.st_size}:{int(st.st_mtime)}" if st else f"{os.path.basename(p)}:-")
+    return "|".join(parts)
+
+
+def course_hash(course, latlng, radius_m, fingerprint):
+    payload = json.dumps([course, latlng, radius_m, fingerprint, ALGO_VERSION],
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# ----- 워커 -----
+
+def _init_worker(lamps_csv):
+    from app.utils import load_lamps_csv
+    from app.facilities import get_facilities
+    load_lamps_csv(lamps_csv, lon_col="경도", lat_col="위도")
+    get_facilities()
+
+
+def compute_scores(course, lat, lng, radius_m):
+    """
+    코스 시작점 반경 radius_m 안의 가로등/시설로 점수 계산
+    - avg_light_density: 반경 내 가로등 수 / 코스 길이(km, 최소 0.5)
+    - safe_light_score: 밀도를 LAMPS_PER_KM_MAX 기준 0~100으로 환산
+    - facility_score: 반경 내 트랙/산책로 1개당 50점 (최대 100)
+    - recommendation_weight: 조명 0.7 + 시설 0.3
+    """
+    from app.utils import get_lamp_store, to_mercator
+    from app.facilities import get_facilities
+
+    lamps = 0
+    store = get_lamp_store()
+    if store is not None:
+        x, y = to_mercator(lng, lat)
+        lamps = len(store.index.query_radius(x, y, radius_m / math.cos(math.radians(lat))))
+    facilities = get_facilities().near(lat, lng, radius_m, limit=20)
+
+    length_km = course.get("length_km") or 3.0
+    density = lamps / max(length_km, 0.5)
+    light = min(100.0, 100.0 * density / LAMPS_PER_KM_MAX)
+    facility = min(100.0, 50.0 * len(facilities))
+    weight = 0.7 * light + 0.3 * facility
+
+    tags = set()
+    ctype = course.get("course_type") or ""
+    if "공원" in ctype: tags.add("#공원런닝")
+    if "트랙" in ctype: tags.add("#트랙런닝")
+    if "하천" in ctype or "강변" in ctype: tags.add("#강변런닝")
+    if density >= 10: tags.add("#야간러닝가능")
+    if density >= 15: tags.add("#가로등많음")
+    if weight > 70: tags.add("#초보자추천")
+    if length_km >= 2.0 and density >= 5: tags.add("#크루런닝추천")
+    if ctype == "트랙": tags.add("#우천시가능")
+
+    return dict(
+        lamps_in_radius=lamps,
+        avg_light_density=round(density, 2),
+        safe_light_score=round(light, 2),
+        facility_count=len(facilities),
+        nearest_facility_m=round(facilities[0]["distance_m"], 1) if facilities else None,
+        facility_score=round(facility, 2),
+        recommendation_weight=round(weight, 2),
+        tags=sorted(tags),
+    )
+
+
+def _work(item):
+    name, course, lat, lng, radius_m, h = item
+    rec = dict(course_name=name, hash=h, lat=lat, lng=lng, radius_m=radius_m, computed_at=time.time())
+    try:
+        rec.update(status="ok", **compute_scores(course, lat, lng, radius_m))
+    except Exception as e:
+        rec.update(status="error", error=str(e))
+    return rec
+
+
+# ----- 메인 -----
+
+def load_previous(path):
+    """기존 결과 JSONL → {코스명: 마지막 레코드}"""
+    prev = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        r = json.loads(line)
+                        prev[r["course_name"]] = r
+                    except (json.JSONDecodeError, KeyError):
+                        continue
+    return prev
+
+
+def compact(path, names):
+    """코스마다 마지막 레코드 1줄만 남기고 다시 쓰기 (입력에 없는 코스는 제거)"""
+    latest = load_previous(path)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for n in names:
+            if n in latest:
+                f.write(json.dumps(latest[n], ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="코스 × 안전데이터 매핑 (오프라인 증분 계산)")
+    ap.add_argument("--courses", default=COURSES_JSON)
+    ap.add_argument("--lamps", default=LAMPS_CSV)
+    ap.add_argument("--out", default=OUT_PATH)
+    ap.add_argument("--radius-m", type=float, default=1000.0)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--force", action="store_true", help="해시와 무관하게 전체 재계산")
+    args = ap.parse_args()
+
+    with open(args.courses, encoding="utf-8") as f:
+        courses = json.load(f)
+    geo = load_geostore()
+    fp = _input_fingerprint([args.lamps, TRACKS_CSV, TRAILS_CSV])
+    prev = {} if args.force else load_previous(args.out)
+
+    todo, skipped, no_loc = [], 0, []
+    for c in courses:
+        name = c["course_name"]
+        e = geo.lookup(name)
+        if e is None or not e.found:
+            no_loc.append(name)
+            continue
+        h = course_hash(c, [e.lat, e.lng], args.radius_m, fp)
+        if prev.get(name, {}).get("hash") == h and prev[name].get("status") == "ok":
+            skipped += 1
+            continue
+        todo.append((name, c, e.lat, e.lng, args.radius_m, h))
+
+    print(f"courses={len(courses)} todo={len(todo)} unchanged={skipped} no_location={len(no_loc)}")
+    t0 = time.perf_counter()
+    done = 0
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "a", encoding="utf-8") as out:
+        # 위치 없는 코스도 상태를 기록 (지오코딩이 채워지면 다음 실행에서 계산)
+        for name in no_loc:
+            if prev.get(name, {}).get("status") != "no_location":
+                out.write(json.dumps(dict(course_name=name, status="no_location"), ensure_ascii=False) + "\n")
+        if todo:
+            if args.workers > 1:
+                with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                         initargs=(args.lamps,)) as pool:
+                    for fut in as_completed([pool.submit(_work, it) for it in todo]):
+                        out.write(json.dumps(fut.result(), ensure_ascii=False) + "\n")
+                        out.flush()
+                        done += 1
+            else:
+                _init_worker(args.lamps)
+                for it in todo:
+                    out.write(json.dumps(_work(it), ensure_ascii=False) + "\n")
+                    out.flush()
+                    done += 1
+    compact(args.out, [c["course_name"] for c in courses])
+    print(f"computed={done} in {time.perf_counter() - t0:.2f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+// FastAPI 러닝 코스 추천 백엔드 클라이언트
+// - streamFindCourse: /find_course/stream (NDJSON)을 읽어 루프가 준비되는 대로 콜백 호출
+//
+// 사용 예 (Index.tsx):
+// import { streamFindCourse } from "@/integrations/recsys/client";
+// await streamFindCourse(params, {
+//   onRoute: (route) => setRoutes((prev) => [...prev, route]),   // 도착하는 대로 지도에 그리기
+//   onFinal: (top3) => setRoutes(top3),                           // 최종 상위 3개로 교체
+// });
+
+const recsysUrl = import.meta.env.VITE_RECSYS_API_URL ?? 'http://localhost:8000';
+
+export interface RecsysLatLng {
+  lat: number;
+  lng: number;
+  place_id?: string | null;
+  name?: string | null;
+  address?: string | null;
+}
+
+export interface RecsysParams {
+  location?: string | null;
+  distance_km?: number | null;
+  tolerance?: number | null;   // 거리 허용 오차 비율, 0 < tolerance < 1 (예: 0.1 = ±10%)
+  time?: 'day' | 'night' | null;
+  keywords?: string[] | null;
+}
+
+export interface RecsysRoute {
+  route_id: string;
+  name: string;
+  start: RecsysLatLng;
+  polyline: string;
+  polyline_precision?: number;   // polyline 디코딩 정밀도 (기본 5)
+  features: Record<string, number>;
+  scores: Record<string, number>;
+  badges: string[];
+}
+
+// 경로 상세도: 지도 줌(단순화 정도)과 polyline 정밀도. 생략하면 서버 기본값
+export interface RecsysDetail {
+  zoom?: number;
+  precision?: number;
+}
+
+type StreamEvent =
+  | { type: 'route'; route: RecsysRoute }
+  | { type: 'final'; routes: RecsysRoute[]; timing?: Record<string, number> }
+  | { type: 'error'; status: number; detail: string; timing?: Record<string, number> };
+
+export interface StreamHandlers {
+  onRoute?: (route: RecsysRoute) => void;
+  onFinal?: (routes: RecsysRoute[]) => void;
+  signal?: AbortSignal;
+}
+
+export async function streamFindCourse(
+  params: RecsysParams,
+  handlers: StreamHandlers,
+  detail: RecsysDetail = {},
+): Promise<RecsysRoute[]> {
+  const res = await fetch(`${recsysUrl}/find_course/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ params, ...detail }),
+    signal: handlers.signal,
+  });
+  if (!res.ok || !res.body) {
+    throw new Error(`find_course/stream failed: ${res.status}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let final: RecsysRoute[] = [];
+
+  const handle = (line: string) => {
+    if (!line.trim()) return;
+    const ev = JSON.parse(line) as StreamEvent;
+    if (ev.type === 'route') handlers.onRoute?.(ev.route);
+    else if (ev.type === 'final') {
+      final = ev.routes;
+      handlers.onFinal?.(ev.routes);
+    } else if (ev.type === 'error') throw new Error(ev.detail);
+  };
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let nl: number;
+    while ((nl = buffer.indexOf('\n')) >= 0) {
+      handle(buffer.slice(0, nl));
+      buffer = buffer.slice(nl + 1);
+    }
+  }
+  handle(buffer);
+  return final;
+}
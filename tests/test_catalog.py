@@ -0,0 +1,40 @@
+from app.catalog import CourseCatalog, load_catalog
+from app.models import ParsedParams
+
+
+def _names(hits):
+    return [c["course_name"] for c, _ in hits]
+
+
+def test_seoul_forest_name_ranks_first():
+    cat = load_catalog()
+    hits = cat.search(ParsedParams(location="서울숲"))
+    assert _names(hits)[0] == "서울숲 주변 코스"
+    # "서울" 지역 태그는 더 긴 지명 "서울숲"에 매칭되지 않음
+    assert len(hits) < 10
+
+
+def test_seoul_forest_with_keywords_and_distance():
+    cat = load_catalog()
+    hits = cat.search(ParsedParams(location="서울숲", keywords=["공원"], distance_km=5))
+    assert _names(hits)[:1] == ["서울숲 주변 코스"]
+
+
+def test_admin_suffix_match():
+    cat = CourseCatalog([
+        dict(course_name="A 코스", region_tags=["서울"], city="서울", district="마포구"),
+        dict(course_name="B 코스", region_tags=["경기도"], city="경기도", district="수원시"),
+    ])
+    assert _names(cat.search(ParsedParams(location="마포"))) == ["A 코스"]
+    assert _names(cat.search(ParsedParams(location="서울특별시"))) == ["A 코스"]
+    assert _names(cat.search(ParsedParams(location="경기"))) == ["B 코스"]
+    assert cat.search(ParsedParams(location="서울숲")) == []
+
+
+def test_name_hit_ranks_above_region_hit():
+    cat = CourseCatalog([
+        dict(course_name="한강 야간 코스", region_tags=["서울"], natural_tags=["공원", "야간가능"]),
+        dict(course_name="서울 둘레길", region_tags=["서울"], natural_tags=["공원"]),
+    ])
+    hits = cat.search(ParsedParams(location="서울", keywords=["공원"], time="night"))
+    assert _names(hits) == ["서울 둘레길", "한강 야간 코스"]
@@ -0,0 +1,32 @@
+import networkx as nx
+
+from app.graphstore import GraphStore
+
+SEAM_LNG = 127.04
+LAT = 37.55
+
+
+def _seam_graph() -> nx.MultiDiGraph:
+    """3 → 1 → 2 → 4 체인, 1→2는 tile_deg=0.02의 lng=127.04 경계를 넘는 880 m 간선"""
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    dlng = 440 / (111111.0 * 0.7926)   # lat 37.55에서 440 m
+    for nid, x in ((3, SEAM_LNG - 2 * dlng), (1, SEAM_LNG - dlng), (2, SEAM_LNG + dlng), (4, SEAM_LNG + 2 * dlng)):
+        G.add_node(nid, y=LAT, x=x)
+    for u, v, length in ((3, 1, 440.0), (1, 2, 880.0), (2, 4, 440.0)):
+        G.add_edge(u, v, length=length)
+    return G
+
+
+def test_put_graph_keeps_seam_crossing_edge(tmp_path):
+    store = GraphStore(cache_dir=str(tmp_path), fetch_online=False, tile_deg=0.02)
+    assert store.put_graph(_seam_graph()) == 2
+    G = store.get_graph(LAT, SEAM_LNG, 1500)
+    assert G.has_edge(3, 1) and G.has_edge(1, 2) and G.has_edge(2, 4)
+    assert G[1][2][0]["length"] == 880.0
+
+
+def test_each_tile_keeps_crossing_edge(tmp_path):
+    store = GraphStore(cache_dir=str(tmp_path), fetch_online=False, tile_deg=0.02)
+    store.put_graph(_seam_graph())
+    for key in store.tiles_for_bbox((LAT, SEAM_LNG - 0.001, LAT, SEAM_LNG + 0.001)):
+        assert store.tile(key).has_edge(1, 2)
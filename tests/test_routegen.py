@@ -0,0 +1,39 @@
+import math
+import random
+
+import networkx as nx
+
+from app import routegen
+from app.models import LatLng
+from app.pathengine import PathEngine
+
+LAT, LNG = 37.55, 127.04
+
+
+def _island_graph(radius_m: float, n: int = 24) -> nx.MultiDiGraph:
+    """중심 근처 두 노드(출발 요소) + 반경 radius_m 원 위의 끊긴 고리 (waypoint가 모두 여기로 스냅)"""
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    dlng = 1 / (111111.0 * math.cos(math.radians(LAT)))
+    G.add_node(0, y=LAT, x=LNG)
+    G.add_node(1, y=LAT + 10 / 111111.0, x=LNG)
+    G.add_edge(0, 1, length=10.0)
+    G.add_edge(1, 0, length=10.0)
+    ring = list(range(100, 100 + n))
+    for i, nid in enumerate(ring):
+        th = 2 * math.pi * i / n
+        G.add_node(nid, y=LAT + radius_m * math.cos(th) / 111111.0, x=LNG + radius_m * math.sin(th) * dlng)
+    seg = 2 * math.pi * radius_m / n
+    for u, v in zip(ring, ring[1:] + ring[:1]):
+        G.add_edge(u, v, length=seg)
+        G.add_edge(v, u, length=seg)
+    return G
+
+
+def test_unreachable_waypoints_do_not_move_loop_ratio(monkeypatch):
+    eng = PathEngine(_island_graph(5000 / (2 * math.pi)))
+    monkeypatch.setattr(routegen, "_engine_for", lambda center: eng)
+    random.seed(0)
+    before = eng.loop_ratio
+    out = routegen.generate_loop_candidates(LatLng(lat=LAT, lng=LNG), target_km=5)
+    assert out == []
+    assert eng.loop_ratio == before